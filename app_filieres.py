@@ -2,29 +2,28 @@ import streamlit as st
 import json
 import os
 from datetime import datetime
+from itertools import groupby
 import requests
 
-# Try to import plotting libraries
-try:
-    import plotly.express as px
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
-
-try:
-    import matplotlib.pyplot as plt
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+from assets import AssetManager
+from cards import CardHtmlCache, build_event_html
+from edit_batch import EVENTS_FIELD, EditBatch
+from charts import (
+    ACCESS_METRICS, APP_COLORS, ChartCache, access_series, available_chart_backend, department_colors,
+)
+from event_log import JsonlEventLog, SQLiteEventLog
+from export import EXPORT_FORMATS, ExportCache, available_formats
+from gist_client import DEFAULT_FILENAME, DEFAULT_GIST_ID, GIST_API_URL as DEFAULT_GIST_API_URL, is_rate_limited
+from filieres_model import (
+    REMOVED, content_hash, diff_documents, drop_changes, events_change, filter_filieres, sort_for_table,
+)
+from shared_store import SharedDataStore
+from storage import ConflictError, commit_changes, create_backend
+from theme import build_stylesheet, etat_css_class
 
-# Load approximately-equal-to icon
-try:
-    import base64
-    with open('/home/arthurc/dev/projects/filExperim/is-approximately-equal-to.png', 'rb') as f:
-        APPROX_ICON_B64 = base64.b64encode(f.read()).decode()
-    APPROX_ICON_HTML = f'<img src="data:image/png;base64,{APPROX_ICON_B64}" width="16" height="16" style="vertical-align: middle; margin-right: 4px;"/>'
-except:
-    APPROX_ICON_HTML = '≈ '
+# Bibliothèque de graphiques disponible, détectée sans l'importer : Plotly ou
+# matplotlib ne sont chargés qu'au premier graphique réellement affiché
+CHART_BACKEND = available_chart_backend()
 
 # Configuration de la page
 st.set_page_config(
@@ -34,163 +33,456 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-GIST_ID = "e5f2784739d9e2784a3f067217b25e01"
-FILENAME = "filieres_data.json"
-GITHUB_TOKEN = st.secrets["GITHUB_PAT"]
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Champs attendus pour une filière (doit correspondre à la structure du JSON)
-FILIERE_FIELDS = {
-    "nom": "Nom de la filière",
-    "icon": "📁",
-    "referent_metier": "",
-    "nombre_referents_delegues": 0,
-    "nombre_collaborateurs_sensibilises": 0,
-    "nombre_collaborateurs_total": 0,
-    "etat_avancement": "en_emergence",
-    "niveau_autonomie": "",
-    "fopp_count": 0,
-    "description": "",
-    "point_attention": "",
-    "usages_phares": [],
-    "acces": {"laposte_gpt": 0, "copilot_licences": 0},
-    "evenements_recents": [],
-    "responsable_pole_data": []
-}
+def get_setting(name, default=None):
+    """Lit un réglage dans les variables d'environnement, puis dans st.secrets."""
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # Pas de fichier secrets.toml (exécution locale hors ligne)
+        return default
 
-def migrate_filiere_fields(filiere):
-    """Complète dynamiquement les champs manquants d'une filière avec les valeurs par défaut attendues."""
-    for k, v in FILIERE_FIELDS.items():
-        if k not in filiere:
-            filiere[k] = v if not isinstance(v, dict) and not isinstance(v, list) else v.copy() if isinstance(v, list) else v.copy()
-        elif isinstance(v, dict):
-            # Pour les sous-dictionnaires (ex: acces)
-            for subk, subv in v.items():
-                if k not in filiere or not isinstance(filiere[k], dict):
-                    filiere[k] = {}
-                if subk not in filiere[k]:
-                    filiere[k][subk] = subv
-    return filiere
+# Backend de stockage : "gist" (par défaut), "local" (fichier JSON) ou "sqlite"
+STORAGE_BACKEND = get_setting("STORAGE_BACKEND", "gist")
 
-@st.cache_data(ttl=10)  # Cache for 10 seconds only
-def load_data():
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    
-    # Use authentication for higher rate limit
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    
-    try:
-        r = requests.get(url, headers=headers)
-        r.raise_for_status()
-        files = r.json()["files"]
-        content = files[FILENAME]["content"]
-        data = json.loads(content)
-        # Migration à la volée des filières (comme avant)
-        if 'filieres' in data:
-            for key, filiere in data['filieres'].items():
-                data['filieres'][key] = migrate_filiere_fields(filiere)
-        return data
-    except requests.exceptions.HTTPError as e:
-        st.error(f"Erreur HTTP lors du chargement du Gist: {e}")
+GIST_ID = DEFAULT_GIST_ID
+FILENAME = DEFAULT_FILENAME
+GITHUB_TOKEN = get_setting("GITHUB_PAT")
+# URL de l'API Gist ({gist_id} est remplacé) : modifiable pour viser un serveur de test
+GIST_API_URL = get_setting("GIST_API_URL", DEFAULT_GIST_API_URL)
+# Copie locale du dernier contenu reçu du Gist (et de son ETag)
+SNAPSHOT_DIR = get_setting("SNAPSHOT_DIR", os.path.join(APP_DIR, ".cache"))
+LOCAL_DATA_PATH = get_setting("LOCAL_DATA_PATH", os.path.join(APP_DIR, FILENAME))
+SQLITE_PATH = get_setting("SQLITE_PATH", os.path.join(APP_DIR, "filieres_data.sqlite3"))
+# Journal des événements du backend local (le backend SQLite utilise une table de sa base)
+EVENT_LOG_PATH = get_setting("EVENT_LOG_PATH", os.path.splitext(LOCAL_DATA_PATH)[0] + "_events.jsonl")
+
+# Intervalle de rafraîchissement partagé par toutes les sessions (en secondes). Pour le
+# Gist, il s'allonge jusqu'à REFRESH_INTERVAL_MAX quand les données ne changent plus et
+# selon le quota d'API restant ; les backends locaux restent à intervalle fixe
+REFRESH_INTERVAL = 10
+REFRESH_INTERVAL_MAX = 300
+# Nombre maximal de cartes dont le HTML reste en cache
+CARD_CACHE_SIZE = 512
+# Nombre maximal de fichiers exportés gardés en cache (version x filtres x format)
+EXPORT_CACHE_SIZE = 16
+# Nombre maximal de graphiques de répartition gardés en cache
+CHART_CACHE_SIZE = 32
+# Nombre de cartes par page en mode Cartes, et d'événements affichés par carte avant
+# « Afficher les événements plus anciens »
+CARDS_PER_PAGE = 12
+EVENTS_PER_PAGE = 5
+# Intervalle de vérification, par chaque session, de la version affichée (en secondes)
+VERSION_PROBE_INTERVAL = 5
+
+def create_storage_backend():
+    """Instancie le backend de stockage choisi par STORAGE_BACKEND."""
+    if STORAGE_BACKEND == "gist":
+        if not GITHUB_TOKEN:
+            raise KeyError("GITHUB_PAT est requis pour le backend gist")
+        return create_backend("gist", gist_id=GIST_ID, filename=FILENAME, token=GITHUB_TOKEN,
+                              snapshot_dir=SNAPSHOT_DIR, api_url=GIST_API_URL)
+    if STORAGE_BACKEND == "local":
+        return create_backend("local", path=LOCAL_DATA_PATH)
+    if STORAGE_BACKEND == "sqlite":
+        # Une base vide est initialisée à partir du fichier JSON local
+        return create_backend("sqlite", path=SQLITE_PATH, seed_path=LOCAL_DATA_PATH)
+    return create_backend(STORAGE_BACKEND)
+
+@st.cache_resource
+def get_data_store():
+    """Magasin unique par processus : un seul thread interroge le stockage pour toutes les sessions."""
+    max_interval = REFRESH_INTERVAL_MAX if STORAGE_BACKEND == "gist" else None
+    return SharedDataStore(create_storage_backend(), interval=REFRESH_INTERVAL, max_interval=max_interval).start()
+
+@st.cache_resource
+def get_event_log():
+    """Journal des événements récents, ou None pour le Gist (événements gardés dans le document).
+
+    L'API Gist remplace le fichier entier à chaque écriture : un journal en ajout seul
+    n'y apporterait rien.
+    """
+    if STORAGE_BACKEND == "local":
+        return JsonlEventLog(EVENT_LOG_PATH)
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteEventLog(SQLITE_PATH)
+    return None
+
+def get_recent_events(filiere_key, filiere_data, limit=None):
+    """Retourne les ``limit`` événements les plus récents de la filière et leur nombre total."""
+    event_log = get_event_log()
+    if event_log is None:
+        evenements = filiere_data.get('evenements_recents', [])
+        return (evenements if limit is None else evenements[:limit]), len(evenements)
+    return event_log.latest(filiere_key, limit), event_log.count(filiere_key)
+
+def data_version(snapshot):
+    """Version affichée : celle du document et, s'il y en a un, celle du journal d'événements."""
+    event_log = get_event_log()
+    return (snapshot.version if snapshot else None,
+            event_log.revision if event_log is not None else None)
+
+def report_load_error(error):
+    """Affiche l'erreur du dernier chargement du Gist."""
+    if isinstance(error, requests.exceptions.HTTPError):
+        r = error.response
+        st.error(f"Erreur HTTP lors du chargement du Gist: {error}")
         st.error(f"Status code: {r.status_code}")
         st.error(f"Response: {r.text}")
-        if r.status_code == 403 and "rate limit" in r.text:
-            st.error("💡 Limite d'API atteinte. L'administrateur doit configurer un token GitHub pour une meilleure performance.")
-        return None
-    except Exception as e:
-        st.error(f"Erreur lors du chargement des données: {str(e)}")
-        return None
+        if is_rate_limited(r):
+            reset = datetime.fromtimestamp(int(r.headers.get("X-RateLimit-Reset", 0))).strftime('%H:%M')
+            st.error(f"💡 Limite d'API atteinte jusqu'à {reset}. L'administrateur doit configurer un token GitHub pour une meilleure performance.")
+    else:
+        st.error(f"Erreur lors du chargement des données: {str(error)}")
 
-def save_data(data):
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    payload = {
-        "files": {
-            FILENAME: {
-                "content": json.dumps(data, indent=2, ensure_ascii=False)
-            }
-        }
-    }
+def load_snapshot():
+    """Retourne l'instantané partagé courant (lecture seule, avec son numéro de version)."""
+    store = get_data_store()
+    snapshot = store.snapshot()
+    if snapshot is None and store.error is not None:
+        report_load_error(store.error)
+    return snapshot
+
+def load_data():
+    """Retourne les données courantes (partagées entre sessions : ne pas modifier en place)."""
+    snapshot = load_snapshot()
+    return snapshot.data if snapshot else None
+
+def commit_session_changes(changes, base_data, base_revision, on_conflict=None):
+    """Enregistre des changements calculés contre ``base_data`` ; True en cas de succès.
+
+    En cas de conflit, les changements passent à l'arbitrage et ``on_conflict`` est
+    appelé avant le rerun.
+    """
+    if not changes:
+        # Rien n'a changé : pas d'aller-retour vers le stockage
+        return True
+    store = get_data_store()
     try:
-        r = requests.patch(url, headers=headers, data=json.dumps(payload))
-        r.raise_for_status()
-        # Clear cache to reload fresh data
-        st.cache_data.clear()
+        # Écriture directe : le document enregistré devient la version courante, sans
+        # relecture du stockage. Les caches dérivés (cartes, graphiques, exports) sont
+        # indexés par version ou par contenu : seules les entrées modifiées sont recalculées
+        # Sauvegarde attendue par la session : durée bornée, sans reprise après un délai dépassé
+        with store.backend.lock, store.backend.interactive():
+            data = commit_changes(store.backend, changes, base_data, base_revision)
+            store.install(data)
         return True
+    except ConflictError as e:
+        # Conflit sur un même champ : on garde les changements pour arbitrage
+        st.session_state["save_conflict"] = {
+            "changes": changes,
+            "conflicts": e.conflicts,
+            "theirs": e.theirs,
+            "revision": e.revision
+        }
+        if on_conflict is not None:
+            on_conflict()
+        st.rerun()
     except Exception as e:
         st.error(f"❌ Erreur lors de la sauvegarde: {e}")
         return False
 
-def display_filiere_card(filiere_key, filiere_data, etats_config):
+def format_conflict_value(value):
+    """Représentation lisible d'une valeur en conflit."""
+    if value is None or value == REMOVED:
+        return "(supprimé)"
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, indent=1, ensure_ascii=False)
+
+def display_save_conflicts():
+    """Affiche les conflits de la dernière sauvegarde et permet de les arbitrer champ par champ."""
+    pending = st.session_state.get("save_conflict")
+    if not pending:
+        return
+    filieres = pending["theirs"].get('filieres', {})
+    with st.container(border=True):
+        st.warning("⚠️ Quelqu'un a modifié les mêmes champs pendant votre édition. Choisissez la version à conserver :")
+        conflicts_theirs = []
+        for i, conflict in enumerate(pending["conflicts"]):
+            key = conflict["filiere"]
+            nom = filieres.get(key, {}).get('nom', key) if key else "Document"
+            st.markdown(f"**{nom}** — `{conflict['champ'] or 'filière entière'}`")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.caption("Votre version")
+                st.code(format_conflict_value(conflict["mine"]), language=None)
+            with col2:
+                st.caption("Version enregistrée")
+                st.code(format_conflict_value(conflict["theirs"]), language=None)
+            choix = st.radio(
+                "Version à conserver",
+                ["Ma version", "Version enregistrée"],
+                horizontal=True,
+                key=f"conflict_choice_{i}"
+            )
+            if choix == "Version enregistrée":
+                conflicts_theirs.append(conflict)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("✅ Appliquer mes choix", type="primary", key="conflict_apply"):
+                del st.session_state["save_conflict"]
+                # Les changements sont rejoués sur la version enregistrée, sans les champs cédés
+                changes = drop_changes(pending["changes"], conflicts_theirs)
+                if commit_session_changes(changes, pending["theirs"], pending["revision"]):
+                    st.session_state["success_message"] = True
+                    st.session_state["success_timestamp"] = datetime.now().timestamp()
+                    st.rerun()
+        with col2:
+            if st.button("Abandonner mes modifications", key="conflict_discard"):
+                del st.session_state["save_conflict"]
+                st.rerun()
+
+OPTIONS_AUTONOMIE = [
+    "Besoin d'accompagnement faible",
+    "Besoin d'accompagnement modéré",
+    "Besoin d'accompagnement fort",
+    "Besoin d'accompagnement très fort"
+]
+
+# Champs du formulaire d'édition : préfixe de la clé du widget -> (chemin du champ,
+# valeur par défaut) ; "acces.laposte_gpt" désigne un sous-champ. L'état d'avancement
+# est choisi par des boutons, sans widget à clé
+EDIT_FORM_FIELDS = {
+    "etat": ("etat_avancement", 'a_initier'),
+    "responsables": ("responsable_pole_data", []),
+    "autonomie": ("niveau_autonomie", OPTIONS_AUTONOMIE[0]),
+    "ref": ("referent_metier", ''),
+    "collabIAGen": ("nombre_collaborateurs_sensibilises", 0),
+    "collabIAGen_approx": ("nombre_collaborateurs_sensibilises_approx", False),
+    "refdelegues": ("nombre_referents_delegues", 0),
+    "refdelegues_approx": ("nombre_referents_delegues_approx", False),
+    "collabTotal": ("nombre_collaborateurs_total", 0),
+    "fopp": ("fopp_count", 0),
+    "fopp_approx": ("fopp_count_approx", False),
+    "gpt": ("acces.laposte_gpt", 0),
+    "gpt_approx": ("acces.laposte_gpt_approx", False),
+    "copilot": ("acces.copilot_licences", 0),
+    "copilot_approx": ("acces.copilot_licences_approx", False),
+    "attention": ("point_attention", ''),
+    "usages": ("usages_phares", []),
+    "events": (EVENTS_FIELD, []),
+}
+
+def events_to_text(evenements):
+    """Texte du champ d'édition des événements (une ligne "date;titre;description" par événement)."""
+    return "".join(f"{event.get('date', '')};{event.get('titre', '')};{event.get('description', '')}\n"
+                   for event in evenements)
+
+def parse_events_text(text):
+    """Événements saisis dans le champ d'édition (les lignes incomplètes sont ignorées)."""
+    evenements = []
+    for ligne in text.split('\n'):
+        if ligne.strip():
+            parties = ligne.split(';')
+            if len(parties) >= 3:
+                evenements.append({
+                    'date': parties[0].strip(),
+                    'titre': parties[1].strip(),
+                    'description': parties[2].strip()
+                })
+    return evenements
+
+def edit_form_values(filiere, evenements):
+    """Valeurs de référence normalisées du formulaire d'une filière (chemin du champ -> valeur)."""
+    values = {}
+    for path, default in EDIT_FORM_FIELDS.values():
+        field, _, subfield = path.partition('.')
+        source = filiere.get(field) if subfield else filiere
+        values[path] = source.get(subfield or field, default) if isinstance(source, dict) else default
+    if values['niveau_autonomie'] not in OPTIONS_AUTONOMIE:
+        values['niveau_autonomie'] = OPTIONS_AUTONOMIE[0]
+    values[EVENTS_FIELD] = evenements
+    return values
+
+def get_edit_batch():
+    """Lot de modifications en attente de la session (créé sur la version courante)."""
+    batch = st.session_state.get("edit_batch")
+    if batch is None:
+        batch = st.session_state["edit_batch"] = EditBatch(load_snapshot(), separate_events=get_event_log() is not None)
+    return batch
+
+def get_edit_form(batch, filiere_key):
+    """Formulaire de la filière dans le lot, ouvert à partir de la version de référence du lot."""
+    form = batch.forms.get(filiere_key)
+    if form is None:
+        filiere = batch.base.data['filieres'][filiere_key]
+        evenements, _ = get_recent_events(filiere_key, filiere)
+        form = batch.open_form(filiere_key, edit_form_values(filiere, evenements))
+    return form
+
+def update_edit_field(filiere_key, prefix):
+    """Callback des widgets du formulaire : reporte la nouvelle valeur dans le lot."""
+    form = get_edit_batch().forms[filiere_key]
+    path, _ = EDIT_FORM_FIELDS[prefix]
+    value = st.session_state[f"{prefix}_{filiere_key}"]
+    if prefix == "usages":
+        value = [usage.strip() for usage in value.split('\n') if usage.strip()]
+    elif prefix == "events":
+        # Texte revenu à l'identique : on garde les événements d'origine tels quels
+        original = form.original[path]
+        value = original if value == events_to_text(original) else parse_events_text(value)
+    form.update(path, value)
+
+def choose_etat(filiere_key, etat):
+    """Callback des boutons d'état d'avancement."""
+    get_edit_batch().forms[filiere_key].update('etat_avancement', etat)
+
+def navigate_edit(filieres_keys, delta):
+    """Passe à la filière précédente/suivante (les modifications en cours restent dans le lot)."""
+    index = st.session_state.filiere_editee_index = (st.session_state.filiere_editee_index + delta) % len(filieres_keys)
+    # Le sélecteur a une clé : c'est son état, et non ``index``, qui détermine la filière affichée
+    st.session_state["filiere_selectbox"] = filieres_keys[index]
+
+def clear_edit_form(filiere_keys):
+    """Oublie la saisie des formulaires des filières : ils seront reconstruits depuis les données."""
+    for filiere_key in filiere_keys:
+        for prefix in EDIT_FORM_FIELDS:
+            st.session_state.pop(f"{prefix}_{filiere_key}", None)
+
+def discard_edit_batch():
+    """Abandonne toutes les modifications en attente."""
+    batch = st.session_state.pop("edit_batch", None)
+    if batch is not None:
+        clear_edit_form(batch.keys())
+
+def retire_document_events(snapshot):
+    """Vide les ``evenements_recents`` du document une fois importés dans le journal.
+
+    Le journal fait alors seul foi : le document n'en garde pas une seconde copie
+    périmée.
+    """
+    changes = {key: {EVENTS_FIELD: []} for key, filiere in snapshot.data.get('filieres', {}).items()
+               if filiere.get(EVENTS_FIELD)}
+    if not changes:
+        return
+    store = get_data_store()
+    try:
+        with store.backend.lock:
+            store.install(commit_changes(store.backend, {'filieres': changes}, snapshot.data, snapshot.revision))
+    except Exception:
+        # Le journal fait déjà foi : le vidage sera retenté au prochain rerun
+        pass
+
+def commit_edit_batch(batch):
+    """Enregistre en une seule écriture les modifications en attente de toutes les filières.
+
+    Le lot reste en attente tant que l'enregistrement n'a pas abouti ; il n'est retiré
+    qu'après succès, ou une fois ses changements confiés à l'arbitrage d'un conflit.
+    """
+    def retire_batch():
+        st.session_state.pop("edit_batch", None)
+        clear_edit_form(batch.keys())
+
+    # Les événements du journal ne passent pas par la fusion du document : seuls les
+    # retraits et ajouts du formulaire sont rejoués sur sa version courante
+    try:
+        for filiere_key, (removed, added) in batch.event_changes().items():
+            get_event_log().update(filiere_key, removed, added)
+            # Rejoués une seule fois, même si l'enregistrement du document échoue ensuite
+            batch.forms[filiere_key].settle(EVENTS_FIELD)
+    except Exception as e:
+        # Journal illisible ou verrouillé : rien n'est perdu, le lot reste en attente
+        st.error(f"❌ Erreur lors de l'enregistrement des événements: {e}")
+        return False
+    if not commit_session_changes(batch.changes(), batch.base.data, batch.base.revision,
+                                  on_conflict=retire_batch):
+        return False
+    retire_batch()
+    return True
+
+@st.cache_resource
+def get_assets():
+    """Icônes embarquées, lues et encodées une seule fois par processus."""
+    return AssetManager()
+
+@st.cache_data(show_spinner=False)
+def get_stylesheet(etats_config):
+    """Feuille de style du thème et des images, régénérée seulement quand les couleurs changent."""
+    return build_stylesheet(etats_config) + get_assets().stylesheet()
+
+@st.cache_resource
+def get_card_cache():
+    """Cache LRU du HTML des cartes, partagé par toutes les sessions."""
+    return CardHtmlCache(get_assets().html('approx'), maxsize=CARD_CACHE_SIZE)
+
+@st.cache_resource
+def get_export_cache():
+    """Cache des fichiers exportés, partagé par toutes les sessions."""
+    return ExportCache(maxsize=EXPORT_CACHE_SIZE)
+
+@st.cache_resource
+def get_chart_cache():
+    """Cache des graphiques de répartition, partagé par toutes les sessions."""
+    return ChartCache(maxsize=CHART_CACHE_SIZE)
+
+def display_access_chart(metric, series, couleur_par_departement):
+    """Affiche le camembert d'une métrique d'accès (Plotly, matplotlib ou texte)"""
+    if not series:
+        st.info(metric.message_vide)
+        return
+    couleurs = [couleur_par_departement[dept] for dept in series]
+    if CHART_BACKEND == 'plotly':
+        chart = get_chart_cache().get('plotly', metric, series, couleurs)
+        st.plotly_chart(json.loads(chart), use_container_width=True)
+    elif CHART_BACKEND == 'matplotlib':
+        chart = get_chart_cache().get('matplotlib', metric, series, couleurs)
+        st.image(chart, use_container_width=True)
+    else:
+        # Fallback: simple text display
+        total = sum(series.values())
+        for filiere, count in series.items():
+            percentage = (count / total) * 100
+            st.write(f"• {filiere}: {count} {metric.unite} ({percentage:.1f}%)")
+
+def increment_session_value(state_key, delta):
+    """Callback des boutons de pagination (exécuté avant le rerun)."""
+    st.session_state[state_key] = st.session_state.get(state_key, 0) + delta
+
+def paginate(items, state_key, page_size):
+    """Affiche les boutons de navigation et retourne les éléments de la page courante.
+
+    La page courante (base 0) est conservée dans ``st.session_state[state_key]`` et
+    ramenée dans les bornes quand la liste raccourcit (changement de filtre...).
+    """
+    nb_pages = max(1, -(-len(items) // page_size))
+    page = min(max(st.session_state.get(state_key, 0), 0), nb_pages - 1)
+    st.session_state[state_key] = page
+    if nb_pages > 1:
+        col_prev, col_info, col_next = st.columns([1, 3, 1])
+        with col_prev:
+            st.button("◀ Précédent", key=f"{state_key}_prev", disabled=page == 0,
+                      on_click=increment_session_value, args=(state_key, -1))
+        with col_info:
+            st.caption(f"Page {page + 1} / {nb_pages}")
+        with col_next:
+            st.button("Suivant ▶", key=f"{state_key}_next", disabled=page >= nb_pages - 1,
+                      on_click=increment_session_value, args=(state_key, 1))
+    return items[page * page_size:(page + 1) * page_size]
+
+def display_filiere_card(filiere_key, filiere_data, etats_config, filiere_hash=None):
     """Affiche une carte pour une filière dans un container Streamlit natif"""
     etat = filiere_data.get('etat_avancement', 'initialisation')
     etat_info = etats_config.get(etat, {})
-    
-    # Mapping des états avec les nouveaux textes
-    etats_labels_custom = {
-        'prompts_deployes': 'AVANCÉ',
-        'tests_realises': 'INTERMÉDIAIRE',
-        'en_emergence': 'EN ÉMERGENCE',
-        'a_initier': 'À INITIER'
-    }
-    
-    etat_label = etats_labels_custom.get(etat, etat_info.get('label', 'État inconnu'))
-    couleur_fond = etat_info.get('couleur', '#f8f9fa')
-    couleur_bordure = etat_info.get('couleur_bordure', '#dee2e6')
+    # HTML mémorisé : seules les cartes dont le contenu a changé sont reformatées
+    html = get_card_cache().get(filiere_data, etat_info, filiere_hash)
     
     # Utiliser le container natif de Streamlit avec bordure
     with st.container(border=True):
         # Barre de couleur en haut pour indiquer l'état
-        st.markdown(
-            f"""<div style='background-color: {couleur_bordure}; 
-            margin: -1rem -1rem 1rem -1rem; 
-            padding: 0.5rem; 
-            border-radius: 5px 5px 0 0;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);'></div>""", 
-            unsafe_allow_html=True
-        )
+        st.markdown(html.bandeau, unsafe_allow_html=True)
         
         # Titre avec icône et nombre total de collaborateurs
-        nom_filiere = filiere_data.get('nom', 'Filière')
-        nb_total_collab = filiere_data.get('nombre_collaborateurs_total', 0)
-        responsables = filiere_data.get('responsable_pole_data', [])
-        responsables_text = ", ".join(responsables) if responsables else ""
-        
-        st.markdown(f"""
-        <div style='position: relative;'>
-            <h3>{filiere_data.get('icon', '📁')} {nom_filiere} <span style='font-weight: normal; font-style: italic; font-size: 0.8em;'>({nb_total_collab} collaborateurs)</span></h3>
-            {f'<div style="position: absolute; top: 0; right: 0; font-size: 0.6em; color: #666; font-style: italic;">{responsables_text}</div>' if responsables_text else ''}
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(html.titre, unsafe_allow_html=True)
         
         # Badge d'état
-        st.markdown(
-            f"""<div style='display: inline-block; 
-            background-color: {couleur_bordure}; 
-            color: white; 
-            padding: 6px 12px; 
-            border-radius: 15px; 
-            font-weight: bold; 
-            margin: 5px 0;
-            font-size: 0.9em;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.2);'>
-            🎯 {etat_label}
-            </div>""", 
-            unsafe_allow_html=True
-        )
+        st.markdown(html.badge, unsafe_allow_html=True)
         
         # Niveau d'autonomie
-        icone_autonomie = {
-            "Besoin d'accompagnement faible": "🟢",
-            "Besoin d'accompagnement modéré": "🟡",
-            "Besoin d'accompagnement fort": "🟠",
-            "Besoin d'accompagnement très fort": "🔴"
-        }
-        niveau_autonomie = filiere_data.get('niveau_autonomie', 'Non renseigné')
-        icone = icone_autonomie.get(niveau_autonomie, "❔")
-        st.markdown(
-            f"""<div style='margin: 5px 0 0 0; font-size: 1.0em;'><span>{icone}</span> <span style='font-weight:bold;'>{niveau_autonomie}</span></div>""",
-            unsafe_allow_html=True
-        )
+        st.markdown(html.autonomie, unsafe_allow_html=True)
         
         # Ligne de séparation
         st.markdown("---")
@@ -199,118 +491,28 @@ def display_filiere_card(filiere_key, filiere_data, etats_config):
         col1, col2 = st.columns(2)
         
         with col1:
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>🧙🏼‍♂️ Référent métier:</strong><br/>
-                {filiere_data.get('referent_metier', 'Non défini')}
-                </div>""", 
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>🧝‍♂️ Référents délégués:</strong><br/>
-                {APPROX_ICON_HTML if filiere_data.get('nombre_referents_delegues_approx', False) else ''}{filiere_data.get('nombre_referents_delegues', 0)}
-                </div>""",
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>👩‍🎓 Collaborateurs sensibilisés IAGen:</strong><br/>
-                {APPROX_ICON_HTML if filiere_data.get('nombre_collaborateurs_sensibilises_approx', False) else ''}{filiere_data.get('nombre_collaborateurs_sensibilises', 0)}{' (' + str(round((filiere_data.get('nombre_collaborateurs_sensibilises', 0) / filiere_data.get('nombre_collaborateurs_total', 1)) * 100, 1)) + '%)' if filiere_data.get('nombre_collaborateurs_total', 0) > 0 else ''}
-                </div>""",
-                unsafe_allow_html=True
-            )
+            for box in html.colonne_gauche:
+                st.markdown(box, unsafe_allow_html=True)
         with col2:
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>📯 Accès LaPoste GPT:</strong><br/>
-                {APPROX_ICON_HTML if filiere_data.get('acces', {}).get('laposte_gpt_approx', False) else ''}{filiere_data.get('acces', {}).get('laposte_gpt', 0)}
-                </div>""", 
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>🛩️ Licences Copilot:</strong><br/>
-                {APPROX_ICON_HTML if filiere_data.get('acces', {}).get('copilot_licences_approx', False) else ''}{filiere_data.get('acces', {}).get('copilot_licences', 0)}
-                </div>""", 
-                unsafe_allow_html=True
-            )
-            st.markdown(
-                f"""<div style='background-color: {couleur_fond}20; 
-                padding: 6px; 
-                border-radius: 4px; 
-                border-left: 2px solid {couleur_bordure};
-                margin-bottom: 5px;
-                font-size: 0.9em;'>
-                <strong>📜 Fiches d'opportunité:</strong><br/>
-                {APPROX_ICON_HTML if filiere_data.get('fopp_count_approx', False) else ''}{filiere_data.get('fopp_count', 0)}
-                </div>""",
-                unsafe_allow_html=True
-            )
+            for box in html.colonne_droite:
+                st.markdown(box, unsafe_allow_html=True)
         
         # Points d'attention
-        point_attention = filiere_data.get('point_attention', '')
-        if point_attention and point_attention != 'Aucun point d\'attention spécifique':
+        if html.points_attention is not None:
             st.markdown("---")
-            st.markdown("<strong style='font-size: 0.9em;'>⚠️ Points d'attention:</strong>", unsafe_allow_html=True)
+            st.markdown("<strong class='carte-section'>⚠️ Points d'attention:</strong>", unsafe_allow_html=True)
             # Traiter chaque ligne séparément
-            for ligne in point_attention.split('\n'):
-                if ligne.strip():
-                    st.markdown(
-                        f"""<div style='background-color: #fff3cd; 
-                        border-left: 3px solid #ffc107; 
-                        padding: 4px 8px; 
-                        border-radius: 4px;
-                        margin: 3px 0;
-                        font-size: 0.85em;'>
-                        • {ligne.strip()}
-                        </div>""", 
-                        unsafe_allow_html=True
-                    )
+            for ligne in html.points_attention:
+                st.markdown(ligne, unsafe_allow_html=True)
             st.markdown("---")
         
         # Usages phares
-        usages = filiere_data.get('usages_phares', [])
-        if usages:
-            if not (point_attention and point_attention != 'Aucun point d\'attention spécifique'):
+        if html.usages:
+            if html.points_attention is None:
                 st.markdown("---")
-            st.markdown("<strong style='font-size: 0.9em;'>🌟 Usage(s) phare(s):</strong>", unsafe_allow_html=True)
-            for usage in usages:
-                st.markdown(
-                    f"""<div style='background-color: {couleur_fond}10; 
-                    padding: 4px 8px; 
-                    border-radius: 4px; 
-                    margin: 3px 0;
-                    font-size: 0.85em;'>
-                    • {usage}
-                    </div>""", 
-                    unsafe_allow_html=True
-                )
+            st.markdown("<strong class='carte-section'>🌟 Usage(s) phare(s):</strong>", unsafe_allow_html=True)
+            for usage in html.usages:
+                st.markdown(usage, unsafe_allow_html=True)
         
         # Événements récents dans un expander
         st.markdown("---")
@@ -335,52 +537,98 @@ def display_filiere_card(filiere_key, filiere_data, etats_config):
                         st.session_state[form_key] = False
                         st.rerun()
                     if submitted and new_title and new_desc:
-                        data = load_data()
-                        filieres = data.get('filieres', {})
-                        evenements = filieres.get(filiere_key, {}).get('evenements_recents', [])
-                        evenements.insert(0, {
+                        event = {
                             'date': new_date.strftime('%Y-%m-%d'),
                             'titre': new_title,
                             'description': new_desc
-                        })
-                        filieres[filiere_key]['evenements_recents'] = evenements
-                        save_data(data)
-                        st.session_state[form_key] = False
-                        st.session_state[f"event_success_{filiere_key}"] = True
-                        st.rerun()
+                        }
+                        event_log = get_event_log()
+                        if event_log is not None:
+                            # Simple ajout au journal : le document n'est pas réécrit
+                            event_log.append(filiere_key, event)
+                            saved = True
+                        else:
+                            # Enregistré comme un ajout, fusionné avec ceux des autres sessions
+                            snapshot = load_snapshot()
+                            saved = commit_session_changes(
+                                {'filieres': {filiere_key: {EVENTS_FIELD: events_change([], [event])}}},
+                                snapshot.data, snapshot.revision
+                            )
+                        # En cas d'échec, l'erreur reste affichée et le formulaire ouvert
+                        if saved:
+                            st.session_state[form_key] = False
+                            st.session_state[f"event_success_{filiere_key}"] = True
+                            st.rerun()
             # Message de succès après ajout
             if st.session_state.get(f"event_success_{filiere_key}"):
                 st.success("Événement ajouté avec succès !")
                 st.session_state[f"event_success_{filiere_key}"] = False
-            # Toujours récupérer la liste à jour depuis filiere_data
-            evenements = filiere_data.get('evenements_recents', [])
+            # Seuls les événements les plus récents sont lus et affichés, les plus
+            # anciens sont chargés à la demande
+            shown_key = f"events_shown_{filiere_key}"
+            nb_affiches = st.session_state.setdefault(shown_key, EVENTS_PER_PAGE)
+            evenements, nb_evenements = get_recent_events(filiere_key, filiere_data, nb_affiches)
             if evenements:
                 for i, event in enumerate(evenements):
                     if i > 0:
                         st.markdown("---")
-                    st.markdown(
-                        f"""<div style='background-color: #f8f9fa; 
-                        padding: 10px; 
-                        border-radius: 5px;'>
-                        <strong>{event.get('date', 'Date inconnue')}</strong> - {event.get('titre', 'Sans titre')}<br/>
-                        <span style='color: #666;'>{event.get('description', 'Pas de description')}</span>
-                        </div>""", 
-                        unsafe_allow_html=True
-                    )
+                    st.markdown(build_event_html(event), unsafe_allow_html=True)
+                nb_restants = nb_evenements - nb_affiches
+                if nb_restants > 0:
+                    st.button(f"Afficher les événements plus anciens ({nb_restants})", key=f"more_events_{filiere_key}",
+                              on_click=increment_session_value, args=(shown_key, EVENTS_PER_PAGE))
             else:
                 st.text("Aucun événement récent")
 
+@st.fragment(run_every=VERSION_PROBE_INTERVAL)
+def watch_data_version(displayed_version, mode_affichage):
+    """Sonde légère de la version des données, relancée toutes les VERSION_PROBE_INTERVAL secondes.
+
+    Tant que la version affichée est à jour, le fragment ne produit rien : ni rerun
+    complet, ni rendu des cartes et graphiques. Quand elle change, l'application est
+    relancée (la connexion et la saisie en cours sont conservées, contrairement à un
+    rechargement de page) ; seules les cartes dont le contenu a changé sont modifiées
+    côté navigateur. En mode Édition, on se contente de signaler la nouvelle version.
+    """
+    snapshot = get_data_store().snapshot()
+    if snapshot is None or data_version(snapshot) == displayed_version:
+        return
+    if mode_affichage == "Édition":
+        st.caption("🔄 Une nouvelle version des données est disponible : vos modifications seront fusionnées à l'enregistrement.")
+        return
+    st.rerun()
+
 def main():
     # Chargement des données
-    data = load_data()
+    snapshot = load_snapshot()
+    data = snapshot.data if snapshot else None
     
     if not data:
         st.error("Impossible de charger les données. Vérifiez que le fichier filieres_data.json existe.")
         return
     
+    # Stockage momentanément injoignable : la dernière version connue reste affichée
+    if get_data_store().error is not None:
+        st.warning(f"⚠️ Données peut-être obsolètes : le stockage est injoignable ({get_data_store().error}). "
+                   "Les modifications ne pourront pas être enregistrées avant son retour.")
+    
+    # Import initial des événements du document dans le journal (une seule fois)
+    event_log = get_event_log()
+    if event_log is not None:
+        if not event_log.is_seeded():
+            event_log.seed(data.get('filieres', {}))
+        retire_document_events(snapshot)
+    
+    # Conflits de sauvegarde en attente d'arbitrage
+    display_save_conflicts()
+    
     filieres = data.get('filieres', {})
     etats_config = data.get('etats_avancement', {})
     
+    # Une seule feuille de style par page (couleurs des états, images embarquées) :
+    # les cartes n'émettent ensuite que des classes CSS
+    st.html(get_stylesheet(etats_config))
+    
     # Mode d'affichage selection first
     mode_affichage = st.radio(
         "Mode d'affichage",
@@ -412,19 +660,13 @@ def main():
     filtre_responsable = st.sidebar.selectbox("Responsable Pôle Data", responsables_pole_data)
     
     # Filtrage des filières - Common for all modes
-    filieres_filtrees = {}
-    for key, filiere in filieres.items():
-        # Filtre par état
-        if filtre_etat != 'Tous' and filiere.get('etat_avancement') != filtre_etat:
-            continue
-        
-        # Filtre par responsable pôle data
-        if filtre_responsable != 'Tous':
-            responsables_filiere = filiere.get('responsable_pole_data', [])
-            if filtre_responsable not in responsables_filiere:
-                continue
-        
-        filieres_filtrees[key] = filiere
+    # (vue vectorisée sur le modèle en colonnes de la version courante ; sans filtre
+    # actif, ni le modèle en colonnes ni pandas ne sont nécessaires)
+    if filtre_etat == 'Tous' and filtre_responsable == 'Tous':
+        cles_filtrees = list(filieres)
+    else:
+        cles_filtrees = filter_filieres(snapshot.frame, filtre_etat, filtre_responsable)
+    filieres_filtrees = {key: filieres[key] for key in cles_filtrees}
     
     # Show dashboard content only in Cartes mode
     if mode_affichage == "Cartes":
@@ -435,29 +677,26 @@ def main():
         # Statistiques globales
         st.header("📈 Statistiques globales")
         
+        # Agrégats calculés en une passe au chargement de la version courante
+        aggregates = snapshot.aggregates
+        
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total des filières", len(filieres))
+            st.metric("Total des filières", aggregates['nb_filieres'])
         
         with col2:
-            total_testeurs = sum([f.get('nombre_testeurs', 0) for f in filieres.values()])
-            st.metric("Total des testeurs", total_testeurs)
+            st.metric("Total des testeurs", aggregates['total_testeurs'])
         
         with col3:
-            total_laposte_gpt = sum([f.get('acces', {}).get('laposte_gpt', 0) for f in filieres.values()])
-            st.metric("Accès LaPoste GPT", total_laposte_gpt)
+            st.metric("Accès LaPoste GPT", aggregates['total_laposte_gpt'])
         
         with col4:
-            total_copilot = sum([f.get('acces', {}).get('copilot_licences', 0) for f in filieres.values()])
-            st.metric("Licences Copilot", total_copilot)
+            st.metric("Licences Copilot", aggregates['total_copilot'])
         
         # Répartition par état
         st.subheader("🎯 Répartition par état d'avancement")
-        etat_counts = {}
-        for filiere in filieres.values():
-            etat = filiere.get('etat_avancement', 'initialisation')
-            etat_counts[etat] = etat_counts.get(etat, 0) + 1
+        etat_counts = aggregates['etat_counts']
         
         # Mapping des états avec les nouveaux textes
         etats_labels_custom = {
@@ -484,204 +723,29 @@ def main():
         # Pie charts pour les accès aux outils
         st.markdown("### 📊 Répartition des accès aux outils")
         
-        # Préparation des données pour les pie charts
-        laposte_gpt_data = {}
-        copilot_data = {}
-        
-        for key, filiere in filieres_filtrees.items():
-            nom_filiere = filiere.get('nom', 'Filière inconnue')
-            laposte_gpt_count = filiere.get('acces', {}).get('laposte_gpt', 0)
-            copilot_count = filiere.get('acces', {}).get('copilot_licences', 0)
-            
-            if laposte_gpt_count > 0:
-                laposte_gpt_data[nom_filiere] = laposte_gpt_count
-            if copilot_count > 0:
-                copilot_data[nom_filiere] = copilot_count
-        
-        # Palette de couleurs cohérente avec l'application - Version pastel (30% plus claire)
-        def make_pastel(hex_color, lightness_factor=0.3):
-            """Convertit une couleur hex en version pastel"""
-            # Supprimer le # si présent
-            hex_color = hex_color.lstrip('#')
-            
-            # Convertir en RGB
-            r = int(hex_color[0:2], 16)
-            g = int(hex_color[2:4], 16)
-            b = int(hex_color[4:6], 16)
-            
-            # Éclaircir en mélangeant avec du blanc
-            r = int(r + (255 - r) * lightness_factor)
-            g = int(g + (255 - g) * lightness_factor)
-            b = int(b + (255 - b) * lightness_factor)
-            
-            # Reconvertir en hex
-            return f"#{r:02x}{g:02x}{b:02x}"
-        
-        # Palette harmonieuse basée sur les couleurs demandées
-        app_colors = [
-            '#A5D6A7',  # Vert pastel
-            '#87CEEB',  # Bleu ciel
-            '#FFCC80',  # Orange pastel
-            '#F8BBD9',  # Rose pastel (couleur harmonieuse)
-            '#D1C4E9',  # Violet pastel (couleur harmonieuse)
-            '#FFAB91',  # Saumon pastel (couleur harmonieuse)
-            '#80CBC4',  # Turquoise pastel (couleur harmonieuse)
-            '#FFF176',  # Jaune pastel (couleur harmonieuse)
-            '#C8E6C9',  # Vert très clair (variation)
-            '#B3E5FC',  # Bleu très clair (variation)
-            '#FFE0B2',  # Orange très clair (variation)
-            '#E1BEE7',  # Violet très clair (variation)
-            '#FFCDD2',  # Rose très clair (variation)
-            '#B2DFDB',  # Turquoise très clair (variation)
-            '#F0F4C3',  # Jaune très clair (variation)
-            '#DCEDC8',  # Vert lime clair (variation)
-            '#BBDEFB',  # Bleu clair (variation)
-            '#FFECB3',  # Ambre clair (variation)
-            '#F3E5F5',  # Violet très pâle (variation)
-            '#FCE4EC',  # Rose très pâle (variation)
-            '#E0F2F1',  # Turquoise très pâle (variation)
-            '#FFFDE7',  # Jaune très pâle (variation)
-            '#E8F5E8',  # Vert très pâle (variation)
-            '#E3F2FD',  # Bleu très pâle (variation)
-            '#FFF8E1',  # Orange très pâle (variation)
-            '#F9FBE7',  # Lime très pâle (variation)
-            '#FFF3E0',  # Orange doux (variation)
-            '#E8EAF6',  # Indigo pâle (variation)
-            '#FFEBEE',  # Rouge pâle (variation)
-            '#E0F7FA',  # Cyan pâle (variation)
-            '#F1F8E9',  # Vert doux (variation)
-            '#E1F5FE',  # Bleu doux (variation)
-            '#FFF9C4',  # Jaune doux (variation)
-            '#E4C441',  # Doré doux (variation)
-            '#AED581',  # Vert lime doux (variation)
-            '#4FC3F7',  # Bleu vif doux (variation)
-            '#FFB74D',  # Orange vif doux (variation)
-            '#BA68C8',  # Violet vif doux (variation)
-            '#F06292',  # Rose vif doux (variation)
-            '#4DB6AC'   # Turquoise vif doux (variation)
-        ]
-        
-        # Créer un mapping couleur fixe par département pour TOUS les départements
-        tous_departements = set()
-        for key, filiere in filieres_filtrees.items():
-            nom_filiere = filiere.get('nom', 'Filière inconnue')
-            tous_departements.add(nom_filiere)  # Tous les départements, pas seulement ceux avec accès
-        
-        # Trier les départements pour un ordre cohérent
-        departements_ordonnes = sorted(tous_departements)
+        # Créer un mapping couleur fixe par département pour TOUS les départements,
+        # pas seulement ceux avec accès
+        acces = aggregates['acces']
+        tous_departements = {acces[key]['nom'] for key in filieres_filtrees}
         
         # Vérifier qu'il y a assez de couleurs
-        if len(departements_ordonnes) > len(app_colors):
-            st.warning(f"⚠️ Il y a {len(departements_ordonnes)} filières mais seulement {len(app_colors)} couleurs disponibles. Certaines couleurs seront répétées.")
-        
-        # Créer un mapping département -> couleur FIXE pour tous les départements
-        couleur_par_departement = {}
-        for i, dept in enumerate(departements_ordonnes):
-            couleur_par_departement[dept] = app_colors[i % len(app_colors)]
-        
-        # Debug : afficher le mapping (à supprimer après test)
-        # st.write("DEBUG - Mapping couleurs:", couleur_par_departement)
-        
-        # Affichage des pie charts
-        col1, col_divider, col2 = st.columns([5, 1, 5])
+        if len(tous_departements) > len(APP_COLORS):
+            st.warning(f"⚠️ Il y a {len(tous_departements)} filières mais seulement {len(APP_COLORS)} couleurs disponibles. Certaines couleurs seront répétées.")
         
-        with col1:
-            if laposte_gpt_data:
-                if PLOTLY_AVAILABLE:
-                    # Créer un mapping couleur direct pour Plotly
-                    couleurs_laposte = [couleur_par_departement[dept] for dept in laposte_gpt_data.keys()]
-                    
-                    total_laposte_gpt = sum(laposte_gpt_data.values())
-                    fig1 = px.pie(
-                        values=list(laposte_gpt_data.values()),
-                        names=list(laposte_gpt_data.keys()),
-                        title=f"📯 Accès LaPoste GPT <i>(Total : {total_laposte_gpt})</i>"
-                    )
-                    
-                    # Assigner les couleurs manuellement pour chaque segment
-                    fig1.update_traces(
-                        marker=dict(colors=couleurs_laposte)
-                    )
-                    fig1.update_layout(
-                        height=300,
-                        margin=dict(t=50, b=20, l=20, r=20),
-                        font=dict(size=10),
-                        showlegend=True,
-                        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.02)
-                    )
-                    fig1.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig1, use_container_width=True)
-                elif MATPLOTLIB_AVAILABLE:
-                    # Créer la séquence de couleurs pour matplotlib
-                    couleurs_laposte = [couleur_par_departement[dept] for dept in laposte_gpt_data.keys()]
-                    
-                    total_laposte_gpt = sum(laposte_gpt_data.values())
-                    fig, ax = plt.subplots(figsize=(6, 4))
-                    ax.pie(list(laposte_gpt_data.values()), labels=list(laposte_gpt_data.keys()), 
-                           autopct='%1.1f%%', colors=couleurs_laposte)
-                    ax.set_title(f"📯 Accès LaPoste GPT ({total_laposte_gpt} total)", style='italic')
-                    st.pyplot(fig)
-                    plt.close(fig)
-                else:
-                    # Fallback: simple text display
-                    total = sum(laposte_gpt_data.values())
-                    for filiere, count in laposte_gpt_data.items():
-                        percentage = (count / total) * 100
-                        st.write(f"• {filiere}: {count} accès ({percentage:.1f}%)")
-            else:
-                st.info("Aucun accès LaPoste GPT configuré")
+        couleur_par_departement = department_colors(tous_departements)
         
-        with col_divider:
-            # Divider vertical léger
-            st.markdown("""
+        # Affichage des pie charts, séparés par un divider vertical léger
+        widths = [5, 1] * (len(ACCESS_METRICS) - 1) + [5]
+        columns = st.columns(widths)
+        for i, metric in enumerate(ACCESS_METRICS):
+            if i > 0:
+                with columns[2 * i - 1]:
+                    st.markdown("""
             <div style='height: 300px; width: 1px; background-color: #dee2e6; margin: 0 auto;'></div>
             """, unsafe_allow_html=True)
-        
-        with col2:
-            if copilot_data:
-                if PLOTLY_AVAILABLE:
-                    # Créer un mapping couleur direct pour Plotly
-                    couleurs_copilot = [couleur_par_departement[dept] for dept in copilot_data.keys()]
-                    
-                    total_copilot = sum(copilot_data.values())
-                    fig2 = px.pie(
-                        values=list(copilot_data.values()),
-                        names=list(copilot_data.keys()),
-                        title=f"🛩️ Licences Copilot <i>(Total : {total_copilot})</i>"
-                    )
-                    
-                    # Assigner les couleurs manuellement pour chaque segment
-                    fig2.update_traces(
-                        marker=dict(colors=couleurs_copilot)
-                    )
-                    fig2.update_layout(
-                        height=300,
-                        margin=dict(t=50, b=20, l=20, r=20),
-                        font=dict(size=10),
-                        showlegend=True,
-                        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.02)
-                    )
-                    fig2.update_traces(textposition='inside', textinfo='percent+label')
-                    st.plotly_chart(fig2, use_container_width=True)
-                elif MATPLOTLIB_AVAILABLE:
-                    # Créer la séquence de couleurs pour matplotlib
-                    couleurs_copilot = [couleur_par_departement[dept] for dept in copilot_data.keys()]
-                    
-                    total_copilot = sum(copilot_data.values())
-                    fig, ax = plt.subplots(figsize=(6, 4))
-                    ax.pie(list(copilot_data.values()), labels=list(copilot_data.keys()), 
-                           autopct='%1.1f%%', colors=couleurs_copilot)
-                    ax.set_title(f"🛩️ Licences Copilot ({total_copilot} total)", style='italic')
-                    st.pyplot(fig)
-                    plt.close(fig)
-                else:
-                    # Fallback: simple text display
-                    total = sum(copilot_data.values())
-                    for filiere, count in copilot_data.items():
-                        percentage = (count / total) * 100
-                        st.write(f"• {filiere}: {count} licences ({percentage:.1f}%)")
-            else:
-                st.info("Aucune licence Copilot configurée")
+            with columns[2 * i]:
+                display_access_chart(metric, access_series(acces, filieres_filtrees, metric.key),
+                                     couleur_par_departement)
     # No additional setup needed for Edition and Tableau modes - filters are already set up above
     
     # Affichage des fiches
@@ -690,21 +754,10 @@ def main():
         st.write(f"*{len(filieres_filtrees)} filière(s) affichée(s)*")
     
     
-    # Auto-refresh invisible - actualise automatiquement toutes les 15 secondes
-    st.markdown("""
-    <script>
-    setTimeout(function(){
-        window.location.reload();
-    }, 15000);
-    </script>
-    """, unsafe_allow_html=True)
+    # Auto-refresh invisible - relance l'affichage seulement quand les données ont changé
+    watch_data_version(data_version(snapshot), mode_affichage)
     
     if mode_affichage == "Cartes":
-        # Recharge les données pour garantir la fraîcheur
-        data = load_data()
-        filieres = data.get('filieres', {})
-        etats_config = data.get('etats_avancement', {})
-        
         # Mapping des états avec les nouveaux textes
         etats_labels_custom = {
             'prompts_deployes': 'AVANCÉ',
@@ -731,175 +784,62 @@ def main():
         # Ordre des états (du plus avancé au moins avancé)
         ordre_etats = ['prompts_deployes', 'tests_realises', 'en_emergence', 'a_initier']
         
-        # Afficher les filières groupées par état
-        for etat in ordre_etats:
-            if etat in filieres_par_etat and filieres_par_etat[etat]:
-                # En-tête de la section avec couleur
-                etat_info = etats_config.get(etat, {})
-                couleur_bordure = etat_info.get('couleur_bordure', '#dee2e6')
-                
-                st.markdown(
-                    f"""<div style='background-color: {couleur_bordure}; 
-                    color: white; 
-                    padding: 15px; 
-                    border-radius: 10px; 
-                    margin: 20px 0 10px 0;'>
-                    <h3 style='margin: 0; color: white;'>📊 {etats_labels_custom.get(etat, 'État inconnu')}</h3>
-                    <p style='margin: 5px 0 0 0; font-size: 0.9em; color: rgba(255,255,255,0.9);'>
-                    {etats_descriptions.get(etat, '')}
-                    </p>
-                    </div>""", 
-                    unsafe_allow_html=True
-                )
-                
-                # Afficher les cartes de cet état en colonnes
-                cols = st.columns(2, gap="medium")
-                for i, (key, filiere) in enumerate(filieres_par_etat[etat]):
-                    with cols[i % 2]:
-                        display_filiere_card(key, filiere, etats_config)
+        # Pagination : seules les cartes de la page courante sont construites et affichées
+        cartes = [
+            (etat, key, filiere)
+            for etat in ordre_etats
+            for key, filiere in filieres_par_etat.get(etat, [])
+        ]
+        page_cartes = paginate(cartes, "cartes_page", CARDS_PER_PAGE)
+        
+        # Afficher les filières de la page, groupées par état
+        for etat, groupe in groupby(page_cartes, key=lambda carte: carte[0]):
+            # En-tête de la section avec couleur
+            st.markdown(
+                f"""<div class='etat-entete {etat_css_class(etat)}'>
+                <h3>📊 {etats_labels_custom.get(etat, 'État inconnu')}</h3>
+                <p>{etats_descriptions.get(etat, '')}</p>
+                </div>""", 
+                unsafe_allow_html=True
+            )
+            
+            # Afficher les cartes de cet état en colonnes
+            cols = st.columns(2, gap="medium")
+            for i, (_, key, filiere) in enumerate(groupe):
+                with cols[i % 2]:
+                    display_filiere_card(key, filiere, etats_config, snapshot.hashes.get(key))
     
     elif mode_affichage == "Tableau":
-        import pandas as pd
-        # Mapping des états pour le tableau
-        etats_labels_custom = {
-            'prompts_deployes': '🟢 AVANCÉ',
-            'tests_realises': '🔵 INTERMÉDIAIRE',
-            'en_emergence': '🟡 EN ÉMERGENCE',
-            'a_initier': '🔴 À INITIER'
-        }
-        
-        # Ordre de tri des états (du plus avancé au moins avancé)
-        ordre_etats = ['prompts_deployes', 'tests_realises', 'en_emergence', 'a_initier']
-        
-        table_data = []
-        for key, filiere in filieres_filtrees.items():
-            etat = filiere.get('etat_avancement', 'initialisation')
-            table_data.append({
-                'État': etats_labels_custom.get(etat, etat),
-                'Filière': f"{filiere.get('icon', '📁')} {filiere.get('nom', 'Filière')}",
-                'Référent': filiere.get('referent_metier', 'Non défini'),
-                'Référents délégués': filiere.get('nombre_referents_delegues', 0),
-                'Collab. sensibilisés IAGen': filiere.get('nombre_collaborateurs_sensibilises', 0),
-                'Collab. total': filiere.get('nombre_collaborateurs_total', 0),
-                'Niveau autonomie': filiere.get('niveau_autonomie', ''),
-                'Fiches opportunité': filiere.get('fopp_count', 0),
-                'LaPoste GPT': filiere.get('acces', {}).get('laposte_gpt', 0),
-                'Copilot': filiere.get('acces', {}).get('copilot_licences', 0),
-                'ordre_tri': ordre_etats.index(etat) if etat in ordre_etats else 999
-            })
-        if table_data:
-            df = pd.DataFrame(table_data)
+        # Vue filtrée puis triée du modèle en colonnes : pas de reconstruction par rerun
+        table = snapshot.frame.loc[cles_filtrees]
+        if not table.empty:
             # Trier par ordre d'avancement (avancé en haut)
-            df_sorted = df.sort_values(by=['ordre_tri', 'Filière']).drop('ordre_tri', axis=1)
+            df_sorted = sort_for_table(table)
             st.dataframe(
                 df_sorted,
                 use_container_width=True,
                 hide_index=True
             )
-            # Export CSV avec nettoyage des émojis et normalisation des accents
-            def clean_text_for_csv(text):
-                """Nettoie le texte en supprimant les émojis et normalisant les accents pour l'export CSV"""
-                if not isinstance(text, str):
-                    return str(text)
-                
-                # Mapping des émojis vers du texte - patterns complets d'abord
-                emoji_mapping = {
-                    '🟢 AVANCÉ': 'AVANCE',
-                    '🔵 INTERMÉDIAIRE': 'INTERMEDIAIRE', 
-                    '🟡 EN ÉMERGENCE': 'EN_EMERGENCE',
-                    '🔴 À INITIER': 'A_INITIER',
-                    '🟢': 'AVANCE',
-                    '🔵': 'INTERMEDIAIRE', 
-                    '🟡': 'EN_EMERGENCE',
-                    '🔴': 'A_INITIER',
-                    '📁': '',
-                    '📊': '',
-                    '📢': '',
-                    '💰': '',
-                    '⚖️': '',
-                    '🏛️': '',
-                    '🔧': '',
-                    '🏢': '',
-                    '📋': '',
-                    '🎯': '',
-                    '🛡️': '',
-                    '🚀': '',
-                    '🌐': '',
-                    '📱': '',
-                    '🔒': '',
-                    '👥': '',
-                    '🎨': '',
-                    '📈': '',
-                    '🔍': '',
-                    '💡': '',
-                    '🏆': '',
-                    '⚡': '',
-                    '📝': '',
-                    '⚠️': 'ATTENTION',
-                    '❌': 'NON',
-                    '✅': 'OUI',
-                    '❓': 'QUESTION',
-                    '❗': 'IMPORTANT'
-                }
-                
-                # Remplacer les émojis
-                cleaned = text
-                for emoji, replacement in emoji_mapping.items():
-                    cleaned = cleaned.replace(emoji, replacement)
-                
-                # Normaliser les accents pour éviter les problèmes d'encodage
-                import unicodedata
-                # Décomposer les caractères Unicode puis les recomposer
-                cleaned = unicodedata.normalize('NFD', cleaned)
-                cleaned = unicodedata.normalize('NFC', cleaned)
-                
-                # Mapping manuel des caractères problématiques pour CSV
-                accent_mapping = {
-                    'à': 'a', 'á': 'a', 'â': 'a', 'ã': 'a', 'ä': 'a', 'å': 'a',
-                    'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
-                    'ì': 'i', 'í': 'i', 'î': 'i', 'ï': 'i',
-                    'ò': 'o', 'ó': 'o', 'ô': 'o', 'õ': 'o', 'ö': 'o',
-                    'ù': 'u', 'ú': 'u', 'û': 'u', 'ü': 'u',
-                    'ý': 'y', 'ÿ': 'y',
-                    'ç': 'c', 'ñ': 'n',
-                    'À': 'A', 'Á': 'A', 'Â': 'A', 'Ã': 'A', 'Ä': 'A', 'Å': 'A',
-                    'È': 'E', 'É': 'E', 'Ê': 'E', 'Ë': 'E',
-                    'Ì': 'I', 'Í': 'I', 'Î': 'I', 'Ï': 'I',
-                    'Ò': 'O', 'Ó': 'O', 'Ô': 'O', 'Õ': 'O', 'Ö': 'O',
-                    'Ù': 'U', 'Ú': 'U', 'Û': 'U', 'Ü': 'U',
-                    'Ý': 'Y', 'Ÿ': 'Y',
-                    'Ç': 'C', 'Ñ': 'N'
-                }
-                
-                # Remplacer les caractères accentués
-                for accented, plain in accent_mapping.items():
-                    cleaned = cleaned.replace(accented, plain)
-                
-                # Supprimer les caractères spéciaux restants
-                import re
-                cleaned = re.sub(r'[^\w\s\-.,;:()]', '', cleaned)
-                
-                # Nettoyer les espaces multiples
-                cleaned = re.sub(r'\s+', ' ', cleaned).strip()
-                
-                return cleaned
-            
-            # Créer une copie du DataFrame pour l'export
-            df_export = df_sorted.copy()
-            
-            # Nettoyer toutes les colonnes de type string
-            for col in df_export.columns:
-                if df_export[col].dtype == 'object':
-                    df_export[col] = df_export[col].astype(str).apply(clean_text_for_csv)
-            
-            # Utiliser l'encodage latin-1 pour éviter les problèmes d'accents
-            csv = df_export.to_csv(index=False, sep=';', encoding='latin-1', errors='replace')
-            st.download_button(
-                label="📥 Exporter en CSV",
-                data=csv.encode('latin-1'),
-                file_name='filieres_tableau.csv',
-                mime='text/csv'
-            )
+            # Export : le fichier n'est produit qu'au clic, puis mis en cache par version et filtres
+            formats = available_formats()
+            col_format, col_export = st.columns([2, 1])
+            with col_format:
+                format_export = st.selectbox(
+                    "Format d'export",
+                    formats,
+                    format_func=lambda name: EXPORT_FORMATS[name].label,
+                    key="format_export"
+                )
+            export_format = EXPORT_FORMATS[format_export]
+            export_cache = get_export_cache()
+            version = snapshot.version
+            with col_export:
+                st.download_button(
+                    label="📥 Exporter",
+                    data=lambda: export_cache.get(version, df_sorted, format_export),
+                    file_name=export_format.file_name,
+                    mime=export_format.mime
+                )
     
     elif mode_affichage == "Édition":
         # Mode édition
@@ -920,16 +860,21 @@ def main():
             # Interface de navigation
             col1, col2, col3, col4 = st.columns([0.5, 2.5, 4, 0.5])
             
+            # Lot de modifications : les champs modifiés de chaque filière y restent quand on
+            # passe à une autre, puis tout est enregistré en une fois
+            batch = get_edit_batch()
+            
             with col1:
-                if st.button("◀", key="nav_prev", help="Filière précédente"):
-                    st.session_state.filiere_editee_index = (st.session_state.filiere_editee_index - 1) % len(filieres_keys)
-                    st.rerun()
+                st.button("◀", key="nav_prev", help="Filière précédente",
+                          on_click=navigate_edit, args=(filieres_keys, -1))
             
             with col2:
+                # La filière affichée est portée par l'état du sélecteur (modifié aussi par ◀ / ▶)
+                if st.session_state.get("filiere_selectbox") not in filieres_keys:
+                    st.session_state["filiere_selectbox"] = filieres_keys[st.session_state.filiere_editee_index]
                 filiere_a_editer = st.selectbox(
                     "Sélectionnez une filière à éditer",
                     filieres_keys,
-                    index=st.session_state.filiere_editee_index,
                     format_func=lambda x: f"{filieres[x].get('icon', '📁')} {filieres[x].get('nom', 'Filière')}",
                     key="filiere_selectbox"
                 )
@@ -943,13 +888,34 @@ def main():
                 pass
             
             with col4:
-                if st.button("▶", key="nav_next", help="Filière suivante"):
-                    st.session_state.filiere_editee_index = (st.session_state.filiere_editee_index + 1) % len(filieres_keys)
-                    st.rerun()
+                st.button("▶", key="nav_next", help="Filière suivante",
+                          on_click=navigate_edit, args=(filieres_keys, 1))
+            
             
+            if filiere_a_editer and filiere_a_editer not in batch.base.data.get('filieres', {}):
+                if len(batch):
+                    st.info("Cette filière a été ajoutée depuis le début de votre édition : "
+                            "enregistrez ou annulez vos modifications en attente pour l'éditer.")
+                    filiere_a_editer = None
+                else:
+                    del st.session_state["edit_batch"]
+                    batch = get_edit_batch()
             
             if filiere_a_editer:
-                filiere_data = filieres[filiere_a_editer]
+                # Le formulaire est construit à partir de la version de référence du lot ; les
+                # widgets y reportent leurs changements, pour que la sauvegarde ne transmette
+                # que les champs réellement modifiés (les autres restent fusionnables)
+                form = get_edit_form(batch, filiere_a_editer)
+                filiere_data = batch.base.data['filieres'][filiere_a_editer]
+                
+                # Filière modifiée par ailleurs depuis l'ouverture du formulaire
+                live = load_snapshot()
+                if live is not None and live.version != batch.base.version and filiere_a_editer in live.data['filieres']:
+                    live_filiere = live.data['filieres'][filiere_a_editer]
+                    live_values = edit_form_values(live_filiere, get_recent_events(filiere_a_editer, live_filiere)[0])
+                    if content_hash(live_values) != form.hash:
+                        st.caption("🔄 Cette filière a été modifiée depuis l'ouverture du formulaire : "
+                                   "vos changements y seront fusionnés à l'enregistrement.")
                 
                 # Container pour l'édition
                 with st.container(border=True):
@@ -964,81 +930,59 @@ def main():
                     }
                     st.markdown("**🎯 État d'avancement**")
                     
-                    # Boutons colorés pour les états
-                    etat_actuel = filiere_data.get('etat_avancement', 'a_initier')
-                    
-                    # Initialiser l'état dans session_state si pas encore fait
-                    if f"etat_{filiere_a_editer}" not in st.session_state:
-                        st.session_state[f"etat_{filiere_a_editer}"] = etat_actuel
-                    
-                    # L'état sélectionné est celui du session_state (permet la réactivité)
-                    etat_selectionne = st.session_state[f"etat_{filiere_a_editer}"]
+                    # Boutons colorés pour les états ; l'état sélectionné est celui du formulaire
+                    etat_selectionne = form.value('etat_avancement')
                     
                     # Affichage des boutons en ligne avec les couleurs des états
                     col1, col2, col3, col4 = st.columns(4)
                     
                     with col1:
-                        if st.button("🟢 AVANCÉ", 
-                                   type="primary" if etat_selectionne == 'prompts_deployes' else "secondary",
-                                   use_container_width=True,
-                                   key=f"btn_avance_{filiere_a_editer}"):
-                            st.session_state[f"etat_{filiere_a_editer}"] = 'prompts_deployes'
-                            st.rerun()
+                        st.button("🟢 AVANCÉ", 
+                                  type="primary" if etat_selectionne == 'prompts_deployes' else "secondary",
+                                  use_container_width=True,
+                                  key=f"btn_avance_{filiere_a_editer}",
+                                  on_click=choose_etat, args=(filiere_a_editer, 'prompts_deployes'))
                     
                     with col2:
-                        if st.button("🔵 INTERMÉDIAIRE", 
-                                   type="primary" if etat_selectionne == 'tests_realises' else "secondary",
-                                   use_container_width=True,
-                                   key=f"btn_inter_{filiere_a_editer}"):
-                            st.session_state[f"etat_{filiere_a_editer}"] = 'tests_realises'
-                            st.rerun()
+                        st.button("🔵 INTERMÉDIAIRE", 
+                                  type="primary" if etat_selectionne == 'tests_realises' else "secondary",
+                                  use_container_width=True,
+                                  key=f"btn_inter_{filiere_a_editer}",
+                                  on_click=choose_etat, args=(filiere_a_editer, 'tests_realises'))
                     
                     with col3:
-                        if st.button("🟡 EN ÉMERGENCE", 
-                                   type="primary" if etat_selectionne == 'en_emergence' else "secondary",
-                                   use_container_width=True,
-                                   key=f"btn_emergence_{filiere_a_editer}"):
-                            st.session_state[f"etat_{filiere_a_editer}"] = 'en_emergence'
-                            st.rerun()
+                        st.button("🟡 EN ÉMERGENCE", 
+                                  type="primary" if etat_selectionne == 'en_emergence' else "secondary",
+                                  use_container_width=True,
+                                  key=f"btn_emergence_{filiere_a_editer}",
+                                  on_click=choose_etat, args=(filiere_a_editer, 'en_emergence'))
                     
                     with col4:
-                        if st.button("🔴 À INITIER", 
-                                   type="primary" if etat_selectionne == 'a_initier' else "secondary",
-                                   use_container_width=True,
-                                   key=f"btn_initier_{filiere_a_editer}"):
-                            st.session_state[f"etat_{filiere_a_editer}"] = 'a_initier'
-                            st.rerun()
-                    
-                    # L'état pour la sauvegarde
-                    nouvel_etat = st.session_state[f"etat_{filiere_a_editer}"]
+                        st.button("🔴 À INITIER", 
+                                  type="primary" if etat_selectionne == 'a_initier' else "secondary",
+                                  use_container_width=True,
+                                  key=f"btn_initier_{filiere_a_editer}",
+                                  on_click=choose_etat, args=(filiere_a_editer, 'a_initier'))
                     
                     # Responsable Pôle Data - FIRST PARAMETER
                     st.markdown("**👥 Responsable Pôle Data**")
-                    responsables_actuels = filiere_data.get('responsable_pole_data', [])
                     responsables_options = ['Sarah', 'Clara', 'Olivier', 'Mouad', 'Arthur']
                     
-                    nouveaux_responsables = st.multiselect(
+                    st.multiselect(
                         "Sélectionnez les responsables (plusieurs choix possibles)",
                         options=responsables_options,
-                        default=responsables_actuels,
-                        key=f"responsables_{filiere_a_editer}"
+                        default=form.value('responsable_pole_data'),
+                        key=f"responsables_{filiere_a_editer}",
+                        on_change=update_edit_field, args=(filiere_a_editer, "responsables")
                     )
                     
                     # Niveau d'autonomie
-                    options_autonomie = [
-                        "Besoin d'accompagnement faible",
-                        "Besoin d'accompagnement modéré",
-                        "Besoin d'accompagnement fort",
-                        "Besoin d'accompagnement très fort"
-                    ]
-                    valeur_actuelle = filiere_data.get('niveau_autonomie', options_autonomie[0])
-                    if valeur_actuelle not in options_autonomie:
-                        valeur_actuelle = options_autonomie[0]
-                    nouveau_niveau_autonomie = st.selectbox(
+                    st.selectbox(
                         "Niveau d'autonomie",
-                        options_autonomie,
-                        index=options_autonomie.index(valeur_actuelle),
-                        key=f"autonomie_{filiere_a_editer}"
+                        OPTIONS_AUTONOMIE,
+                        index=OPTIONS_AUTONOMIE.index(form.value('niveau_autonomie')),
+                        key=f"autonomie_{filiere_a_editer}",
+                        on_change=update_edit_field, args=(filiere_a_editer, "autonomie")
                     )
                     st.markdown("---")
                     
@@ -1047,66 +991,74 @@ def main():
                         st.markdown("**📝 Informations générales**")
                         
                         # Référent métier
-                        nouveau_referent = st.text_input(
+                        st.text_input(
                             "Référent métier",
-                            value=filiere_data.get('referent_metier', ''),
-                            key=f"ref_{filiere_a_editer}"
+                            value=form.value('referent_metier'),
+                            key=f"ref_{filiere_a_editer}",
+                            on_change=update_edit_field, args=(filiere_a_editer, "ref")
                         )
                         
                         # Nombre de collaborateurs sensibilisés à l'IAGen
                         col_collab1, col_collab2 = st.columns([3, 1])
                         with col_collab1:
-                            nouveau_nb_collab_sensibilises = st.number_input(
+                            st.number_input(
                                 "Nombre de collaborateurs sensibilisés à l'IAGen",
                                 min_value=0,
-                                value=filiere_data.get('nombre_collaborateurs_sensibilises', 0),
-                                key=f"collabIAGen_{filiere_a_editer}"
+                                value=form.value('nombre_collaborateurs_sensibilises'),
+                                key=f"collabIAGen_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "collabIAGen")
                             )
                         with col_collab2:
-                            collab_sens_approx = st.checkbox(
+                            st.checkbox(
                                 "Approximatif",
-                                value=filiere_data.get('nombre_collaborateurs_sensibilises_approx', False),
-                                key=f"collabIAGen_approx_{filiere_a_editer}"
+                                value=form.value('nombre_collaborateurs_sensibilises_approx'),
+                                key=f"collabIAGen_approx_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "collabIAGen_approx")
                             )
                         
                         # Nombre de référents métier délégués
                         col_ref_del1, col_ref_del2 = st.columns([3, 1])
                         with col_ref_del1:
-                            nouveau_nb_referents_delegues = st.number_input(
+                            st.number_input(
                                 "Nombre de référents métier délégués",
                                 min_value=0,
-                                value=filiere_data.get('nombre_referents_delegues', 0),
-                                key=f"refdelegues_{filiere_a_editer}"
+                                value=form.value('nombre_referents_delegues'),
+                                key=f"refdelegues_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "refdelegues")
                             )
                         with col_ref_del2:
-                            ref_del_approx = st.checkbox(
+                            st.checkbox(
                                 "Approximatif",
-                                value=filiere_data.get('nombre_referents_delegues_approx', False),
-                                key=f"refdelegues_approx_{filiere_a_editer}"
+                                value=form.value('nombre_referents_delegues_approx'),
+                                key=f"refdelegues_approx_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "refdelegues_approx")
                             )
                         
                         # Nombre total de collaborateurs dans la filière
-                        nouveau_nb_collab_total = st.number_input(
+                        st.number_input(
                             "Nombre total de collaborateurs dans la filière",
                             min_value=0,
-                            value=filiere_data.get('nombre_collaborateurs_total', 0),
-                            key=f"collabTotal_{filiere_a_editer}"
+                            value=form.value('nombre_collaborateurs_total'),
+                            key=f"collabTotal_{filiere_a_editer}",
+                            on_change=update_edit_field, args=(filiere_a_editer, "collabTotal")
                         )
                         
                         # Nombre de fiches d'opportunité
                         col_fopp1, col_fopp2 = st.columns([3, 1])
                         with col_fopp1:
-                            nouveau_fopp_count = st.number_input(
+                            st.number_input(
                                 "Nombre de fiches d'opportunité",
                                 min_value=0,
-                                value=filiere_data.get('fopp_count', 0),
-                                key=f"fopp_{filiere_a_editer}"
+                                value=form.value('fopp_count'),
+                                key=f"fopp_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "fopp")
                             )
                         with col_fopp2:
-                            fopp_approx = st.checkbox(
+                            st.checkbox(
                                 "Approximatif",
-                                value=filiere_data.get('fopp_count_approx', False),
-                                key=f"fopp_approx_{filiere_a_editer}"
+                                value=form.value('fopp_count_approx'),
+                                key=f"fopp_approx_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "fopp_approx")
                             )
                     
                     with col2:
@@ -1115,72 +1067,70 @@ def main():
                         # Accès LaPoste GPT
                         col_gpt1, col_gpt2 = st.columns([3, 1])
                         with col_gpt1:
-                            nouveau_laposte_gpt = st.number_input(
+                            st.number_input(
                                 "Accès LaPoste GPT",
                                 min_value=0,
-                                value=filiere_data.get('acces', {}).get('laposte_gpt', 0),
-                                key=f"gpt_{filiere_a_editer}"
+                                value=form.value('acces.laposte_gpt'),
+                                key=f"gpt_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "gpt")
                             )
                         with col_gpt2:
-                            laposte_gpt_approx = st.checkbox(
+                            st.checkbox(
                                 "Approximatif",
-                                value=filiere_data.get('acces', {}).get('laposte_gpt_approx', False),
-                                key=f"gpt_approx_{filiere_a_editer}"
+                                value=form.value('acces.laposte_gpt_approx'),
+                                key=f"gpt_approx_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "gpt_approx")
                             )
                         
                         # Licences Copilot
                         col_copilot1, col_copilot2 = st.columns([3, 1])
                         with col_copilot1:
-                            nouvelles_licences = st.number_input(
+                            st.number_input(
                                 "Licences Copilot",
                                 min_value=0,
-                                value=filiere_data.get('acces', {}).get('copilot_licences', 0),
-                                key=f"copilot_{filiere_a_editer}"
+                                value=form.value('acces.copilot_licences'),
+                                key=f"copilot_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "copilot")
                             )
                         with col_copilot2:
-                            copilot_approx = st.checkbox(
+                            st.checkbox(
                                 "Approximatif",
-                                value=filiere_data.get('acces', {}).get('copilot_licences_approx', False),
-                                key=f"copilot_approx_{filiere_a_editer}"
+                                value=form.value('acces.copilot_licences_approx'),
+                                key=f"copilot_approx_{filiere_a_editer}",
+                                on_change=update_edit_field, args=(filiere_a_editer, "copilot_approx")
                             )
                     
                     # Point d'attention
                     st.markdown("**⚠️ Points d'attention**")
-                    nouveau_point_attention = st.text_area(
+                    st.text_area(
                         "Points d'attention (un par ligne)",
-                        value=filiere_data.get('point_attention', ''),
+                        value=form.value('point_attention'),
                         height=80,
                         placeholder="Décrivez les points nécessitant une attention particulière...",
-                        key=f"attention_{filiere_a_editer}"
+                        key=f"attention_{filiere_a_editer}",
+                        on_change=update_edit_field, args=(filiere_a_editer, "attention")
                     )
                     
                     # Usages phares
                     st.markdown("**🌟 Usages phares**")
-                    usages_actuels = filiere_data.get('usages_phares', [])
-                    usages_text = '\n'.join(usages_actuels)
-                    
-                    nouveaux_usages_text = st.text_area(
+                    st.text_area(
                         "Usages phares (un par ligne)",
-                        value=usages_text,
+                        value='\n'.join(form.value('usages_phares')),
                         height=100,
                         help="Entrez un usage phare par ligne",
-                        key=f"usages_{filiere_a_editer}"
+                        key=f"usages_{filiere_a_editer}",
+                        on_change=update_edit_field, args=(filiere_a_editer, "usages")
                     )
                     
                     # Événements récents
                     st.markdown("**📅 Événements récents**")
-                    evenements_actuels = filiere_data.get('evenements_recents', [])
-                    
-                    evenements_text = ""
-                    for event in evenements_actuels:
-                        evenements_text += f"{event.get('date', '')};{event.get('titre', '')};{event.get('description', '')}\n"
-                    
-                    nouveaux_evenements_text = st.text_area(
+                    st.text_area(
                         "Événements récents (format: date;titre;description)",
-                        value=evenements_text,
+                        value=events_to_text(form.value(EVENTS_FIELD)),
                         height=120,
                         help="Format: YYYY-MM-DD;Titre de l'événement;Description détaillée",
-                        key=f"events_{filiere_a_editer}"
+                        key=f"events_{filiere_a_editer}",
+                        on_change=update_edit_field, args=(filiere_a_editer, "events")
                     )
                     
                     # Bouton de sauvegarde centré et toujours visible
@@ -1191,81 +1141,19 @@ def main():
                                                type="primary", 
                                                use_container_width=True,
                                                key="save_button_main")
-                    
-                    # Marquer les changements seulement si les valeurs ont vraiment changé
-                    def check_if_changed():
-                        # Vérifier les usages phares
-                        usages_originaux = '\n'.join(filiere_data.get('usages_phares', []))
-                        usages_session = st.session_state.get(f"usages_{filiere_a_editer}", usages_originaux)
-                        
-                        # Vérifier les événements récents
-                        events_originaux = []
-                        for event in filiere_data.get('evenements_recents', []):
-                            events_originaux.append(f"{event.get('date', '')};{event.get('titre', '')};{event.get('description', '')}")
-                        events_text_original = '\n'.join(events_originaux)
-                        events_session = st.session_state.get(f"events_{filiere_a_editer}", events_text_original)
-                        
-                        return (
-                            st.session_state.get(f"ref_{filiere_a_editer}", "") != filiere_data.get('referent_metier', '') or
-                            st.session_state.get(f"refdelegues_{filiere_a_editer}", 0) != filiere_data.get('nombre_referents_delegues', 0) or
-                            st.session_state.get(f"collabIAGen_{filiere_a_editer}", 0) != filiere_data.get('nombre_collaborateurs_sensibilises', 0) or
-                            st.session_state.get(f"collabTotal_{filiere_a_editer}", 0) != filiere_data.get('nombre_collaborateurs_total', 0) or
-                            st.session_state.get(f"autonomie_{filiere_a_editer}", "") != filiere_data.get('niveau_autonomie', '') or
-                            st.session_state.get(f"fopp_{filiere_a_editer}", 0) != filiere_data.get('fopp_count', 0) or
-                            st.session_state.get(f"etat_{filiere_a_editer}", "") != filiere_data.get('etat_avancement', '') or
-                            st.session_state.get(f"gpt_{filiere_a_editer}", 0) != filiere_data.get('acces', {}).get('laposte_gpt', 0) or
-                            st.session_state.get(f"copilot_{filiere_a_editer}", 0) != filiere_data.get('acces', {}).get('copilot_licences', 0) or
-                            st.session_state.get(f"attention_{filiere_a_editer}", "") != filiere_data.get('point_attention', '') or
-                            st.session_state.get(f"refdelegues_approx_{filiere_a_editer}", False) != filiere_data.get('nombre_referents_delegues_approx', False) or
-                            st.session_state.get(f"collabIAGen_approx_{filiere_a_editer}", False) != filiere_data.get('nombre_collaborateurs_sensibilises_approx', False) or
-                            st.session_state.get(f"fopp_approx_{filiere_a_editer}", False) != filiere_data.get('fopp_count_approx', False) or
-                            st.session_state.get(f"gpt_approx_{filiere_a_editer}", False) != filiere_data.get('acces', {}).get('laposte_gpt_approx', False) or
-                            st.session_state.get(f"copilot_approx_{filiere_a_editer}", False) != filiere_data.get('acces', {}).get('copilot_licences_approx', False) or
-                            usages_session != usages_originaux or
-                            events_session != events_text_original
+                    if len(batch):
+                        noms = ", ".join(
+                            (f"{filieres[key].get('icon', '📁')} {filieres[key].get('nom', key)}" if key in filieres else key)
+                            + f" ({len(batch.forms[key].changed)} champ(s))"
+                            for key in batch.keys()
                         )
+                        st.caption(f"📝 Modifications en attente ({len(batch)} filière(s)) : {noms}")
+                        st.button("↩️ Annuler les modifications en attente", key="discard_batch",
+                                  on_click=discard_edit_batch)
                     
-                    
-                    # Sauvegarde uniquement quand le bouton est cliqué
+                    # Sauvegarde de tout le lot, uniquement quand le bouton est cliqué
                     if save_clicked:
-                            # Convertir les données
-                            nouveaux_usages = [usage.strip() for usage in nouveaux_usages_text.split('\n') if usage.strip()]
-                            
-                            nouveaux_evenements = []
-                            for ligne in nouveaux_evenements_text.split('\n'):
-                                if ligne.strip():
-                                    parties = ligne.split(';')
-                                    if len(parties) >= 3:
-                                        nouveaux_evenements.append({
-                                            'date': parties[0].strip(),
-                                            'titre': parties[1].strip(),
-                                            'description': parties[2].strip()
-                                        })
-                            
-                            # Mise à jour explicite de tous les champs dans la filière
-                            filiere = migrate_filiere_fields(filieres[filiere_a_editer])
-                            filiere['referent_metier'] = nouveau_referent
-                            filiere['nombre_referents_delegues'] = nouveau_nb_referents_delegues
-                            filiere['nombre_collaborateurs_sensibilises'] = nouveau_nb_collab_sensibilises
-                            filiere['nombre_collaborateurs_total'] = nouveau_nb_collab_total
-                            filiere['niveau_autonomie'] = nouveau_niveau_autonomie
-                            filiere['fopp_count'] = nouveau_fopp_count
-                            filiere['etat_avancement'] = nouvel_etat
-                            filiere['acces']['laposte_gpt'] = nouveau_laposte_gpt
-                            filiere['acces']['copilot_licences'] = nouvelles_licences
-                            filiere['point_attention'] = nouveau_point_attention
-                            filiere['usages_phares'] = nouveaux_usages
-                            filiere['evenements_recents'] = nouveaux_evenements
-                            filiere['responsable_pole_data'] = nouveaux_responsables
-                            # Sauvegarder les champs approximatifs
-                            filiere['nombre_referents_delegues_approx'] = ref_del_approx
-                            filiere['nombre_collaborateurs_sensibilises_approx'] = collab_sens_approx
-                            filiere['fopp_count_approx'] = fopp_approx
-                            filiere['acces']['laposte_gpt_approx'] = laposte_gpt_approx
-                            filiere['acces']['copilot_licences_approx'] = copilot_approx
-                            
-                            # Sauvegarde
-                            if save_data(data):
+                            if commit_edit_batch(batch):
                                 # Message de succès temporaire avec timestamp
                                 st.session_state["success_message"] = True
                                 st.session_state["success_timestamp"] = datetime.now().timestamp()
@@ -0,0 +1,52 @@
+"""Images embarquées dans les pages (icônes), résolues par rapport au dépôt et encodées une seule fois."""
+import base64
+import os
+from collections import namedtuple
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ``css_class`` : classe CSS qui affiche l'image ; ``fallback`` : texte utilisé si le
+# fichier est absent ou illisible
+Asset = namedtuple("Asset", ["filename", "mime", "css_class", "width", "height", "fallback"])
+
+ASSETS = {
+    'approx': Asset("is-approximately-equal-to.png", "image/png", "icon-approx", 16, 16, '≈ '),
+}
+
+
+class AssetManager:
+    """Charge chaque image une fois et l'expose sous forme de classe CSS.
+
+    Le contenu encodé en base64 n'apparaît qu'une fois, dans ``stylesheet()`` ; les
+    fragments HTML n'utilisent que la balise courte retournée par ``html()``.
+    """
+
+    def __init__(self, assets=ASSETS, base_dir=ASSETS_DIR):
+        self.assets = assets
+        self.data_uris = {}
+        for name, asset in assets.items():
+            try:
+                with open(os.path.join(base_dir, asset.filename), 'rb') as f:
+                    payload = base64.b64encode(f.read()).decode()
+            except OSError:
+                continue
+            self.data_uris[name] = f"data:{asset.mime};base64,{payload}"
+
+    def html(self, name):
+        """Balise affichant l'image ``name`` (ou son texte de repli si elle n'a pas pu être chargée)."""
+        asset = self.assets[name]
+        if name not in self.data_uris:
+            return asset.fallback
+        return f'<span class="{asset.css_class}"></span>'
+
+    def stylesheet(self):
+        """Feuille de style définissant une classe par image chargée (à injecter une fois par page)."""
+        rules = []
+        for name, data_uri in self.data_uris.items():
+            asset = self.assets[name]
+            rules.append(
+                f".{asset.css_class} {{ display: inline-block; width: {asset.width}px; height: {asset.height}px; "
+                f"background: url('{data_uri}') center / contain no-repeat; "
+                f"vertical-align: middle; margin-right: 4px; }}"
+            )
+        return "<style>\n" + "\n".join(rules) + "\n</style>" if rules else ""
@@ -0,0 +1,69 @@
+"""Benchmark du nettoyage CSV : fonction appliquée cellule par cellule vs version vectorisée.
+
+Usage : python benchmarks/bench_csv_export.py [nombre_de_lignes]
+"""
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from export import clean_frame_for_csv, clean_text_for_csv  # noqa: E402
+
+ETATS = ['🟢 AVANCÉ', '🔵 INTERMÉDIAIRE', '🟡 EN ÉMERGENCE', '🔴 À INITIER']
+ICONES = ['📁', '📊', '📢', '💰', '⚖️', '🏛️', '🔧', '🛡️', '🚀', '⚠️']
+MOTS = ['Filière', 'Sécurité', 'Conformité', 'Données', 'Ingénierie', 'Réseau', 'Éditique', 'Bâtiment']
+AUTONOMIE = ["Besoin d'accompagnement faible", "Besoin d'accompagnement modéré",
+             "Besoin d'accompagnement fort", "Besoin d'accompagnement très fort"]
+
+
+def synthetic_table(rows, seed=0):
+    """Tableau de même forme que la vue Tableau, avec émojis et accents."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        'État': [rng.choice(ETATS) for _ in range(rows)],
+        'Filière': [f"{rng.choice(ICONES)} {rng.choice(MOTS)} {i}" for i in range(rows)],
+        'Référent': [f"{rng.choice(MOTS)}  Référent-{i} ✅" for i in range(rows)],
+        'Référents délégués': [rng.randint(0, 20) for _ in range(rows)],
+        'Niveau autonomie': [rng.choice(AUTONOMIE) for _ in range(rows)],
+        'LaPoste GPT': [rng.randint(0, 500) for _ in range(rows)],
+    })
+
+
+def clean_frame_per_cell(df):
+    """Nettoyage d'origine : ``clean_text_for_csv`` appliqué à chaque cellule."""
+    df_export = df.copy()
+    for col in df_export.columns:
+        if pd.api.types.is_object_dtype(df_export[col]) or pd.api.types.is_string_dtype(df_export[col]):
+            df_export[col] = df_export[col].astype(str).apply(clean_text_for_csv)
+    return df_export
+
+
+def best_of(func, df, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = synthetic_table(rows)
+    per_cell, expected = best_of(clean_frame_per_cell, df)
+    vectorised, result = best_of(clean_frame_for_csv, df)
+    identical = (expected.to_csv(index=False, sep=';').encode('latin-1', errors='replace')
+                 == result.to_csv(index=False, sep=';').encode('latin-1', errors='replace'))
+    print(f"{rows} lignes")
+    print(f"  cellule par cellule : {per_cell:.3f} s")
+    print(f"  vectorisé           : {vectorised:.3f} s (x{per_cell / vectorised:.1f})")
+    print(f"  sortie identique    : {identical}")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Benchmark du démarrage à froid : temps d'import et du premier rendu pour chaque mode.
+
+Chaque mode est mesuré dans un interpréteur neuf (comme un conteneur qui démarre),
+avec le backend local sur une copie de ``filieres_data.json``. Le rapport indique
+aussi quelles bibliothèques lourdes l'application a chargées (hors celles déjà
+importées par ``streamlit.testing``).
+
+Usage : python benchmarks/bench_startup.py
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["Cartes", "Tableau", "Édition"]
+HEAVY_MODULES = ["pandas", "plotly", "matplotlib"]
+
+
+def measure(mode):
+    """Exécuté dans le sous-processus : mesure un démarrage à froid dans ``mode``."""
+    sys.path.insert(0, REPO_DIR)
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_streamlit = time.perf_counter() - start
+    # Certaines bibliothèques peuvent être chargées par le harnais de test lui-même
+    preloaded = {name for name in HEAVY_MODULES if name in sys.modules}
+
+    start = time.perf_counter()
+    import cards, charts, export, filieres_model, shared_store, storage  # noqa: F401,E401
+    import_app = time.perf_counter() - start
+
+    at = AppTest.from_file(os.path.join(REPO_DIR, "app_filieres.py"), default_timeout=120)
+    at.session_state["mode_affichage_radio"] = mode
+    start = time.perf_counter()
+    at.run()
+    first_render = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "import_streamlit": import_streamlit,
+        "import_app": import_app,
+        "first_render": first_render,
+        "exceptions": [e.value for e in at.exception],
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules and name not in preloaded],
+    }
+
+
+def run_mode(mode, data_path):
+    env = dict(os.environ, STORAGE_BACKEND="local", LOCAL_DATA_PATH=data_path)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode],
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_path = os.path.join(tmp_dir, "filieres_data.json")
+        shutil.copy(os.path.join(REPO_DIR, "filieres_data.json"), data_path)
+        results = [run_mode(mode, data_path) for mode in MODES]
+
+    print(f"{'Mode':<10}{'import streamlit':>18}{'import app':>12}{'1er rendu':>12}  bibliothèques chargées")
+    for r in results:
+        print(f"{r['mode']:<10}{r['import_streamlit']:>17.3f}s{r['import_app']:>11.3f}s"
+              f"{r['first_render']:>11.3f}s  {', '.join(r['loaded']) or '-'}")
+        if r["exceptions"]:
+            print(f"  exceptions : {r['exceptions']}")
+    return 1 if any(r["exceptions"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        print(json.dumps(measure(sys.argv[2])))
+        sys.exit(0)
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Suite de benchmarks du traitement des données à l'échelle, avec référence enregistrée.
+
+Pour chaque taille, un document synthétique (``synthetic_data.py``) passe par les étapes
+exécutées à chaque nouvelle version des données ou à chaque rerun :
+
+- ``parse`` : ``parse_document`` (``json.loads`` + migration) du contenu sérialisé ;
+- ``migrate`` : ``migrate_document`` seul, sur un document déjà décodé ;
+- ``hashes`` : empreinte de chaque filière (``content_hash``, caches des cartes) ;
+- ``aggregates`` : ``compute_aggregates`` ;
+- ``frame`` : ``build_filieres_frame`` (modèle en colonnes du Tableau) ;
+- ``filter`` : ``filter_filieres`` avec filtres d'état et de responsable ;
+- ``cards`` : ``build_card_html`` de toutes les filières (caches vides) ;
+- ``events_html`` : ``build_event_html`` des événements affichés par carte ;
+- ``sort`` : ``sort_for_table`` ;
+- ``clean_csv`` : ``clean_frame_for_csv`` du tableau trié ;
+- ``export_csv`` : ``export_table`` au format CSV latin-1.
+
+Chaque étape est mesurée au meilleur de N répétitions. Les résultats sont comparés à
+``baselines.json`` (enregistré avec ``--save-baseline``, propre à la machine qui l'a
+produit) : une étape est en régression si elle est plus lente que la référence de plus
+de ``--tolerance`` et d'au moins ``--min-delta`` secondes. Le code de sortie vaut 1 en
+cas de régression, et 2 si la référence a été produite sur d'autres données (``--events``,
+``--seed``) : elle ne peut alors pas servir. Le nombre de répétitions ne change que la
+précision des mesures, il peut différer de celui de la référence.
+
+Usage : python benchmarks/bench_suite.py [--sizes 10 1000 10000] [--events 20] [--repeat 3]
+                                         [--save-baseline] [--output resultats.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from assets import AssetManager  # noqa: E402
+from cards import build_card_html, build_event_html  # noqa: E402
+from export import clean_frame_for_csv, export_table  # noqa: E402
+from filieres_model import (  # noqa: E402
+    build_filieres_frame, compute_aggregates, content_hash, filter_filieres, migrate_document,
+    parse_document, sort_for_table,
+)
+from storage import dump_document  # noqa: E402
+from synthetic_data import generate_document  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+# Réglages qui déterminent les données mesurées : ils doivent être ceux de la référence
+COMPARED_CONFIG = ('events', 'seed')
+DEFAULT_SIZES = [10, 1000, 10000]
+# Événements affichés par carte avant « Afficher les événements plus anciens » (EVENTS_PER_PAGE)
+EVENTS_PER_CARD = 5
+
+
+def best_of(func, setup=None, repeat=3):
+    """Meilleur temps de ``func(setup())`` sur ``repeat`` essais (``setup`` n'est pas chronométré)."""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        # Le ramasse-miettes ne se déclenche pas au milieu d'une mesure à cause de la précédente
+        gc.collect()
+        start = time.perf_counter()
+        func(arg) if setup else func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_size(size, events, seed, repeat):
+    """Temps (en secondes) de chaque étape pour un document de ``size`` filières."""
+    document = generate_document(size, events, seed)
+    content = dump_document(document)
+    filieres = parse_document(content)['filieres']
+    etats_config = document['etats_avancement']
+    approx = AssetManager().html('approx')
+    frame = build_filieres_frame(filieres)
+    table = sort_for_table(frame)
+
+    stages = {
+        'parse': (lambda: parse_document(content), None),
+        'migrate': (migrate_document, lambda: json.loads(content)),
+        'hashes': (lambda: {key: content_hash(f) for key, f in filieres.items()}, None),
+        'aggregates': (lambda: compute_aggregates(filieres), None),
+        'frame': (lambda: build_filieres_frame(filieres), None),
+        'filter': (lambda: filter_filieres(frame, 'tests_realises', 'Sarah'), None),
+        'cards': (lambda: [build_card_html(f, etats_config.get(f.get('etat_avancement'), {}), approx)
+                           for f in filieres.values()], None),
+        'events_html': (lambda: [build_event_html(event) for f in filieres.values()
+                                 for event in f['evenements_recents'][:EVENTS_PER_CARD]], None),
+        'sort': (lambda: sort_for_table(frame), None),
+        'clean_csv': (lambda: clean_frame_for_csv(table), None),
+        'export_csv': (lambda: export_table(table, 'csv'), None),
+    }
+    return {
+        'content_bytes': len(content.encode('utf-8')),
+        'events': sum(len(f['evenements_recents']) for f in filieres.values()),
+        'timings': {name: best_of(func, setup, repeat) for name, (func, setup) in stages.items()},
+    }
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """Étapes plus lentes que la référence : liste de (taille, étape, temps, référence)."""
+    regressions = []
+    for size, result in results.items():
+        reference = baseline.get('results', {}).get(size)
+        if reference is None:
+            continue
+        for stage, seconds in result['timings'].items():
+            base = reference['timings'].get(stage)
+            if base is not None and seconds > base * (1 + tolerance) and seconds - base >= min_delta:
+                regressions.append((size, stage, seconds, base))
+    return regressions
+
+
+def print_results(results, baseline):
+    sizes = list(results)
+    print(f"{'étape':<12}" + "".join(f"{size + ' filières':>24}" for size in sizes))
+    for stage in next(iter(results.values()))['timings']:
+        cells = []
+        for size in sizes:
+            seconds = results[size]['timings'][stage]
+            base = baseline.get('results', {}).get(size, {}).get('timings', {}).get(stage) if baseline else None
+            ratio = f" (x{seconds / base:.2f})" if base else ""
+            cells.append(f"{seconds * 1000:.1f} ms{ratio}")
+        print(f"{stage:<12}" + "".join(f"{cell:>24}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du traitement des filières à l'échelle.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="nombres de filières")
+    parser.add_argument("--events", type=int, default=20, help="nombre moyen d'événements par filière")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="fichier de référence")
+    parser.add_argument("--save-baseline", action="store_true", help="enregistre les résultats comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="ralentissement relatif toléré")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="écart minimal signalé (s)")
+    parser.add_argument("-o", "--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    results = {str(size): run_size(size, args.events, args.seed, max(1, args.repeat)) for size in args.sizes}
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.machine(), 'pandas': pd.__version__},
+        'config': {'events': args.events, 'seed': args.seed, 'repeat': args.repeat},
+        'results': results,
+    }
+
+    baseline, unusable = None, None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        config = baseline.get('config', {})
+        if any(config.get(key) != report['config'][key] for key in COMPARED_CONFIG):
+            unusable, baseline = config, None
+
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Référence enregistrée : {args.baseline}")
+        return 0
+    if unusable is not None:
+        # Pas de détection de régression possible : ce n'est pas un succès
+        print(f"Référence inutilisable : données différentes ({unusable}) ; relancez avec "
+              f"les mêmes --events/--seed ou enregistrez une nouvelle référence", file=sys.stderr)
+        return 2
+    if baseline is None:
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    for size, stage, seconds, base in regressions:
+        print(f"RÉGRESSION {stage} ({size} filières) : {seconds * 1000:.1f} ms contre {base * 1000:.1f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""Serveur HTTP local imitant l'API Gist de GitHub, pour tester et mesurer le backend gist.
+
+Implémente ``GET /gists/<id>`` (avec ``If-None-Match`` → 304), ``GET /gists/<id>/<version>``
+et ``PATCH /gists/<id>`` : chaque PATCH crée une nouvelle version, dont l'empreinte sert
+d'ETag ; comme sur GitHub, les fichiers absents du PATCH sont gardés. Comme GitHub, les 304 ne sont pas décomptés du quota d'API, renvoyé dans les
+en-têtes ``X-RateLimit-*`` ; un quota épuisé répond 403 jusqu'à sa réinitialisation.
+La latence et une proportion de réponses en erreur sont réglables.
+
+L'application s'y connecte avec les réglages GIST_API_URL (URL affichée au démarrage),
+GITHUB_PAT (valeur quelconque) et SNAPSHOT_DIR (pour ne pas toucher à l'instantané réel).
+
+Usage : python benchmarks/gist_stub.py [--port 8765] [--latency 0.1] [--error-rate 0.05]
+                                       [--rate-limit 5000] [--data filieres_data.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from gist_client import DEFAULT_FILENAME, DEFAULT_GIST_ID  # noqa: E402
+
+
+class GistStub:
+    """Gist en mémoire servi sur ``127.0.0.1``, avec historique des versions et compteurs.
+
+    ``latency`` (+ jusqu'à ``jitter``) secondes d'attente avant chaque réponse ;
+    ``error_rate`` : proportion de réponses ``error_status`` ; ``rate_limit`` requêtes
+    décomptées par fenêtre de ``window`` secondes.
+    """
+
+    def __init__(self, content, gist_id=DEFAULT_GIST_ID, filename=DEFAULT_FILENAME, latency=0.0,
+                 jitter=0.0, error_rate=0.0, error_status=503, rate_limit=5000, window=3600, seed=None):
+        self.gist_id = gist_id
+        self.filename = filename
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.window = window
+        self.random = random.Random(seed)
+        # Versions du plus ancien au plus récent : (empreinte, date, {fichier: contenu})
+        self.history = []
+        self.counts = Counter()
+        self.started_at = None
+        self.server = None
+        self._used = 0
+        self._reset_at = time.time() + window
+        self._lock = threading.Lock()
+        self._commit({filename: content})
+
+    @property
+    def url(self):
+        """Gabarit d'URL à passer dans GIST_API_URL."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/gists/{{gist_id}}"
+
+    @property
+    def content(self):
+        """Contenu du fichier principal à la dernière version."""
+        return self.history[-1][2][self.filename]
+
+    def _commit(self, files):
+        files = dict(self.history[-1][2], **files) if self.history else files
+        version = hashlib.sha1(f"{len(self.history)}:{json.dumps(files, sort_keys=True)}".encode()).hexdigest()
+        self.history.append((version, datetime.now(timezone.utc).isoformat(timespec="seconds"), files))
+        return version
+
+    def _take_quota(self):
+        """Décompte une requête ; retourne False si le quota est épuisé (appelé sous verrou)."""
+        if time.time() >= self._reset_at:
+            self._used = 0
+            self._reset_at = time.time() + self.window
+        if self._used >= self.rate_limit:
+            return False
+        self._used += 1
+        return True
+
+    def rate_limit_headers(self):
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(0, self.rate_limit - self._used)),
+            "X-RateLimit-Used": str(self._used),
+            "X-RateLimit-Reset": str(int(self._reset_at)),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def gist_json(self, index=-1):
+        version, committed_at, files = self.history[index]
+        return {
+            "id": self.gist_id,
+            "files": {name: {"filename": name, "content": content, "size": len(content.encode()), "truncated": False}
+                      for name, content in files.items()},
+            "history": [{"version": v, "committed_at": date} for v, date, _ in reversed(self.history)],
+            "updated_at": committed_at,
+        }, f'W/"{version}"'
+
+    def handle(self, method, path, headers, body):
+        """Traite une requête ; retourne ``(statut, en-têtes, corps JSON ou None)``."""
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        match = re.fullmatch(r"/gists/([^/]+)(?:/([0-9a-f]+))?", path.split("?")[0])
+        with self._lock:
+            if match is None or match.group(1) != self.gist_id:
+                return self._reply(method, 404, {}, {"message": "Not Found"})
+            if self.error_rate and self.random.random() < self.error_rate:
+                return self._reply(method, self.error_status, {}, {"message": "Server Error"})
+            if method == "GET":
+                index = -1
+                if match.group(2):
+                    versions = [v for v, _, _ in self.history]
+                    if match.group(2) not in versions:
+                        return self._reply(method, 404, {}, {"message": "Not Found"})
+                    index = versions.index(match.group(2))
+                gist, etag = self.gist_json(index)
+                if headers.get("If-None-Match") == etag:
+                    # Requête conditionnelle satisfaite : non décomptée du quota
+                    return self._reply(method, 304, {"ETag": etag}, None)
+                if not self._take_quota():
+                    return self._rate_limited(method)
+                return self._reply(method, 200, {"ETag": etag}, gist)
+            if method == "PATCH":
+                if not headers.get("Authorization"):
+                    return self._reply(method, 401, {}, {"message": "Requires authentication"})
+                if not self._take_quota():
+                    return self._rate_limited(method)
+                try:
+                    files = {name: f["content"] for name, f in json.loads(body)["files"].items()}
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    return self._reply(method, 422, {}, {"message": "Validation Failed"})
+                self._commit(files)
+                gist, etag = self.gist_json()
+                return self._reply(method, 200, {"ETag": etag}, gist)
+            return self._reply(method, 405, {}, {"message": "Method Not Allowed"})
+
+    def _rate_limited(self, method):
+        return self._reply(method, 403, {}, {"message": "API rate limit exceeded"})
+
+    def _reply(self, method, status, headers, payload):
+        self.counts[f"{method} {status}"] += 1
+        return status, dict(headers, **self.rate_limit_headers()), payload
+
+    def stats(self):
+        """Compteurs de requêtes par méthode et statut, et requêtes par minute depuis le démarrage."""
+        with self._lock:
+            counts = dict(self.counts)
+            elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        total = sum(counts.values())
+        return {
+            "requests": total,
+            "by_status": counts,
+            "requests_per_minute": round(total / elapsed * 60, 1) if elapsed else None,
+            "versions": len(self.history),
+            "rate_limit_used": self._used,
+        }
+
+    def start(self, port=0):
+        """Démarre le serveur dans un thread (port 0 : port libre choisi par le système)."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Connexions persistantes, comme api.github.com
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    # Client arrêté avec une connexion persistante encore ouverte
+                    pass
+
+            def _respond(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, payload = stub.handle(method, self.path, self.headers, body)
+                data = json.dumps(payload).encode() if payload is not None else b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if payload is not None:
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_PATCH(self):
+                self._respond("PATCH")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.started_at = time.monotonic()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API Gist locale pour les tests de charge.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default=os.path.join(REPO_DIR, DEFAULT_FILENAME),
+                        help="document initial du Gist")
+    parser.add_argument("--gist-id", default=DEFAULT_GIST_ID)
+    parser.add_argument("--filename", default=DEFAULT_FILENAME)
+    parser.add_argument("--latency", type=float, default=0.0, help="délai de chaque réponse (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="délai aléatoire supplémentaire maximal (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proportion de réponses en erreur")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=int, default=5000, help="requêtes décomptées par fenêtre")
+    parser.add_argument("--window", type=int, default=3600, help="durée de la fenêtre de quota (s)")
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        content = f.read()
+    stub = GistStub(content, gist_id=args.gist_id, filename=args.filename, latency=args.latency,
+                    jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status,
+                    rate_limit=args.rate_limit, window=args.window).start(args.port)
+    print(f"GIST_API_URL={stub.url}")
+    try:
+        while True:
+            time.sleep(60)
+            print(json.dumps(stub.stats(), ensure_ascii=False))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+        print(json.dumps(stub.stats(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,257 @@
+"""Test de charge du backend gist : sessions simulées du tableau de bord contre l'API Gist locale.
+
+Démarre ``gist_stub.GistStub`` puis fait tourner des sessions ``AppTest`` en parallèle,
+chacune dans son propre processus (``AppTest`` n'est pas utilisable depuis plusieurs
+threads) : chaque session est donc aussi une instance de l'application, avec son magasin
+partagé et ses caches. Elle alterne, avec un temps de réflexion aléatoire, les parcours
+Cartes, Tableau et Édition ; en Édition elle enregistre une valeur unique dans un champ
+qui lui est réservé (référent métier ou points d'attention d'une filière).
+
+Le rapport JSON donne :
+- les requêtes reçues par le Gist (par statut) et par minute ;
+- la latence des reruns (p50/p95/min/max) par parcours ;
+- les sauvegardes confirmées, en conflit ou en erreur, et les mises à jour perdues :
+  champs dont la dernière valeur confirmée à la session n'est pas celle du Gist final ;
+- les exceptions de l'application et les sessions interrompues par une erreur (avec la
+  fin de la sortie d'erreur de leur processus). Le code de sortie vaut 1 s'il y en a.
+
+Usage : python benchmarks/load_gist.py [--sessions 8] [--duration 60]
+                                       [--latency 0.05] [--error-rate 0] [--output rapport.json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timezone
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from gist_client import DEFAULT_FILENAME  # noqa: E402
+from gist_diagnostics import summarize  # noqa: E402
+from gist_stub import GistStub  # noqa: E402
+
+APP_PATH = os.path.join(REPO_DIR, "app_filieres.py")
+FLOWS = ["Cartes", "Tableau", "Édition"]
+# Champs texte modifiés en Édition : préfixe de la clé du widget -> champ du document
+EDIT_FIELDS = [("ref", "text_input", "referent_metier"), ("attention", "text_area", "point_attention")]
+
+
+def summarize_reruns(durations):
+    """Nombre de reruns et latences (mêmes statistiques que le diagnostic du Gist)."""
+    return dict(reruns=len(durations), **summarize(durations))
+
+
+def owned_field(index, filiere_keys):
+    """Champ réservé à la session ``index`` : (clé de filière, préfixe du widget, type, champ)."""
+    prefix, widget, field = EDIT_FIELDS[index // len(filiere_keys)]
+    return (filiere_keys[index % len(filiere_keys)], prefix, widget, field)
+
+
+class Session:
+    """Session simulée : un ``AppTest`` dont chaque rerun est chronométré."""
+
+    def __init__(self, index, filiere_keys, edit_share, think_time, seed):
+        self.index = index
+        self.target = owned_field(index, filiere_keys)
+        self.edit_share = edit_share
+        self.think_time = think_time
+        self.random = random.Random(seed)
+        self.durations = {flow: [] for flow in FLOWS}
+        # Sauvegardes : (instant de confirmation, valeur) pour les confirmées
+        self.acked = []
+        self.conflicts = 0
+        self.failures = 0
+        self.exceptions = []
+        self.crash = None
+        self.saves = 0
+
+    def run_app(self, flow, element=None):
+        start = time.perf_counter()
+        (element or self.at).run()
+        self.durations[flow].append(time.perf_counter() - start)
+        if self.at.exception:
+            self.exceptions.extend(e.value for e in self.at.exception)
+
+    def show(self, flow):
+        self.at.radio(key="mode_affichage_radio").set_value(flow)
+        self.run_app(flow)
+
+    def edit(self):
+        key, prefix, widget, field = self.target
+        self.show("Édition")
+        self.run_app("Édition", self.at.selectbox(key="filiere_selectbox").set_value(key))
+        self.saves += 1
+        value = f"charge s{self.index} n{self.saves}"
+        self.run_app("Édition", getattr(self.at, widget)(key=f"{prefix}_{key}").set_value(value))
+        self.at.session_state["success_message"] = False
+        self.run_app("Édition", self.at.button(key="save_button_main").click())
+        if "save_conflict" in self.at.session_state and self.at.session_state["save_conflict"]:
+            # Ne devrait pas arriver (champ réservé) : on abandonne l'arbitrage
+            self.conflicts += 1
+            self.at.session_state["save_conflict"] = None
+        elif self.at.session_state["success_message"]:
+            self.acked.append((time.time(), value))
+        else:
+            self.failures += 1
+
+    def run(self, deadline):
+        from streamlit.testing.v1 import AppTest
+        try:
+            self.at = AppTest.from_file(APP_PATH, default_timeout=120)
+            self.run_app("Cartes")
+            while time.time() < deadline:
+                if self.random.random() < self.edit_share:
+                    self.edit()
+                else:
+                    self.show(self.random.choice(["Cartes", "Tableau"]))
+                time.sleep(self.random.expovariate(1 / self.think_time) if self.think_time else 0)
+        except Exception:
+            # Session interrompue : ses résultats partiels sont gardés, l'erreur est signalée
+            self.crash = traceback.format_exc()
+
+    def result(self):
+        key, _, _, field = self.target
+        return {
+            "index": self.index,
+            "filiere": key,
+            "field": field,
+            "durations": self.durations,
+            "acked": self.acked,
+            "saves": self.saves,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+            "exceptions": self.exceptions[:5],
+            "crash": self.crash,
+        }
+
+
+def run_session(index, filiere_keys, duration, edit_share, think_time, seed):
+    """Fait tourner la session ``index`` jusqu'à l'échéance (dans le processus fils)."""
+    session = Session(index, filiere_keys, edit_share, think_time, seed + index)
+    session.run(time.time() + duration)
+    return session.result()
+
+
+def run_worker(args, index, filiere_keys, env):
+    """Lance le processus d'une session : une instance de l'application simulée."""
+    config = json.dumps({"index": index, "filiere_keys": filiere_keys, "duration": args.duration,
+                         "edit_share": args.edit_share, "think_time": args.think_time, "seed": args.seed})
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", config],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+
+def collect(worker, index, filiere_keys):
+    """Résultat du processus d'une session ; une session sans résultat compte comme interrompue."""
+    stdout, stderr = worker.communicate()
+    lines = stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, ValueError):
+        key, _, _, field = owned_field(index, filiere_keys)
+        result = {"index": index, "filiere": key, "field": field, "durations": {flow: [] for flow in FLOWS},
+                  "acked": [], "saves": 0, "conflicts": 0, "failures": 0, "exceptions": [],
+                  "crash": f"processus terminé (code {worker.returncode}) sans résultat"}
+    if result["crash"] or result["exceptions"] or worker.returncode:
+        # Fin de la sortie d'erreur, pour situer l'erreur (avertissements de Streamlit compris)
+        result["stderr"] = stderr[-2000:]
+    return result
+
+
+def lost_updates(results, document):
+    """Champs dont la dernière valeur confirmée n'est pas celle du document final."""
+    lost = []
+    for r in results:
+        if not r["acked"]:
+            continue
+        expected = max(r["acked"])[1]
+        actual = document["filieres"].get(r["filiere"], {}).get(r["field"])
+        if actual != expected:
+            lost.append({"filiere": r["filiere"], "field": r["field"], "expected": expected, "actual": actual})
+    return lost
+
+
+def build_report(args, stub, results, elapsed):
+    durations = {flow: [d for r in results for d in r["durations"][flow]] for flow in FLOWS}
+    document = json.loads(stub.content)
+    lost = lost_updates(results, document)
+    stats = stub.stats()
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: getattr(args, key) for key in (
+            "sessions", "duration", "edit_share", "think_time",
+            "latency", "jitter", "error_rate", "rate_limit", "seed")},
+        "gist": dict(stats, requests_per_minute=round(stats["requests"] / elapsed * 60, 1)),
+        "reruns": dict({flow: summarize_reruns(values) for flow, values in durations.items()},
+                       all=summarize_reruns([d for values in durations.values() for d in values])),
+        "saves": {
+            "attempted": sum(r["saves"] for r in results),
+            "acknowledged": sum(len(r["acked"]) for r in results),
+            "conflicts": sum(r["conflicts"] for r in results),
+            "failed": sum(r["failures"] for r in results),
+        },
+        "lost_updates": len(lost),
+        "lost": lost,
+        "exceptions": [e for r in results for e in r["exceptions"]][:10],
+        "crashed_sessions": [{"index": r["index"], "error": r["crash"], "stderr": r.get("stderr", "")}
+                             for r in results if r["crash"]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge du backend gist contre une API Gist locale.")
+    parser.add_argument("--sessions", type=int, default=8, help="sessions, chacune dans son processus")
+    parser.add_argument("--duration", type=float, default=60, help="durée du test (s)")
+    parser.add_argument("--edit-share", type=float, default=0.2, help="proportion de parcours Édition")
+    parser.add_argument("--think-time", type=float, default=1.0, help="temps de réflexion moyen entre deux actions (s)")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence de l'API Gist (s)")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=os.path.join(REPO_DIR, DEFAULT_FILENAME), help="document initial")
+    parser.add_argument("-o", "--output", help="fichier JSON du rapport (sinon sortie standard)")
+    args = parser.parse_args()
+
+    with open(args.data, encoding="utf-8") as f:
+        content = f.read()
+    filiere_keys = list(json.loads(content)["filieres"])
+    if args.sessions > len(filiere_keys) * len(EDIT_FIELDS):
+        parser.error(f"au plus {len(filiere_keys) * len(EDIT_FIELDS)} sessions (un champ réservé par session)")
+
+    stub = GistStub(content, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    rate_limit=args.rate_limit, seed=args.seed).start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = dict(os.environ, STORAGE_BACKEND="gist", GITHUB_PAT="load-test", GIST_API_URL=stub.url)
+        workers = [run_worker(args, n, filiere_keys, dict(env, SNAPSHOT_DIR=os.path.join(tmp_dir, f"session{n}")))
+                   for n in range(args.sessions)]
+        start = time.monotonic()
+        results = [collect(worker, n, filiere_keys) for n, worker in enumerate(workers)]
+        elapsed = time.monotonic() - start
+    stub.stop()
+
+    report = build_report(args, stub, results, elapsed)
+    content = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(content + "\n")
+    else:
+        print(content)
+    if report["crashed_sessions"] or report["exceptions"]:
+        print(f"ÉCHEC : {len(report['crashed_sessions'])} session(s) interrompue(s), "
+              f"{sum(len(r['exceptions']) for r in results)} exception(s) de l'application", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        result = run_session(**json.loads(sys.argv[2]))
+        print(json.dumps(result))
+        sys.exit(1 if result["crash"] else 0)
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Génération de documents de filières synthétiques, de 10 à plusieurs dizaines de milliers de filières.
+
+Les filières reprennent la structure de ``filieres_data.json`` (états, accès, indicateurs
+approximatifs, responsables) avec des textes longs : points d'attention sur plusieurs
+lignes, usages phares et listes d'``evenements_recents`` de longueur variable. La
+génération est déterministe pour une graine donnée.
+
+Le fichier produit peut servir de LOCAL_DATA_PATH à l'application ou de ``--data`` à
+``load_gist.py``.
+
+Usage : python benchmarks/synthetic_data.py NB_FILIERES [--events 20] [--seed 0] -o fichier.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_PATH = os.path.join(REPO_DIR, "filieres_data.json")
+
+ICONES = ['📁', '📊', '📢', '💰', '⚖️', '🏛️', '🔧', '🛡️', '🚀', '📦', '🧾', '🏗️']
+DOMAINES = ['Finances', 'Achats', 'Juridique', 'Communication', 'Immobilier', 'Ressources humaines',
+            'Sécurité', 'Conformité', 'Données', 'Ingénierie', 'Réseau', 'Éditique', 'Logistique']
+QUALIFICATIFS = ['', 'groupe', 'opérationnel(le)', 'région Île-de-France', 'Sud-Est', 'numérique', 'siège']
+PRENOMS = ['Amélie', 'Benoît', 'Chloé', 'Damien', 'Élodie', 'François', 'Gaëlle', 'Hélène', 'Jérôme', 'Léa']
+NOMS = ['Martin', 'Bernard', 'Dubois', 'Lefèvre', 'Moreau', 'Girard', 'Rousseau', 'Faure', 'Mercier']
+RESPONSABLES = ['Sarah', 'Clara', 'Olivier', 'Mouad', 'Arthur']
+AUTONOMIE = ["Besoin d'accompagnement faible", "Besoin d'accompagnement modéré",
+             "Besoin d'accompagnement fort", "Besoin d'accompagnement très fort", ""]
+PHRASES = [
+    "Rédaction assistée des notes de synthèse à partir des comptes rendus de COSUI",
+    "Résumé automatique des appels d'offres et extraction des critères d'éligibilité",
+    "Génération de premières réponses aux questions récurrentes des collaborateurs",
+    "Analyse des verbatims clients et classement par thématique 📊",
+    "Aide à la relecture des contrats : repérage des clauses à risque ⚠️",
+    "Préparation des supports de formation à partir de la documentation existante",
+    "Traduction des procédures internes pour les équipes à l'international 🌍",
+    "Contrôle de cohérence des données de référence avant chargement",
+]
+ALERTES = [
+    "Données sensibles : validation juridique nécessaire avant tout usage élargi",
+    "Peu de disponibilité des référents métiers sur le trimestre",
+    "Licences Copilot en attente d'arbitrage budgétaire 💰",
+    "Qualité des documents sources hétérogène (scans, formats anciens)",
+    "Besoin d'un accompagnement au prompt engineering pour les nouveaux testeurs",
+]
+TITRES = ["COSUI", "Atelier d'idéation", "Démonstration", "Lancement de l'expérimentation",
+          "Retour d'expérience", "Formation des référents", "Comité de pilotage", "Point d'étape"]
+
+
+def load_template(path=TEMPLATE_PATH):
+    """Document de référence : fournit ``etats_avancement`` et les autres clés de premier niveau."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sentence(rng, pool, extra=0):
+    """Phrase tirée de ``pool``, allongée de ``extra`` précisions."""
+    parts = [rng.choice(pool)] + [rng.choice(PHRASES).lower() for _ in range(extra)]
+    return " ; ".join(parts)
+
+
+def generate_events(rng, count, start):
+    """``count`` événements, du plus récent au plus ancien (ordre du document)."""
+    events = []
+    day = start
+    for _ in range(count):
+        events.append({
+            'date': day.isoformat(),
+            'titre': f"{rng.choice(TITRES)} {rng.choice(DOMAINES).lower()}",
+            'description': sentence(rng, PHRASES, extra=rng.randint(0, 3)),
+        })
+        day -= timedelta(days=rng.randint(1, 21))
+    return events
+
+
+def generate_filiere(rng, index, etats, events):
+    """Filière synthétique ; ``events`` est le nombre moyen d'événements récents."""
+    total = rng.randint(20, 5000)
+    sensibilises = rng.randint(0, total)
+    nom = f"{rng.choice(DOMAINES)} {rng.choice(QUALIFICATIFS)}".strip()
+    return {
+        'nom': f"{nom} {index}",
+        'icon': rng.choice(ICONES),
+        'referent_metier': f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}",
+        'nombre_referents_delegues': rng.randint(0, 30),
+        'nombre_referents_delegues_approx': rng.random() < 0.2,
+        'nombre_collaborateurs_sensibilises': sensibilises,
+        'nombre_collaborateurs_sensibilises_approx': rng.random() < 0.3,
+        'nombre_collaborateurs_total': total,
+        'etat_avancement': rng.choice(etats),
+        'niveau_autonomie': rng.choice(AUTONOMIE),
+        'fopp_count': rng.randint(0, 40),
+        'fopp_count_approx': rng.random() < 0.2,
+        'description': sentence(rng, PHRASES, extra=2),
+        'point_attention': "\n".join(sentence(rng, ALERTES, extra=1) for _ in range(rng.randint(0, 4))),
+        'usages_phares': [sentence(rng, PHRASES) for _ in range(rng.randint(0, 8))],
+        'acces': {
+            'laposte_gpt': rng.randint(0, sensibilises),
+            'laposte_gpt_approx': rng.random() < 0.3,
+            'copilot_licences': rng.randint(0, 50),
+            'copilot_licences_approx': rng.random() < 0.1,
+        },
+        'evenements_recents': generate_events(rng, rng.randint(0, 2 * events),
+                                              date(2025, 6, 30) - timedelta(days=rng.randint(0, 90))),
+        'responsable_pole_data': rng.sample(RESPONSABLES, rng.randint(0, 2)),
+    }
+
+
+def generate_document(nb_filieres, events=20, seed=0, template=None):
+    """Document complet de ``nb_filieres`` filières synthétiques (clés ``filiere_00001``...)."""
+    rng = random.Random(seed)
+    document = {key: value for key, value in (template or load_template()).items() if key != 'filieres'}
+    etats = list(document.get('etats_avancement', {})) or ['a_initier']
+    width = max(5, len(str(nb_filieres)))
+    document['filieres'] = {
+        f"filiere_{i:0{width}d}": generate_filiere(rng, i, etats, events) for i in range(1, nb_filieres + 1)
+    }
+    return document
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un document de filières synthétique.")
+    parser.add_argument("filieres", type=int, help="nombre de filières")
+    parser.add_argument("--events", type=int, default=20, help="nombre moyen d'événements par filière")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="fichier JSON de sortie (sortie standard par défaut)")
+    args = parser.parse_args()
+
+    content = json.dumps(generate_document(args.filieres, args.events, args.seed), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(content + "\n")
+    else:
+        sys.stdout.write(content + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Construction du HTML des cartes de filières, mémorisée par empreinte de contenu."""
+from collections import namedtuple
+
+from filieres_model import content_hash
+from lru import BoundedLRU
+from theme import etat_css_class
+
+# Fragments HTML d'une carte, dans l'ordre d'affichage.
+# ``points_attention`` vaut None quand la section est masquée.
+CardHtml = namedtuple("CardHtml", [
+    "bandeau", "titre", "badge", "autonomie",
+    "colonne_gauche", "colonne_droite",
+    "points_attention", "usages"
+])
+
+# Mapping des états avec les nouveaux textes
+ETATS_LABELS_CARTE = {
+    'prompts_deployes': 'AVANCÉ',
+    'tests_realises': 'INTERMÉDIAIRE',
+    'en_emergence': 'EN ÉMERGENCE',
+    'a_initier': 'À INITIER'
+}
+
+ICONE_AUTONOMIE = {
+    "Besoin d'accompagnement faible": "🟢",
+    "Besoin d'accompagnement modéré": "🟡",
+    "Besoin d'accompagnement fort": "🟠",
+    "Besoin d'accompagnement très fort": "🔴"
+}
+
+AUCUN_POINT_ATTENTION = 'Aucun point d\'attention spécifique'
+
+
+def _metric_box(css_etat, label, valeur):
+    return f"<div class='carte-metrique {css_etat}'><strong>{label}</strong><br/>{valeur}</div>"
+
+
+def build_card_html(filiere_data, etat_info, approx_icon_html):
+    """Construit tous les fragments HTML d'une carte (fonction pure, sans appel Streamlit).
+
+    Le balisage n'utilise que des classes CSS : la mise en forme et les couleurs de
+    l'état viennent de la feuille de style générée par ``theme.build_stylesheet``.
+    """
+    etat = filiere_data.get('etat_avancement', 'initialisation')
+    etat_label = ETATS_LABELS_CARTE.get(etat, etat_info.get('label', 'État inconnu'))
+    css_etat = etat_css_class(etat)
+    acces = filiere_data.get('acces', {})
+
+    def approx(flag):
+        return approx_icon_html if flag else ''
+
+    # Barre de couleur en haut pour indiquer l'état
+    bandeau = f"<div class='carte-bandeau {css_etat}'></div>"
+
+    # Titre avec icône et nombre total de collaborateurs
+    nom_filiere = filiere_data.get('nom', 'Filière')
+    nb_total_collab = filiere_data.get('nombre_collaborateurs_total', 0)
+    responsables = filiere_data.get('responsable_pole_data', [])
+    responsables_text = ", ".join(responsables) if responsables else ""
+    responsables_html = f"<div class='responsables'>{responsables_text}</div>" if responsables_text else ''
+    titre = (
+        f"<div class='carte-titre'>"
+        f"<h3>{filiere_data.get('icon', '📁')} {nom_filiere} <span class='nb-collab'>({nb_total_collab} collaborateurs)</span></h3>"
+        f"{responsables_html}"
+        f"</div>"
+    )
+
+    # Badge d'état
+    badge = f"<div class='carte-badge {css_etat}'>🎯 {etat_label}</div>"
+
+    # Niveau d'autonomie
+    niveau_autonomie = filiere_data.get('niveau_autonomie', 'Non renseigné')
+    icone = ICONE_AUTONOMIE.get(niveau_autonomie, "❔")
+    autonomie = f"<div class='carte-autonomie'><span>{icone}</span> <span class='niveau'>{niveau_autonomie}</span></div>"
+
+    # Informations en colonnes avec fond légèrement coloré
+    nb_sensibilises = filiere_data.get('nombre_collaborateurs_sensibilises', 0)
+    pourcentage = ' (' + str(round((nb_sensibilises / filiere_data.get('nombre_collaborateurs_total', 1)) * 100, 1)) + '%)' if filiere_data.get('nombre_collaborateurs_total', 0) > 0 else ''
+    colonne_gauche = (
+        _metric_box(css_etat, "🧙🏼‍♂️ Référent métier:",
+                    filiere_data.get('referent_metier', 'Non défini')),
+        _metric_box(css_etat, "🧝‍♂️ Référents délégués:",
+                    f"{approx(filiere_data.get('nombre_referents_delegues_approx', False))}{filiere_data.get('nombre_referents_delegues', 0)}"),
+        _metric_box(css_etat, "👩‍🎓 Collaborateurs sensibilisés IAGen:",
+                    f"{approx(filiere_data.get('nombre_collaborateurs_sensibilises_approx', False))}{nb_sensibilises}{pourcentage}"),
+    )
+    colonne_droite = (
+        _metric_box(css_etat, "📯 Accès LaPoste GPT:",
+                    f"{approx(acces.get('laposte_gpt_approx', False))}{acces.get('laposte_gpt', 0)}"),
+        _metric_box(css_etat, "🛩️ Licences Copilot:",
+                    f"{approx(acces.get('copilot_licences_approx', False))}{acces.get('copilot_licences', 0)}"),
+        _metric_box(css_etat, "📜 Fiches d'opportunité:",
+                    f"{approx(filiere_data.get('fopp_count_approx', False))}{filiere_data.get('fopp_count', 0)}"),
+    )
+
+    # Points d'attention : une ligne par point
+    point_attention = filiere_data.get('point_attention', '')
+    points_attention = None
+    if point_attention and point_attention != AUCUN_POINT_ATTENTION:
+        points_attention = tuple(
+            f"<div class='carte-attention'>• {ligne.strip()}</div>"
+            for ligne in point_attention.split('\n') if ligne.strip()
+        )
+
+    # Usages phares
+    usages = tuple(
+        f"<div class='carte-usage {css_etat}'>• {usage}</div>"
+        for usage in filiere_data.get('usages_phares', [])
+    )
+
+    return CardHtml(bandeau, titre, badge, autonomie, colonne_gauche, colonne_droite,
+                    points_attention, usages)
+
+
+def build_event_html(event):
+    """HTML d'un événement récent (les événements ne font pas partie du cache des cartes)."""
+    return (
+        f"<div class='carte-evenement'>"
+        f"<strong>{event.get('date', 'Date inconnue')}</strong> - {event.get('titre', 'Sans titre')}<br/>"
+        f"<span class='description'>{event.get('description', 'Pas de description')}</span>"
+        f"</div>"
+    )
+
+
+class CardHtmlCache:
+    """Cache LRU borné du HTML des cartes, indexé par (empreinte filière, empreinte état).
+
+    Une carte dont le contenu n'a pas changé n'est pas reformatée d'un rerun à l'autre.
+    """
+
+    def __init__(self, approx_icon_html, maxsize=512):
+        self.approx_icon_html = approx_icon_html
+        self._cache = BoundedLRU(maxsize)
+
+    def get(self, filiere_data, etat_info, filiere_hash=None):
+        """Retourne le ``CardHtml`` de la filière ; ``filiere_hash`` évite de recalculer l'empreinte."""
+        key = (filiere_hash or content_hash(filiere_data), content_hash(etat_info))
+        return self._cache.get(key, lambda: build_card_html(filiere_data, etat_info, self.approx_icon_html))
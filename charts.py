@@ -0,0 +1,157 @@
+"""Camemberts de répartition des accès aux outils, mémorisés par contenu (série + couleurs)."""
+import importlib.util
+import io
+from collections import namedtuple
+
+from filieres_model import content_hash
+from lru import BoundedLRU
+
+# Une métrique d'accès par camembert : clé dans ``aggregates['acces']``, titre,
+# unité du repli texte et message affiché quand aucune filière n'a d'accès
+AccessMetric = namedtuple("AccessMetric", ["key", "titre", "unite", "message_vide"])
+
+ACCESS_METRICS = (
+    AccessMetric("laposte_gpt", "📯 Accès LaPoste GPT", "accès", "Aucun accès LaPoste GPT configuré"),
+    AccessMetric("copilot_licences", "🛩️ Licences Copilot", "licences", "Aucune licence Copilot configurée"),
+)
+
+# Palette harmonieuse basée sur les couleurs demandées
+APP_COLORS = [
+    '#A5D6A7',  # Vert pastel
+    '#87CEEB',  # Bleu ciel
+    '#FFCC80',  # Orange pastel
+    '#F8BBD9',  # Rose pastel (couleur harmonieuse)
+    '#D1C4E9',  # Violet pastel (couleur harmonieuse)
+    '#FFAB91',  # Saumon pastel (couleur harmonieuse)
+    '#80CBC4',  # Turquoise pastel (couleur harmonieuse)
+    '#FFF176',  # Jaune pastel (couleur harmonieuse)
+    '#C8E6C9',  # Vert très clair (variation)
+    '#B3E5FC',  # Bleu très clair (variation)
+    '#FFE0B2',  # Orange très clair (variation)
+    '#E1BEE7',  # Violet très clair (variation)
+    '#FFCDD2',  # Rose très clair (variation)
+    '#B2DFDB',  # Turquoise très clair (variation)
+    '#F0F4C3',  # Jaune très clair (variation)
+    '#DCEDC8',  # Vert lime clair (variation)
+    '#BBDEFB',  # Bleu clair (variation)
+    '#FFECB3',  # Ambre clair (variation)
+    '#F3E5F5',  # Violet très pâle (variation)
+    '#FCE4EC',  # Rose très pâle (variation)
+    '#E0F2F1',  # Turquoise très pâle (variation)
+    '#FFFDE7',  # Jaune très pâle (variation)
+    '#E8F5E8',  # Vert très pâle (variation)
+    '#E3F2FD',  # Bleu très pâle (variation)
+    '#FFF8E1',  # Orange très pâle (variation)
+    '#F9FBE7',  # Lime très pâle (variation)
+    '#FFF3E0',  # Orange doux (variation)
+    '#E8EAF6',  # Indigo pâle (variation)
+    '#FFEBEE',  # Rouge pâle (variation)
+    '#E0F7FA',  # Cyan pâle (variation)
+    '#F1F8E9',  # Vert doux (variation)
+    '#E1F5FE',  # Bleu doux (variation)
+    '#FFF9C4',  # Jaune doux (variation)
+    '#E4C441',  # Doré doux (variation)
+    '#AED581',  # Vert lime doux (variation)
+    '#4FC3F7',  # Bleu vif doux (variation)
+    '#FFB74D',  # Orange vif doux (variation)
+    '#BA68C8',  # Violet vif doux (variation)
+    '#F06292',  # Rose vif doux (variation)
+    '#4DB6AC'   # Turquoise vif doux (variation)
+]
+
+
+def department_colors(departements):
+    """Mapping département -> couleur FIXE, dans l'ordre alphabétique des départements."""
+    return {
+        dept: APP_COLORS[i % len(APP_COLORS)]
+        for i, dept in enumerate(sorted(departements))
+    }
+
+
+def access_series(acces, keys, metric_key):
+    """Série {nom de filière: valeur} des filières ``keys`` ayant au moins un accès."""
+    series = {}
+    for key in keys:
+        valeur = acces[key][metric_key]
+        if valeur > 0:
+            series[acces[key]['nom']] = valeur
+    return series
+
+
+def build_plotly_pie(metric, series, couleurs):
+    """Camembert Plotly à une seule trace, retourné sérialisé en JSON."""
+    import plotly.graph_objects as go
+
+    total = sum(series.values())
+    fig = go.Figure(go.Pie(
+        labels=list(series.keys()),
+        values=list(series.values()),
+        marker=dict(colors=couleurs),
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate="label=%{label}<br>value=%{value}<extra></extra>",
+        domain=dict(x=[0.0, 1.0], y=[0.0, 1.0]),
+        legendgroup="",
+        name="",
+        showlegend=True
+    ))
+    fig.update_layout(
+        title=f"{metric.titre} <i>(Total : {total})</i>",
+        height=300,
+        margin=dict(t=50, b=20, l=20, r=20),
+        font=dict(size=10),
+        showlegend=True,
+        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.02, tracegroupgap=0)
+    )
+    return fig.to_json()
+
+
+def render_matplotlib_pie(metric, series, couleurs):
+    """Camembert matplotlib, retourné sous forme d'image PNG."""
+    from matplotlib.figure import Figure
+
+    total = sum(series.values())
+    # Figure indépendante de pyplot : rien à fermer, pas d'état global partagé entre threads
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.pie(list(series.values()), labels=list(series.keys()),
+           autopct='%1.1f%%', colors=couleurs)
+    ax.set_title(f"{metric.titre} ({total} total)", style='italic')
+    buffer = io.BytesIO()
+    # Mêmes options que st.pyplot
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=200)
+    return buffer.getvalue()
+
+
+# Moteurs de rendu par ordre de préférence ; la clé est aussi le nom du module à installer
+CHART_BUILDERS = {
+    'plotly': build_plotly_pie,
+    'matplotlib': render_matplotlib_pie,
+}
+
+
+def available_chart_backend():
+    """Premier moteur de rendu installé ('plotly' puis 'matplotlib'), détecté sans l'importer.
+
+    Retourne None si aucun n'est disponible (repli texte).
+    """
+    for kind in CHART_BUILDERS:
+        if importlib.util.find_spec(kind) is not None:
+            return kind
+    return None
+
+
+class ChartCache:
+    """Cache LRU borné des graphiques rendus, indexé par le contenu de la série et ses couleurs.
+
+    Un graphique dont ni les valeurs ni les couleurs n'ont changé n'est pas reconstruit.
+    """
+
+    def __init__(self, maxsize=32):
+        self._cache = BoundedLRU(maxsize)
+
+    def get(self, kind, metric, series, couleurs):
+        """Retourne le JSON Plotly (``kind='plotly'``) ou le PNG (``kind='matplotlib'``)."""
+        key = content_hash([kind, metric, list(series.items()), couleurs])
+        return self._cache.get(key, lambda: CHART_BUILDERS[kind](metric, series, couleurs))
+
@@ -0,0 +1,97 @@
+"""Lot de modifications du mode Édition, accumulées sur plusieurs filières et enregistrées en une fois."""
+from filieres_model import EVENTS_FIELD, content_hash, diff_events, events_change
+
+
+class EditForm:
+    """Formulaire d'une filière : valeurs de référence normalisées et champs modifiés.
+
+    ``original`` associe à chaque chemin de champ ("acces.laposte_gpt" pour un
+    sous-champ) la valeur affichée à l'ouverture du formulaire ; ``hash`` en est
+    l'empreinte. Les widgets appellent ``update`` quand leur valeur change : seuls les
+    champs différents de leur valeur de référence sont gardés dans ``values``.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self.hash = content_hash(original)
+        self.values = {}
+
+    @property
+    def changed(self):
+        """Chemins des champs modifiés."""
+        return set(self.values)
+
+    def value(self, path):
+        """Valeur courante du champ (modifiée ou de référence)."""
+        return self.values.get(path, self.original[path])
+
+    def update(self, path, value):
+        if value == self.original[path]:
+            self.values.pop(path, None)
+        else:
+            self.values[path] = value
+
+    def settle(self, path):
+        """Le champ modifié a été enregistré : sa valeur devient la valeur de référence."""
+        self.original[path] = self.values.pop(path)
+        self.hash = content_hash(self.original)
+
+
+class EditBatch:
+    """Formulaires ouverts pendant une édition, tous calculés contre un même instantané.
+
+    ``base`` est l'instantané (DataSnapshot) du début de l'édition : il reste fixe
+    jusqu'à l'enregistrement ou l'abandon du lot, pour que les valeurs de référence des
+    formulaires et les changements enregistrés portent sur la même version. Avec
+    ``separate_events``, les événements sont enregistrés à part (journal d'événements)
+    et non dans le document.
+    """
+
+    def __init__(self, base, separate_events=False):
+        self.base = base
+        self.separate_events = separate_events
+        self.forms = {}
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        """Clés des filières ayant des modifications en attente, dans l'ordre du document."""
+        return [key for key in self.base.data.get('filieres', {})
+                if key in self.forms and self.forms[key].values]
+
+    def open_form(self, key, original):
+        """Ouvre le formulaire de la filière avec ses valeurs de référence ``original``."""
+        form = self.forms[key] = EditForm(original)
+        return form
+
+    def changes(self):
+        """Changements du document au format de ``diff_documents``, limités aux champs modifiés."""
+        filieres = {}
+        for key in self.keys():
+            form = self.forms[key]
+            fields = {path: value for path, value in form.values.items() if path != EVENTS_FIELD}
+            if EVENTS_FIELD in form.values and not self.separate_events:
+                # Retraits et ajouts, rejoués sur les événements enregistrés entre-temps
+                fields[EVENTS_FIELD] = events_change(*diff_events(form.original[EVENTS_FIELD],
+                                                                  form.values[EVENTS_FIELD]))
+            if fields:
+                filieres[key] = fields
+        return {'filieres': filieres} if filieres else {}
+
+    def event_changes(self):
+        """Événements retirés et ajoutés par filière, quand ils sont enregistrés à part.
+
+        Calculés contre les événements affichés à l'ouverture du formulaire, pour être
+        rejoués sur le journal : ceux ajoutés depuis une carte entre-temps sont gardés.
+        """
+        if not self.separate_events:
+            return {}
+        changes = {}
+        for key in self.keys():
+            form = self.forms[key]
+            if EVENTS_FIELD in form.values:
+                removed, added = diff_events(form.original[EVENTS_FIELD], form.values[EVENTS_FIELD])
+                if removed or added:
+                    changes[key] = (removed, added)
+        return changes
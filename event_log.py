@@ -0,0 +1,272 @@
+"""Journal des événements récents des filières, en ajout seul (fichier JSONL ou table SQLite).
+
+Ajouter un événement est un simple ajout en fin de journal : le document des filières
+n'est ni relu ni réécrit. Les lectures retournent les N événements les plus récents
+d'une filière (par date, puis par ordre d'ajout).
+"""
+import bisect
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : seul le verrou entre threads du processus s'applique
+    fcntl = None
+
+
+class EventLog:
+    """Interface commune des journaux d'événements.
+
+    ``revision`` change à chaque écriture, y compris par un autre processus : elle sert
+    à savoir si l'affichage est à jour. Les listes d'événements passées à ``seed`` et
+    ``update`` sont dans l'ordre d'affichage (le plus récent d'abord), comme
+    ``evenements_recents`` dans le document.
+
+    Une fois le journal importé, il fait seul foi : ``evenements_recents`` est vidé
+    dans le document et n'est plus ni lu ni écrit.
+    """
+
+    @property
+    def revision(self):
+        raise NotImplementedError
+
+    def append(self, filiere_key, event):
+        raise NotImplementedError
+
+    def update(self, filiere_key, removed, added):
+        """Retire ``removed`` et ajoute ``added`` en une écriture (enregistrement de l'Édition).
+
+        Chaque événement retiré l'est une fois s'il est encore présent : les événements
+        ajoutés entre-temps, par exemple depuis une carte, sont conservés.
+        """
+        raise NotImplementedError
+
+    def latest(self, filiere_key, limit=None):
+        raise NotImplementedError
+
+    def count(self, filiere_key):
+        raise NotImplementedError
+
+    def is_seeded(self):
+        raise NotImplementedError
+
+    def seed(self, filieres):
+        """Importe une seule fois les ``evenements_recents`` du document dans le journal."""
+        raise NotImplementedError
+
+
+class JsonlEventLog(EventLog):
+    """Journal stocké dans un fichier JSON Lines local, indexé en mémoire par filière.
+
+    Chaque ligne est ``{"filiere": clé, "event": {...}}``, ``{"filiere": clé, "replace": [...]}``
+    pour l'import initial ou ``{"filiere": clé, "remove": [...], "add": [...]}`` pour une
+    modification depuis l'Édition. Les lignes sont rejouées dans l'ordre du fichier. L'index garde, par filière, des triplets
+    (date, numéro d'ordre, événement) triés ; il est reconstruit quand le fichier a été
+    modifié par un autre processus. Entre processus, relecture et ajout sont protégés
+    par un verrou ``flock`` sur ``<fichier>.lock`` (là où ``fcntl`` existe) : la
+    signature prise après un ajout ne couvre jamais de lignes non indexées.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._index = {}
+        self._seq = 0
+        self._signature = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Verrou entre processus, exclusif pour écrire, partagé pour lire."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            # La fermeture du fichier libère le verrou
+            yield
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    @property
+    def revision(self):
+        return self._stat()
+
+    def _add(self, filiere_key, event):
+        self._seq += 1
+        # Le numéro d'ordre étant unique, la comparaison ne porte jamais sur l'événement
+        bisect.insort(self._index.setdefault(filiere_key, []), (event.get('date', ''), self._seq, event))
+
+    def _index_entry(self, entry):
+        if 'replace' in entry:
+            self._index[entry['filiere']] = []
+            # Le plus ancien reçoit le plus petit numéro d'ordre
+            for event in reversed(entry['replace']):
+                self._add(entry['filiere'], event)
+        elif 'event' in entry:
+            self._add(entry['filiere'], entry['event'])
+        else:
+            entries = self._index.setdefault(entry['filiere'], [])
+            for event in entry.get('remove', []):
+                index = next((i for i, (_, _, other) in enumerate(entries) if other == event), None)
+                if index is not None:
+                    del entries[index]
+            for event in reversed(entry.get('add', [])):
+                self._add(entry['filiere'], event)
+
+    def _refresh(self):
+        """Relit le fichier s'il a changé depuis la dernière lecture (appelé sous verrou)."""
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        self._index, self._seq = {}, 0
+        if signature is not None:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._index_entry(json.loads(line))
+        self._signature = signature
+
+    def _write(self, entries, unless_seeded=False):
+        with self._lock, self._file_lock():
+            if unless_seeded and self.is_seeded():
+                # Import déjà fait par un autre processus
+                return
+            self._refresh()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            for entry in entries:
+                self._index_entry(entry)
+            self._signature = self._stat()
+
+    def append(self, filiere_key, event):
+        self._write([{"filiere": filiere_key, "event": event}])
+
+    def update(self, filiere_key, removed, added):
+        self._write([{"filiere": filiere_key, "remove": removed, "add": added}])
+
+    def latest(self, filiere_key, limit=None):
+        with self._lock, self._file_lock(shared=True):
+            self._refresh()
+            entries = self._index.get(filiere_key, [])
+            if limit is not None:
+                entries = entries[-limit:] if limit > 0 else []
+            return [event for _, _, event in reversed(entries)]
+
+    def count(self, filiere_key):
+        with self._lock, self._file_lock(shared=True):
+            self._refresh()
+            return len(self._index.get(filiere_key, []))
+
+    def is_seeded(self):
+        # Le fichier est créé à l'import initial, même s'il n'y a aucun événement
+        return os.path.exists(self.path)
+
+    def seed(self, filieres):
+        if self.is_seeded():
+            return
+        self._write([
+            {"filiere": key, "replace": filiere.get('evenements_recents', [])}
+            for key, filiere in filieres.items() if filiere.get('evenements_recents')
+        ], unless_seeded=True)
+
+
+class SQLiteEventLog(EventLog):
+    """Journal stocké dans une table SQLite, indexée par (filière, date).
+
+    Peut partager la base du backend SQLite : les tables sont distinctes.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS events (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        filiere TEXT NOT NULL,
+        date TEXT NOT NULL,
+        content TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS events_filiere_date ON events (filiere, date, seq);
+    CREATE TABLE IF NOT EXISTS events_revision (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        value INTEGER NOT NULL
+    );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @property
+    def revision(self):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM events_revision").fetchone()
+        return row[0] if row else None
+
+    def _insert(self, conn, filiere_key, events):
+        # Le plus ancien reçoit le plus petit numéro d'ordre
+        conn.executemany(
+            "INSERT INTO events (filiere, date, content) VALUES (?, ?, ?)",
+            [(filiere_key, event.get('date', ''), json.dumps(event, ensure_ascii=False))
+             for event in reversed(events)]
+        )
+
+    def _bump_revision(self, conn):
+        conn.execute("INSERT INTO events_revision (id, value) VALUES (1, 1) "
+                     "ON CONFLICT (id) DO UPDATE SET value = value + 1")
+
+    def append(self, filiere_key, event):
+        with closing(self._connect()) as conn, conn:
+            self._insert(conn, filiere_key, [event])
+            self._bump_revision(conn)
+
+    def update(self, filiere_key, removed, added):
+        with closing(self._connect()) as conn, conn:
+            # Relecture et écriture dans une même transaction : rien ne s'intercale
+            conn.execute("BEGIN IMMEDIATE")
+            rows = [(seq, json.loads(content)) for seq, content in conn.execute(
+                "SELECT seq, content FROM events WHERE filiere = ?", (filiere_key,))]
+            for event in removed:
+                index = next((i for i, (_, other) in enumerate(rows) if other == event), None)
+                if index is not None:
+                    conn.execute("DELETE FROM events WHERE seq = ?", (rows.pop(index)[0],))
+            self._insert(conn, filiere_key, added)
+            self._bump_revision(conn)
+
+    def latest(self, filiere_key, limit=None):
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT content FROM events WHERE filiere = ? ORDER BY date DESC, seq DESC LIMIT ?",
+                (filiere_key, -1 if limit is None else limit)
+            ).fetchall()
+        return [json.loads(content) for content, in rows]
+
+    def count(self, filiere_key):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM events WHERE filiere = ?", (filiere_key,)).fetchone()[0]
+
+    def is_seeded(self):
+        # La révision est créée à la première écriture, import initial compris
+        return self.revision is not None
+
+    def seed(self, filieres):
+        with closing(self._connect()) as conn, conn:
+            # Vérifié dans la transaction : deux processus ne peuvent pas importer deux fois
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM events_revision").fetchone():
+                return
+            for key, filiere in filieres.items():
+                self._insert(conn, key, filiere.get('evenements_recents', []))
+            self._bump_revision(conn)
@@ -0,0 +1,214 @@
+"""Export du tableau des filières (CSV, Excel, Parquet, JSON Lines) et nettoyage CSV latin-1."""
+import importlib.util
+import io
+import json
+import re
+import unicodedata
+from collections import namedtuple
+
+from lru import BoundedLRU
+
+# Mapping des émojis vers du texte - patterns complets d'abord
+EMOJI_MAPPING = {
+    '🟢 AVANCÉ': 'AVANCE',
+    '🔵 INTERMÉDIAIRE': 'INTERMEDIAIRE',
+    '🟡 EN ÉMERGENCE': 'EN_EMERGENCE',
+    '🔴 À INITIER': 'A_INITIER',
+    '🟢': 'AVANCE',
+    '🔵': 'INTERMEDIAIRE',
+    '🟡': 'EN_EMERGENCE',
+    '🔴': 'A_INITIER',
+    '📁': '',
+    '📊': '',
+    '📢': '',
+    '💰': '',
+    '⚖️': '',
+    '🏛️': '',
+    '🔧': '',
+    '🏢': '',
+    '📋': '',
+    '🎯': '',
+    '🛡️': '',
+    '🚀': '',
+    '🌐': '',
+    '📱': '',
+    '🔒': '',
+    '👥': '',
+    '🎨': '',
+    '📈': '',
+    '🔍': '',
+    '💡': '',
+    '🏆': '',
+    '⚡': '',
+    '📝': '',
+    '⚠️': 'ATTENTION',
+    '❌': 'NON',
+    '✅': 'OUI',
+    '❓': 'QUESTION',
+    '❗': 'IMPORTANT'
+}
+
+# Caractères accentués ramenés à leur lettre de base pour l'export CSV
+ACCENTED_CHARS = 'àáâãäåèéêëìíîïòóôõöùúûüýÿçñÀÁÂÃÄÅÈÉÊËÌÍÎÏÒÓÔÕÖÙÚÛÜÝŸÇÑ'
+
+# Table de traduction vers la lettre de base de chaque caractère accentué, obtenue par
+# décomposition NFKD (é -> e + accent combinant) : un seul ``str.translate`` par texte
+ACCENT_MAPPING = str.maketrans({c: unicodedata.normalize('NFKD', c)[0] for c in ACCENTED_CHARS})
+
+SPECIAL_CHARS_RE = re.compile(r'[^\w\s\-.,;:()]')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Séparateur des cellules d'une colonne jointe : ni émoji, ni accent, ni espace, il
+# traverse chaque étape sans être modifié ni se combiner avec ses voisins
+CELL_SEPARATOR = '\x00'
+COLUMN_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\-.,;:()\x00]')
+
+# Nombre de lignes écrites par bloc par les exports CSV
+CHUNK_ROWS = 10000
+
+
+def _replace_all(text, mapping):
+    for old, new in mapping.items():
+        text = text.replace(old, new)
+    return text
+
+
+def clean_text_for_csv(text):
+    """Nettoie le texte en supprimant les émojis et normalisant les accents pour l'export CSV"""
+    if not isinstance(text, str):
+        return str(text)
+
+    # Remplacer les émojis
+    cleaned = _replace_all(text, EMOJI_MAPPING)
+
+    # Normaliser les accents pour éviter les problèmes d'encodage
+    # Décomposer les caractères Unicode puis les recomposer
+    cleaned = unicodedata.normalize('NFD', cleaned)
+    cleaned = unicodedata.normalize('NFC', cleaned)
+
+    # Remplacer les caractères accentués
+    cleaned = cleaned.translate(ACCENT_MAPPING)
+
+    # Supprimer les caractères spéciaux restants
+    cleaned = SPECIAL_CHARS_RE.sub('', cleaned)
+
+    # Nettoyer les espaces multiples
+    cleaned = WHITESPACE_RE.sub(' ', cleaned).strip()
+
+    return cleaned
+
+
+def clean_series_for_csv(series):
+    """Applique ``clean_text_for_csv`` à toute une colonne, avec exactement le même résultat.
+
+    Les cellules sont jointes en une seule chaîne : chaque remplacement, la normalisation,
+    la traduction des accents et les expressions régulières ne s'exécutent qu'une fois
+    par colonne au lieu d'une fois par cellule.
+    """
+    import pandas as pd
+    values = series.astype(str).astype(object)
+    # ``astype(str)`` peut laisser les valeurs manquantes, que ``str.cat`` sauterait en
+    # décalant les cellules : elles deviennent leur texte, comme dans ``clean_text_for_csv``
+    missing = values.isna()
+    if missing.any():
+        values = values.where(~missing, values[missing].map(str))
+    joined = values.str.cat(sep=CELL_SEPARATOR)
+    if joined.count(CELL_SEPARATOR) != len(values) - 1:
+        # Le séparateur apparaît dans les données : nettoyage cellule par cellule
+        return values.map(clean_text_for_csv)
+
+    joined = _replace_all(joined, EMOJI_MAPPING)
+    # NFD puis NFC équivaut à NFC seul
+    joined = unicodedata.normalize('NFC', joined)
+    joined = joined.translate(ACCENT_MAPPING)
+    joined = COLUMN_SPECIAL_CHARS_RE.sub('', joined)
+    joined = WHITESPACE_RE.sub(' ', joined)
+    return pd.Series([cell.strip() for cell in joined.split(CELL_SEPARATOR)],
+                     index=series.index, dtype=object)
+
+
+def clean_frame_for_csv(df):
+    """Copie du DataFrame dont toutes les colonnes texte sont nettoyées pour l'export."""
+    import pandas as pd
+    df_export = df.copy()
+    for col in df_export.columns:
+        if pd.api.types.is_object_dtype(df_export[col]) or pd.api.types.is_string_dtype(df_export[col]):
+            df_export[col] = clean_series_for_csv(df_export[col])
+    return df_export
+
+
+def _write_csv_latin1(df, out):
+    # Utiliser l'encodage latin-1 pour éviter les problèmes d'accents
+    clean_frame_for_csv(df).to_csv(out, index=False, sep=';', encoding='latin-1',
+                                   errors='replace', chunksize=CHUNK_ROWS)
+
+
+def _write_csv_utf8(df, out):
+    # Le BOM permet à Excel de reconnaître l'UTF-8 : émojis et accents sont conservés
+    df.to_csv(out, index=False, sep=';', encoding='utf-8-sig', chunksize=CHUNK_ROWS)
+
+
+def _write_parquet(df, out):
+    df.to_parquet(out, index=False)
+
+
+def _write_xlsx(df, out):
+    from openpyxl import Workbook
+    # Mode write_only : les lignes sont écrites au fil de l'eau, sans garder de cellules en mémoire
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Filières")
+    ws.append(list(df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append([value.item() if hasattr(value, 'item') else value for value in row])
+    wb.save(out)
+
+
+def _write_jsonl(df, out):
+    for record in df.to_dict('records'):
+        out.write((json.dumps(record, ensure_ascii=False, default=str) + "\n").encode('utf-8'))
+
+
+ExportFormat = namedtuple("ExportFormat", ["label", "file_name", "mime", "writer", "module"])
+
+# ``module`` : dépendance optionnelle nécessaire au format (None si aucune)
+EXPORT_FORMATS = {
+    'csv': ExportFormat("CSV (Excel, latin-1)", "filieres_tableau.csv", "text/csv", _write_csv_latin1, None),
+    'csv_utf8': ExportFormat("CSV (UTF-8)", "filieres_tableau_utf8.csv", "text/csv", _write_csv_utf8, None),
+    'xlsx': ExportFormat("Excel (.xlsx)", "filieres_tableau.xlsx",
+                         "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                         _write_xlsx, "openpyxl"),
+    'parquet': ExportFormat("Parquet", "filieres_tableau.parquet", "application/vnd.apache.parquet",
+                            _write_parquet, "pyarrow"),
+    'jsonl': ExportFormat("JSON Lines", "filieres_tableau.jsonl", "application/x-ndjson", _write_jsonl, None),
+}
+
+
+def available_formats():
+    """Formats dont la dépendance optionnelle est installée, dans l'ordre d'affichage."""
+    return [
+        name for name, fmt in EXPORT_FORMATS.items()
+        if fmt.module is None or importlib.util.find_spec(fmt.module) is not None
+    ]
+
+
+def export_table(df, format_name):
+    """Écrit le tableau dans le format demandé et retourne le contenu du fichier."""
+    out = io.BytesIO()
+    EXPORT_FORMATS[format_name].writer(df, out)
+    return out.getvalue()
+
+
+class ExportCache:
+    """Cache LRU borné des fichiers exportés, indexé par (version, filières affichées, format).
+
+    Un fichier n'est produit qu'au moment où il est téléchargé, puis réutilisé tant que
+    ni les données ni les filtres n'ont changé.
+    """
+
+    def __init__(self, maxsize=16):
+        self._cache = BoundedLRU(maxsize)
+
+    def get(self, version, table, format_name):
+        """Retourne le fichier ``format_name`` du ``table`` (indexé par clé de filière)."""
+        key = (version, tuple(table.index), format_name)
+        return self._cache.get(key, lambda: export_table(table, format_name))
@@ -0,0 +1,385 @@
+"""Structure des données des filières et migration des documents chargés."""
+import hashlib
+import json
+
+# Champs attendus pour une filière (doit correspondre à la structure du JSON)
+FILIERE_FIELDS = {
+    "nom": "Nom de la filière",
+    "icon": "📁",
+    "referent_metier": "",
+    "nombre_referents_delegues": 0,
+    "nombre_collaborateurs_sensibilises": 0,
+    "nombre_collaborateurs_total": 0,
+    "etat_avancement": "en_emergence",
+    "niveau_autonomie": "",
+    "fopp_count": 0,
+    "description": "",
+    "point_attention": "",
+    "usages_phares": [],
+    "acces": {"laposte_gpt": 0, "copilot_licences": 0},
+    "evenements_recents": [],
+    "responsable_pole_data": []
+}
+
+def migrate_filiere_fields(filiere):
+    """Complète dynamiquement les champs manquants d'une filière avec les valeurs par défaut attendues."""
+    for k, v in FILIERE_FIELDS.items():
+        if k not in filiere:
+            filiere[k] = v if not isinstance(v, dict) and not isinstance(v, list) else v.copy() if isinstance(v, list) else v.copy()
+        elif isinstance(v, dict):
+            # Pour les sous-dictionnaires (ex: acces)
+            for subk, subv in v.items():
+                if k not in filiere or not isinstance(filiere[k], dict):
+                    filiere[k] = {}
+                if subk not in filiere[k]:
+                    filiere[k][subk] = subv
+    return filiere
+
+def migrate_document(data):
+    """Migre toutes les filières du document."""
+    # Migration à la volée des filières (comme avant)
+    if 'filieres' in data:
+        for key, filiere in data['filieres'].items():
+            data['filieres'][key] = migrate_filiere_fields(filiere)
+    return data
+
+def parse_document(content):
+    """Décode le contenu JSON du document et migre toutes ses filières."""
+    return migrate_document(json.loads(content))
+
+def compute_aggregates(filieres):
+    """Calcule en une seule passe tous les agrégats affichés par le tableau de bord.
+
+    Retourne un dict avec les totaux (``nb_filieres``, ``total_testeurs``,
+    ``total_laposte_gpt``, ``total_copilot``), le nombre de filières par état
+    (``etat_counts``) et, par clé de filière, la série des accès (``acces`` :
+    ``{clé: {"nom", "laposte_gpt", "copilot_licences"}}``) utilisée par les graphiques
+    et le tableau, qui n'ont plus qu'à la filtrer.
+    """
+    total_testeurs = total_laposte_gpt = total_copilot = 0
+    etat_counts = {}
+    acces_par_filiere = {}
+    for key, filiere in filieres.items():
+        acces = filiere.get('acces', {})
+        laposte_gpt = acces.get('laposte_gpt', 0)
+        copilot = acces.get('copilot_licences', 0)
+        total_testeurs += filiere.get('nombre_testeurs', 0)
+        total_laposte_gpt += laposte_gpt
+        total_copilot += copilot
+        etat = filiere.get('etat_avancement', 'initialisation')
+        etat_counts[etat] = etat_counts.get(etat, 0) + 1
+        acces_par_filiere[key] = {
+            "nom": filiere.get('nom', 'Filière inconnue'),
+            "laposte_gpt": laposte_gpt,
+            "copilot_licences": copilot
+        }
+    return {
+        "nb_filieres": len(filieres),
+        "total_testeurs": total_testeurs,
+        "total_laposte_gpt": total_laposte_gpt,
+        "total_copilot": total_copilot,
+        "etat_counts": etat_counts,
+        "acces": acces_par_filiere
+    }
+
+# Ordre de tri des états (du plus avancé au moins avancé)
+ORDRE_ETATS = ['prompts_deployes', 'tests_realises', 'en_emergence', 'a_initier']
+
+# Mapping des états pour le tableau
+ETATS_LABELS_TABLEAU = {
+    'prompts_deployes': '🟢 AVANCÉ',
+    'tests_realises': '🔵 INTERMÉDIAIRE',
+    'en_emergence': '🟡 EN ÉMERGENCE',
+    'a_initier': '🔴 À INITIER'
+}
+
+# Colonnes affichées (et exportées) par le mode Tableau
+TABLE_COLUMNS = [
+    'État', 'Filière', 'Référent', 'Référents délégués', 'Collab. sensibilisés IAGen',
+    'Collab. total', 'Niveau autonomie', 'Fiches opportunité', 'LaPoste GPT', 'Copilot'
+]
+
+def build_filieres_frame(filieres):
+    """Construit le modèle en colonnes des filières (un DataFrame indexé par clé de filière).
+
+    Contient les colonnes du mode Tableau, les colonnes brutes servant aux filtres
+    (``etat_avancement``, ``responsables``) et le rang ``ordre_tri`` précalculé.
+    Construit une fois par version des données ; filtres et tris en sont des vues.
+    """
+    import pandas as pd
+    rows = []
+    for filiere in filieres.values():
+        etat = filiere.get('etat_avancement', 'initialisation')
+        acces = filiere.get('acces', {})
+        rows.append((
+            ETATS_LABELS_TABLEAU.get(etat, etat),
+            f"{filiere.get('icon', '📁')} {filiere.get('nom', 'Filière')}",
+            filiere.get('referent_metier', 'Non défini'),
+            filiere.get('nombre_referents_delegues', 0),
+            filiere.get('nombre_collaborateurs_sensibilises', 0),
+            filiere.get('nombre_collaborateurs_total', 0),
+            filiere.get('niveau_autonomie', ''),
+            filiere.get('fopp_count', 0),
+            acces.get('laposte_gpt', 0),
+            acces.get('copilot_licences', 0),
+            filiere.get('etat_avancement'),
+            filiere.get('responsable_pole_data', []),
+            ORDRE_ETATS.index(etat) if etat in ORDRE_ETATS else 999
+        ))
+    columns = TABLE_COLUMNS + ['etat_avancement', 'responsables', 'ordre_tri']
+    return pd.DataFrame.from_records(rows, index=list(filieres.keys()), columns=columns)
+
+def filter_filieres(frame, filtre_etat='Tous', filtre_responsable='Tous'):
+    """Clés des filières retenues par les filtres ("Tous" = pas de filtre), dans l'ordre du document."""
+    mask = frame['etat_avancement'].eq(filtre_etat) if filtre_etat != 'Tous' else None
+    if filtre_responsable != 'Tous':
+        responsables = frame['responsables'].explode()
+        mask_responsable = frame.index.isin(responsables.index[responsables.eq(filtre_responsable)])
+        mask = mask_responsable if mask is None else mask & mask_responsable
+    return frame.index if mask is None else frame.index[mask]
+
+def sort_for_table(frame):
+    """Vue triée par ordre d'avancement (avancé en haut) puis par filière, colonnes du tableau."""
+    return frame.sort_values(by=['ordre_tri', 'Filière'])[TABLE_COLUMNS]
+
+def content_hash(value):
+    """Empreinte stable d'une valeur JSON (indépendante de l'ordre des clés)."""
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+# Marqueur (sérialisable en JSON) d'un champ ou d'une clé supprimé(e)
+REMOVED = {"__removed__": True}
+
+# Champ des événements récents : selon le backend, stocké dans le document ou dans un journal
+EVENTS_FIELD = 'evenements_recents'
+
+def diff_events(before, after):
+    """Événements de ``before`` absents de ``after`` et inversement (un modifié compte pour les deux)."""
+    removed = list(before)
+    added = []
+    for event in after:
+        if event in removed:
+            removed.remove(event)
+        else:
+            added.append(event)
+    return removed, added
+
+def events_change(removed, added):
+    """Changement de la liste des événements : retraits et ajouts, fusionnés par union.
+
+    Deux sessions qui ajoutent chacune un événement ne sont pas en conflit : chaque
+    changement est rejoué sur la liste enregistrée au lieu de la remplacer.
+    """
+    return {"__events__": {"remove": list(removed), "add": list(added)}}
+
+def is_events_change(value):
+    return isinstance(value, dict) and "__events__" in value
+
+def apply_events_change(events, change):
+    """Liste ``events`` après ``change`` ; rejouer un même changement ne duplique rien."""
+    events = list(events or [])
+    for event in change["__events__"]["remove"]:
+        if event in events:
+            events.remove(event)
+    events = [event for event in change["__events__"]["add"] if event not in events] + events
+    # Le plus récent d'abord ; à date égale, le dernier ajouté en tête
+    return sorted(events, key=lambda event: event.get('date', ''), reverse=True)
+
+def combine_field_changes(earlier, later):
+    """Valeur d'un champ modifié par ``earlier`` puis ``later`` ; ``later`` l'emporte."""
+    if not is_events_change(later):
+        return later
+    if not is_events_change(earlier):
+        return later if earlier == REMOVED else apply_events_change(earlier, later)
+    earlier, later = earlier["__events__"], later["__events__"]
+    return events_change(
+        earlier["remove"] + [event for event in later["remove"] if event not in earlier["add"]],
+        later["add"] + [event for event in earlier["add"] if event not in later["remove"]]
+    )
+
+def _flatten(filiere):
+    """Aplatit les sous-dictionnaires d'un niveau (ex: "acces.laposte_gpt")."""
+    flat = {}
+    for field, value in filiere.items():
+        if isinstance(value, dict) and value:
+            for subfield, subvalue in value.items():
+                flat[f"{field}.{subfield}"] = subvalue
+        else:
+            flat[field] = value
+    return flat
+
+def diff_filiere(base, current):
+    """Retourne les champs de ``current`` qui diffèrent de ``base`` : {chemin: nouvelle valeur}."""
+    base_flat, current_flat = _flatten(base), _flatten(current)
+    changes = {path: value for path, value in current_flat.items()
+               if path not in base_flat or base_flat[path] != value}
+    changes.update({path: REMOVED for path in base_flat if path not in current_flat})
+    if isinstance(changes.get(EVENTS_FIELD), list) and isinstance(base_flat.get(EVENTS_FIELD), list):
+        changes[EVENTS_FIELD] = events_change(*diff_events(base_flat[EVENTS_FIELD], changes[EVENTS_FIELD]))
+    return changes
+
+def apply_filiere_changes(filiere, changes):
+    """Applique à ``filiere`` (en place) des changements produits par ``diff_filiere``."""
+    # L'ordre trié traite "acces" avant "acces.laposte_gpt"
+    for path in sorted(changes):
+        value = changes[path]
+        field, _, subfield = path.partition('.')
+        if is_events_change(value):
+            filiere[field] = apply_events_change(filiere.get(field), value)
+        elif subfield:
+            if value == REMOVED:
+                if isinstance(filiere.get(field), dict):
+                    filiere[field].pop(subfield, None)
+                continue
+            if not isinstance(filiere.get(field), dict):
+                filiere[field] = {}
+            filiere[field][subfield] = value
+        elif value == REMOVED:
+            filiere.pop(field, None)
+        else:
+            filiere[field] = value
+    return filiere
+
+def diff_documents(base, current):
+    """Calcule les changements entre deux versions du document.
+
+    Retourne ``{"filieres": {clé: {chemin: valeur} | None}, "document": {nom: valeur}}``
+    (sections absentes si vides) : ``None`` signale une filière supprimée et ``document``
+    couvre les autres clés de premier niveau (``etats_avancement``...). Un dict vide
+    signifie qu'il n'y a rien à enregistrer.
+    """
+    changes = {}
+    base_filieres = base.get('filieres', {})
+    current_filieres = current.get('filieres', {})
+    filieres = {}
+    for key, filiere in current_filieres.items():
+        filiere_changes = diff_filiere(base_filieres.get(key, {}), filiere)
+        if filiere_changes:
+            filieres[key] = filiere_changes
+    for key in base_filieres:
+        if key not in current_filieres:
+            filieres[key] = None
+    document = {name: value for name, value in current.items()
+                if name != 'filieres' and base.get(name) != value}
+    document.update({name: REMOVED for name in base
+                     if name != 'filieres' and name not in current})
+    if filieres:
+        changes['filieres'] = filieres
+    if document:
+        changes['document'] = document
+    return changes
+
+def apply_changes(data, changes):
+    """Applique à ``data`` (en place) des changements produits par ``diff_documents``."""
+    filieres = data.setdefault('filieres', {})
+    for key, filiere_changes in changes.get('filieres', {}).items():
+        if filiere_changes is None:
+            filieres.pop(key, None)
+        else:
+            apply_filiere_changes(filieres.setdefault(key, {}), filiere_changes)
+    for name, value in changes.get('document', {}).items():
+        if value == REMOVED:
+            data.pop(name, None)
+        else:
+            data[name] = value
+    return data
+
+def find_conflicts(base, changes, theirs):
+    """Fusion à trois voies : liste les changements qui entrent en conflit avec ``theirs``.
+
+    ``changes`` a été calculé contre ``base`` ; ``theirs`` est la version enregistrée
+    entre-temps par quelqu'un d'autre. Il y a conflit lorsqu'un même champ a été modifié
+    des deux côtés avec des valeurs différentes (ou qu'une filière modifiée d'un côté a
+    été supprimée de l'autre). Chaque conflit est un dict ``{"filiere", "champ", "base",
+    "mine", "theirs"}`` ; ``champ`` vaut None pour un conflit portant sur la filière
+    entière et ``filiere`` vaut None pour les autres clés du document. Les changements
+    d'événements (``events_change``) se fusionnent par union et n'en créent jamais.
+    """
+    conflicts = []
+    base_filieres = base.get('filieres', {})
+    theirs_filieres = theirs.get('filieres', {})
+    for key, filiere_changes in changes.get('filieres', {}).items():
+        base_filiere = base_filieres.get(key)
+        theirs_filiere = theirs_filieres.get(key)
+        if filiere_changes is None or (base_filiere is not None and theirs_filiere is None):
+            # Suppression d'un côté, modification de l'autre
+            if theirs_filiere != base_filiere:
+                conflicts.append({"filiere": key, "champ": None, "base": base_filiere,
+                                  "mine": filiere_changes, "theirs": theirs_filiere})
+            continue
+        base_flat = _flatten(base_filiere or {})
+        theirs_flat = _flatten(theirs_filiere or {})
+        for path, mine in filiere_changes.items():
+            if is_events_change(mine):
+                continue
+            base_value = base_flat.get(path, REMOVED)
+            theirs_value = theirs_flat.get(path, REMOVED)
+            if theirs_value != base_value and theirs_value != mine:
+                conflicts.append({"filiere": key, "champ": path, "base": base_value,
+                                  "mine": mine, "theirs": theirs_value})
+    for name, mine in changes.get('document', {}).items():
+        base_value = base.get(name, REMOVED)
+        theirs_value = theirs.get(name, REMOVED)
+        if theirs_value != base_value and theirs_value != mine:
+            conflicts.append({"filiere": None, "champ": name, "base": base_value,
+                              "mine": mine, "theirs": theirs_value})
+    return conflicts
+
+def _changed_fields(changes):
+    """Champs visés par des changements : (clé de filière ou None, chemin ou None) -> valeur."""
+    fields = {}
+    for key, filiere_changes in changes.get('filieres', {}).items():
+        if filiere_changes is None:
+            fields[(key, None)] = None
+        else:
+            fields.update({(key, path): value for path, value in filiere_changes.items()})
+    fields.update({(None, name): value for name, value in changes.get('document', {}).items()})
+    return fields
+
+def find_change_conflicts(base, changes, theirs_changes):
+    """Comme ``find_conflicts``, mais contre les changements écrits par l'autre côté.
+
+    Il y a conflit lorsque ``theirs_changes`` a écrit un champ de ``changes`` avec une
+    autre valeur ; les valeurs que l'autre version n'a fait que recopier n'en créent pas.
+    """
+    mine = _changed_fields(changes)
+    mine_filieres = {key for key, _ in mine if key is not None}
+    conflicts = []
+    for (key, path), theirs in _changed_fields(theirs_changes).items():
+        if key is not None and path is None and key in mine_filieres and (key, None) not in mine:
+            # Filière supprimée d'un côté, modifiée de l'autre
+            mine[(key, None)] = changes['filieres'][key]
+        if (key, path) not in mine or mine[(key, path)] == theirs:
+            continue
+        if is_events_change(mine[(key, path)]) or is_events_change(theirs):
+            continue
+        if key is None:
+            base_value = base.get(path, REMOVED)
+        else:
+            base_filiere = base.get('filieres', {}).get(key)
+            base_value = base_filiere if path is None else _flatten(base_filiere or {}).get(path, REMOVED)
+        conflicts.append({"filiere": key, "champ": path, "base": base_value,
+                          "mine": mine[(key, path)], "theirs": theirs})
+    return conflicts
+
+def conflicts_written_by(conflicts, theirs_changes):
+    """Conflits de ``find_conflicts`` dont le champ a vraiment été écrit par ``theirs_changes``."""
+    fields = _changed_fields(theirs_changes)
+    filieres = {key for key, _ in fields if key is not None}
+    return [c for c in conflicts
+            if (c["filiere"], c["champ"]) in fields or (c["filiere"], None) in fields
+            or (c["champ"] is None and c["filiere"] in filieres)]
+
+def drop_changes(changes, conflicts):
+    """Retire de ``changes`` les changements visés par ``conflicts`` (on garde leur version)."""
+    kept = {section: dict(values) for section, values in changes.items()}
+    for conflict in conflicts:
+        key, path = conflict["filiere"], conflict["champ"]
+        if key is None:
+            kept.get('document', {}).pop(path, None)
+        elif path is None:
+            kept.get('filieres', {}).pop(key, None)
+        elif kept.get('filieres', {}).get(key) is not None:
+            kept['filieres'][key] = {p: v for p, v in kept['filieres'][key].items() if p != path}
+            if not kept['filieres'][key]:
+                del kept['filieres'][key]
+    return {section: values for section, values in kept.items() if values}
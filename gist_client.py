@@ -0,0 +1,328 @@
+"""Accès HTTP au Gist GitHub : client partagé (connexions réutilisées, délais, reprises,
+disjoncteur) et chargement par requêtes conditionnelles (ETag) avec copie locale sur disque."""
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from filieres_model import parse_document
+
+GIST_API_URL = "https://api.github.com/gists/{gist_id}"
+# Gist et fichier des filières (application, diagnostic, API Gist locale des benchmarks)
+DEFAULT_GIST_ID = "e5f2784739d9e2784a3f067217b25e01"
+DEFAULT_FILENAME = "filieres_data.json"
+
+# Délais de connexion et de lecture (en secondes) : une réponse lente de GitHub ne
+# bloque jamais un thread indéfiniment
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 20
+# Reprises sur erreur réseau ou réponse 429/5xx, avec attente exponentielle plafonnée
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 8
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Durée maximale d'un appel, reprises et attentes comprises : en tâche de fond, et pour
+# une session qui attend sa sauvegarde (voir ``GistClient.interactive``)
+REQUEST_DEADLINE = 45
+INTERACTIVE_DEADLINE = 15
+# Disjoncteur : ouvert après BREAKER_THRESHOLD échecs consécutifs, pendant BREAKER_COOLDOWN secondes
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+# Connexions gardées ouvertes (keep-alive) par hôte
+POOL_SIZE = 10
+
+
+# Quota de l'API GitHub d'après les en-têtes X-RateLimit-* de la dernière réponse
+RateLimit = namedtuple("RateLimit", ["remaining", "reset_at"])
+
+
+def is_rate_limited(response):
+    """Vrai si la réponse est un refus pour quota d'API épuisé (inutile de réessayer avant sa réinitialisation)."""
+    return response.status_code in (403, 429) and response.headers.get("X-RateLimit-Remaining") == "0"
+
+
+def history_versions(gist):
+    """Versions du Gist de la réponse, de la plus récente à la plus ancienne."""
+    return [entry.get("version") for entry in gist.get("history", [])]
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Levée sans requête réseau tant que le disjoncteur est ouvert."""
+
+
+class CircuitBreaker:
+    """Disjoncteur : après ``threshold`` échecs consécutifs, les requêtes sont refusées
+    pendant ``cooldown`` secondes, puis une seule requête d'essai est laissée passer."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            # Essai : le délai repart pour les autres requêtes jusqu'à son résultat
+            self.opened_at = time.monotonic()
+            return True
+
+    def retry_in(self):
+        """Secondes restantes avant la prochaine requête d'essai (0 si le disjoncteur est fermé)."""
+        if self.opened_at is None:
+            return 0
+        return max(0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class GistClient:
+    """Client HTTP partagé par tous les accès au Gist (lecture du refresher, sauvegardes).
+
+    Une seule ``requests.Session`` garde les connexions ouvertes entre les requêtes.
+    Les erreurs réseau et les réponses 429/5xx sont retentées ; une fois les reprises
+    épuisées, l'échec est compté par le disjoncteur. Les autres réponses (304, 403,
+    404...) sont retournées telles quelles. Chaque appel, reprises comprises, tient dans
+    ``deadline`` secondes.
+    """
+
+    def __init__(self, token=None, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=MAX_RETRIES,
+                 backoff=BACKOFF_FACTOR, breaker=None, deadline=REQUEST_DEADLINE):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+        self.rate_limit = None
+        # Délai global des appels du thread courant faits pour une session (``interactive``)
+        self._local = threading.local()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            # Use authentication for higher rate limit
+            self.session.headers["Authorization"] = f"token {token}"
+
+    def _delay(self, attempt, response):
+        """Attente avant la reprise ``attempt`` (Retry-After s'il est raisonnable)."""
+        delay = self.backoff * 2 ** attempt
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return min(delay, MAX_BACKOFF)
+
+    def _record_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset_at = response.headers.get("X-RateLimit-Reset")
+        if remaining and reset_at and remaining.isdigit() and reset_at.isdigit():
+            self.rate_limit = RateLimit(int(remaining), int(reset_at))
+
+    @contextmanager
+    def interactive(self, deadline=INTERACTIVE_DEADLINE):
+        """Requêtes du thread courant attendues par une session (sauvegarde depuis l'interface).
+
+        Elles tiennent dans ``deadline`` secondes au total et ne sont pas reprises après un
+        délai de lecture dépassé : GitHub a pu recevoir la requête, l'utilisateur voit
+        l'erreur au lieu d'attendre plusieurs fois ``READ_TIMEOUT``.
+        """
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = deadline
+        try:
+            yield self
+        finally:
+            self._local.deadline = previous
+
+    def request(self, method, url, deadline=None, retry_read_timeout=None, **kwargs):
+        """Requête avec reprises ; ``deadline`` et ``retry_read_timeout`` valent par défaut
+        ceux du client, ou ceux de ``interactive`` dans un tel bloc."""
+        interactive = getattr(self._local, "deadline", None)
+        if deadline is None:
+            deadline = interactive if interactive is not None else self.deadline
+        if retry_read_timeout is None:
+            retry_read_timeout = interactive is None
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"Gist injoignable : nouvel essai dans {self.breaker.retry_in():.0f} s"
+            )
+        connect_timeout, read_timeout = kwargs.pop("timeout", self.timeout)
+        end = time.monotonic() + deadline
+        for attempt in range(self.retries + 1):
+            response, error = None, None
+            # Le délai de chaque tentative est borné par le temps restant
+            remaining = end - time.monotonic()
+            timeout = (min(connect_timeout, remaining), min(read_timeout, remaining))
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ReadTimeout as e:
+                error = e
+                if not retry_read_timeout:
+                    break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            else:
+                self._record_rate_limit(response)
+                if is_rate_limited(response):
+                    # Quota épuisé : ni panne ni raison de réessayer tout de suite
+                    return response
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.success()
+                    return response
+            if attempt < self.retries:
+                delay = self._delay(attempt, response)
+                if time.monotonic() + delay >= end:
+                    # Plus le temps d'une nouvelle tentative
+                    break
+                time.sleep(delay)
+        self.breaker.failure()
+        if error is not None:
+            raise error
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+
+class GistLoader:
+    """Charge le document d'un Gist en réutilisant le dernier ETag connu.
+
+    Le dernier contenu reçu, son ETag et sa version (``history[0].version``) sont
+    conservés dans ``snapshot_dir`` : après un redémarrage, la première requête peut
+    donc déjà obtenir un 304. Sur un 304, ni le téléchargement ni le ``json.loads`` +
+    migration ne sont refaits.
+    """
+
+    def __init__(self, gist_id, filename, token, snapshot_dir, client=None, api_url=GIST_API_URL):
+        self.url = api_url.format(gist_id=gist_id)
+        self.filename = filename
+        self.client = client or GistClient(token)
+        self.snapshot_path = os.path.join(snapshot_dir, filename)
+        self.etag_path = self.snapshot_path + ".etag"
+        self.etag = None
+        self.version = None
+        # Historique des versions (la plus récente d'abord) de la dernière réponse complète
+        self.history = []
+        self.data = None
+        self._lock = threading.Lock()
+        self._read_etag()
+
+    def _headers(self):
+        return {"If-None-Match": self.etag} if self.etag else {}
+
+    def _read_etag(self):
+        """Récupère l'ETag et la version de l'instantané local, s'il existe et est complet."""
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.etag_path, encoding='utf-8') as f:
+                lines = f.read().split()
+        except OSError:
+            return
+        # Sans version (ancien format), l'instantané est retéléchargé une fois
+        if len(lines) == 2:
+            self.etag, self.version = lines
+
+    def _read_snapshot(self):
+        with open(self.snapshot_path, encoding='utf-8') as f:
+            return parse_document(f.read())
+
+    def _write_snapshot(self, content, etag, version):
+        """Écrit le contenu puis l'ETag et la version de manière atomique (fichier temporaire + rename)."""
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        marker = f"{etag}\n{version}\n" if etag and version else ""
+        for path, text in ((self.snapshot_path, content), (self.etag_path, marker)):
+            # Fichier temporaire propre à chaque écriture : deux processus partageant le
+            # dossier ne s'écrasent pas l'un l'autre avant le rename
+            directory, name = os.path.split(os.path.abspath(path))
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=name + ".",
+                                             suffix=".tmp", delete=False) as f:
+                f.write(text)
+            try:
+                os.replace(f.name, path)
+            except OSError:
+                os.remove(f.name)
+                raise
+
+    def load(self):
+        """Retourne ``(data, changed)`` ; ``changed`` vaut False si le Gist a répondu 304."""
+        with self._lock:
+            r = self.client.get(self.url, headers=self._headers())
+            if r.status_code == 304 and self.data is None:
+                # Premier chargement après redémarrage : on relit l'instantané local
+                try:
+                    self.data = self._read_snapshot()
+                except (OSError, ValueError):
+                    # Instantané illisible : on oublie l'ETag et on retélécharge
+                    self.etag = self.version = None
+                    r = self.client.get(self.url, headers=self._headers())
+            if r.status_code == 304:
+                return self.data, False
+            r.raise_for_status()
+            return self._accept(r), True
+
+    def last_good(self):
+        """Dernier document reçu, relu depuis l'instantané local : ``(data, version)`` ou None."""
+        try:
+            return self._read_snapshot(), self.version
+        except (OSError, ValueError):
+            return None
+
+    def fetch_files(self, version=None):
+        """Fichiers du Gist ``{nom: contenu}`` et historique des versions, à la version
+        donnée (``GET /gists/<id>/<version>``) ou à la dernière (sans ETag)."""
+        r = self.client.get(f"{self.url}/{version}" if version else self.url)
+        r.raise_for_status()
+        gist = r.json()
+        return {name: f.get("content") for name, f in gist["files"].items()}, history_versions(gist)
+
+    def install(self, data, content, etag, history):
+        """Adopte le document qui vient d'être écrit (réponse du PATCH) comme dernier chargé.
+
+        Si l'ETag du PATCH ne correspond pas à celui d'un GET, la requête conditionnelle
+        suivante répond simplement 200 au lieu de 304.
+        """
+        with self._lock:
+            self.data = data
+            self.etag = etag
+            self.history = history
+            self.version = history[0] if history else None
+            try:
+                self._write_snapshot(content, etag, self.version)
+            except OSError:
+                pass
+
+    def _accept(self, r):
+        """Parse une réponse 200, met à jour l'ETag, la version et l'instantané local."""
+        gist = r.json()
+        content = gist["files"][self.filename]["content"]
+        self.data = parse_document(content)
+        self.etag = r.headers.get("ETag")
+        self.history = history_versions(gist)
+        self.version = self.history[0] if self.history else None
+        try:
+            self._write_snapshot(content, self.etag, self.version)
+        except OSError:
+            # L'instantané n'est qu'une optimisation : on continue sans lui
+            pass
+        return self.data
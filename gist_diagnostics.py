@@ -0,0 +1,146 @@
+"""Diagnostic et mesure des performances d'accès au Gist des filières.
+
+Mesure sur N itérations : latence (p50/p95) des chargements complets et des requêtes
+conditionnelles (ETag), taux de réponses 304, taille du contenu, temps de ``json.loads``
+et de migration des filières, quota d'API restant. Le résultat est écrit en JSON pour
+suivre les performances du backend Gist dans le temps.
+
+Le token est lu dans la variable d'environnement GITHUB_PAT (comme l'application).
+
+Usage : python gist_diagnostics.py [--iterations 10] [--gist-id ID] [--api-url URL] [--output fichier.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from filieres_model import migrate_filiere_fields
+from gist_client import DEFAULT_FILENAME, DEFAULT_GIST_ID, GIST_API_URL, GistClient
+
+
+def percentile(values, p):
+    """Percentile ``p`` (0-100) par la méthode du rang le plus proche."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(durations):
+    """Statistiques de latence en millisecondes."""
+    ms = [round(d * 1000, 3) for d in durations]
+    return {
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "min_ms": min(ms) if ms else None,
+        "max_ms": max(ms) if ms else None,
+    }
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run_diagnostics(gist_id, filename, token, iterations, api_url=GIST_API_URL):
+    """Exécute les mesures et retourne le rapport (dict sérialisable en JSON)."""
+    # Pas de reprise : on mesure le comportement réel de chaque requête
+    client = GistClient(token, retries=0)
+    url = api_url.format(gist_id=gist_id)
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "gist_id": gist_id,
+        "filename": filename,
+        "iterations": iterations,
+        "authenticated": bool(token),
+        "errors": [],
+    }
+
+    full, loads, migrations = [], [], []
+    etag, content, r = None, None, None
+    for _ in range(iterations):
+        r, duration = timed(client.get, url)
+        if r.status_code != 200:
+            report["errors"].append({"request": "full", "status": r.status_code, "body": r.text[:200]})
+            break
+        full.append(duration)
+        etag = r.headers.get("ETag")
+        gist = r.json()
+        if filename not in gist.get("files", {}):
+            report["errors"].append({"request": "full", "error": f"fichier {filename} absent",
+                                     "files": list(gist.get("files", {}))})
+            break
+        content = gist["files"][filename]["content"]
+        data, duration = timed(json.loads, content)
+        loads.append(duration)
+        _, duration = timed(lambda: [migrate_filiere_fields(f) for f in data.get("filieres", {}).values()])
+        migrations.append(duration)
+    report["full_fetch"] = summarize(full)
+    if content is not None:
+        report["payload"] = {
+            "response_bytes": len(r.content),
+            "content_bytes": len(content.encode("utf-8")),
+            "filieres": len(json.loads(content).get("filieres", {})),
+        }
+    report["parse"] = {"json_loads": summarize(loads), "migrate_filieres": summarize(migrations)}
+
+    conditional, not_modified = [], 0
+    if etag:
+        for _ in range(iterations):
+            r, duration = timed(client.get, url, headers={"If-None-Match": etag})
+            conditional.append(duration)
+            if r.status_code == 304:
+                not_modified += 1
+            elif r.status_code == 200:
+                etag = r.headers.get("ETag", etag)
+            else:
+                report["errors"].append({"request": "conditional", "status": r.status_code, "body": r.text[:200]})
+                break
+    report["conditional"] = dict(
+        summarize(conditional),
+        requests=len(conditional),
+        not_modified=not_modified,
+        hit_rate=not_modified / len(conditional) if conditional else None,
+    )
+
+    rate_limit = client.rate_limit
+    report["rate_limit"] = {
+        "remaining": rate_limit.remaining if rate_limit else None,
+        "reset_at": datetime.fromtimestamp(rate_limit.reset_at, timezone.utc).isoformat() if rate_limit else None,
+    }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diagnostic et latence du backend Gist")
+    parser.add_argument("--gist-id", default=os.environ.get("GIST_ID", DEFAULT_GIST_ID))
+    parser.add_argument("--filename", default=DEFAULT_FILENAME)
+    parser.add_argument("--api-url", default=os.environ.get("GIST_API_URL", GIST_API_URL),
+                        help="URL de l'API Gist ({gist_id} est remplacé), ex. celle de benchmarks/gist_stub.py")
+    parser.add_argument("-n", "--iterations", type=int, default=10)
+    parser.add_argument("-o", "--output", help="fichier JSON de sortie (sortie standard par défaut)")
+    args = parser.parse_args(argv)
+
+    token = os.environ.get("GITHUB_PAT")
+    if not token:
+        print("⚠️ GITHUB_PAT non défini : requêtes anonymes (quota de 60 requêtes/heure)", file=sys.stderr)
+    try:
+        report = run_diagnostics(args.gist_id, args.filename, token, max(1, args.iterations), args.api_url)
+    except Exception as e:
+        report = {"gist_id": args.gist_id, "errors": [{"error": f"{type(e).__name__}: {e}"}]}
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Cache LRU borné et partagé entre threads, commun aux caches de rendu et d'export."""
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRU:
+    """Garde au plus ``maxsize`` valeurs, en évinçant la moins récemment utilisée.
+
+    La valeur absente est construite hors verrou : deux threads peuvent la construire en
+    même temps, le dernier l'emporte (le résultat est le même pour une même clé).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, build):
+        """Retourne la valeur de ``key``, construite par ``build()`` si elle est absente."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
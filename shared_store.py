@@ -0,0 +1,170 @@
+"""Magasin de données partagé par toutes les sessions Streamlit d'un même processus."""
+import copy
+import threading
+import time
+from functools import cached_property
+
+from filieres_model import build_filieres_frame, compute_aggregates, content_hash
+
+
+class DataSnapshot:
+    """Version figée des données, partagée en lecture seule entre les sessions.
+
+    ``data`` ne doit jamais être modifié en place : utiliser ``copy()`` pour obtenir
+    une copie modifiable avant une sauvegarde. ``revision`` est la révision du backend
+    (ETag, compteur...) correspondant à ``data``, utilisée pour détecter les conflits.
+    """
+
+    def __init__(self, version, data, revision=None):
+        self.version = version
+        self.data = data
+        self.revision = revision
+
+    def copy(self):
+        """Retourne une copie profonde et modifiable des données."""
+        return copy.deepcopy(self.data)
+
+    @cached_property
+    def hashes(self):
+        """Empreinte du contenu de chaque filière, calculée une seule fois par version."""
+        return {key: content_hash(filiere) for key, filiere in self.data.get('filieres', {}).items()}
+
+    @cached_property
+    def aggregates(self):
+        """Totaux, répartition par état et séries d'accès, calculés une seule fois par version."""
+        return compute_aggregates(self.data.get('filieres', {}))
+
+    @cached_property
+    def frame(self):
+        """Modèle en colonnes (DataFrame) des filières, construit une seule fois par version."""
+        return build_filieres_frame(self.data.get('filieres', {}))
+
+
+# Fraction du temps écoulé depuis le dernier changement observé utilisée comme intervalle
+# d'interrogation : rapide juste après une modification, de plus en plus espacé ensuite
+IDLE_FRACTION = 0.25
+# Requêtes de l'API gardées en réserve (sauvegardes, diagnostics) quand le quota s'épuise
+RATE_LIMIT_RESERVE = 50
+
+
+class SharedDataStore:
+    """Rafraîchit les données une seule fois par intervalle, quel que soit le nombre de sessions.
+
+    Un unique thread d'arrière-plan interroge le backend ; les sessions se contentent de
+    lire l'instantané courant via ``snapshot()``. Le numéro de version n'augmente que
+    lorsque le contenu a réellement changé.
+
+    Sans ``max_interval``, le backend est interrogé toutes les ``interval`` secondes.
+    Sinon l'intervalle s'adapte : ``interval`` tant que les données changent, puis une
+    fraction du temps écoulé depuis le dernier changement, jusqu'à ``max_interval`` ; il
+    est allongé si le quota d'API restant (``backend.rate_limit()``) ne suffirait pas
+    jusqu'à sa réinitialisation.
+    """
+
+    def __init__(self, backend, interval=10, max_interval=None):
+        self.backend = backend
+        self.interval = interval
+        self.max_interval = max_interval
+        self.poll_interval = interval
+        self.last_change = time.monotonic()
+        self.error = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refresh_requested = False
+        self._thread = None
+        # Incrémenté à chaque ``install`` : un chargement commencé avant ne doit pas
+        # republier une version antérieure à l'écriture
+        self._installs = 0
+
+    def start(self):
+        """Charge les données une première fois puis lance le thread de rafraîchissement."""
+        self.refresh()
+        self._thread = threading.Thread(target=self._run, name="filieres-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            self.poll_interval = self.next_interval()
+            if self._wake.wait(self.poll_interval):
+                self._wake.clear()
+                if not self._refresh_requested:
+                    # Réveil par ``install`` : le délai est recalculé, sans relecture immédiate
+                    continue
+                self._refresh_requested = False
+            self.refresh()
+
+    def next_interval(self):
+        """Délai avant la prochaine interrogation du backend (en secondes)."""
+        if self.max_interval is None:
+            return self.interval
+        idle = time.monotonic() - self.last_change
+        interval = min(max(self.interval, idle * IDLE_FRACTION), self.max_interval)
+        rate_limit = self.backend.rate_limit()
+        if rate_limit is not None:
+            # Répartit les requêtes restantes jusqu'à la réinitialisation du quota
+            remaining, reset_at = rate_limit
+            seconds_left = max(reset_at - time.time(), 1)
+            budget = remaining - RATE_LIMIT_RESERVE
+            interval = max(interval, seconds_left if budget <= 0 else seconds_left / budget)
+        return interval
+
+    def refresh(self):
+        """Interroge le backend et publie une nouvelle version si le contenu a changé."""
+        installs = self._installs
+        try:
+            # Document et révision lus ensemble : aucune sauvegarde ne s'intercale
+            with self.backend.lock:
+                data, _ = self.backend.load()
+                revision = self.backend.revision
+        except Exception as e:
+            # On garde le dernier instantané valide ; l'erreur reste consultable
+            self.error = e
+            if self._snapshot is None:
+                # Stockage injoignable dès le démarrage : dernière version connue du backend
+                fallback = self.backend.last_good()
+                with self._lock:
+                    if fallback is not None and self._snapshot is None:
+                        self._snapshot = DataSnapshot(1, *fallback)
+            return self._snapshot
+        self.error = None
+        with self._lock:
+            if installs != self._installs:
+                # Une écriture a été publiée pendant le chargement, qui peut lui être antérieur
+                return self._snapshot
+            # Le backend retourne le même objet tant que le contenu n'a pas changé ; on ne
+            # se fie pas à ``changed``, qui peut avoir été consommé par une sauvegarde
+            if self._snapshot is None or data is not self._snapshot.data:
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                self._snapshot = DataSnapshot(version, data, revision)
+                self.last_change = time.monotonic()
+            return self._snapshot
+
+    def install(self, data):
+        """Publie le document qui vient d'être enregistré, sans relire le stockage.
+
+        ``data`` doit être le document retourné par ``commit_changes`` : le backend le
+        garde comme document chargé, le prochain ``refresh`` ne publie donc rien de plus.
+        Appelé sous ``backend.lock``, avec la sauvegarde, pour que ``backend.revision``
+        soit bien celle de ``data``.
+        """
+        with self._lock:
+            self._installs += 1
+            if self._snapshot is None or data is not self._snapshot.data:
+                version = self._snapshot.version + 1 if self._snapshot else 1
+                self._snapshot = DataSnapshot(version, data, self.backend.revision)
+                self.last_change = time.monotonic()
+        # Une édition est en cours : le thread reprend tout de suite un rythme rapide, la
+        # prochaine interrogation ayant lieu ``interval`` secondes après la sauvegarde
+        self._wake.set()
+        return self._snapshot
+
+    def request_refresh(self):
+        """Réveille le thread pour un rafraîchissement anticipé (non bloquant)."""
+        self._refresh_requested = True
+        self._wake.set()
+
+    def snapshot(self):
+        """Retourne l'instantané courant, ou None si aucun chargement n'a encore réussi."""
+        return self._snapshot
@@ -0,0 +1,603 @@
+"""Backends de stockage du document des filières : Gist GitHub, fichier JSON local, SQLite."""
+import copy
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:
+    # Windows : seul le verrou entre threads du processus s'applique
+    fcntl = None
+
+from filieres_model import (
+    REMOVED, apply_changes, apply_filiere_changes, combine_field_changes, conflicts_written_by,
+    diff_documents, drop_changes, find_change_conflicts, find_conflicts, migrate_document,
+    migrate_filiere_fields, parse_document,
+)
+from gist_client import GIST_API_URL, GistLoader, history_versions
+from lru import BoundedLRU
+
+
+# Versions du Gist parcourues au plus pour retrouver les changements des autres écritures,
+# et versions relues gardées en mémoire
+MAX_HISTORY_WALK = 20
+VERSION_CACHE_SIZE = 64
+# Attente aléatoire avant de retenter une écriture concurrente (doublée à chaque tentative,
+# en secondes) : des instances qui se sont gênées ne retentent pas en même temps
+RETRY_JITTER = 0.05
+
+
+def dump_document(data):
+    """Sérialise le document complet, au même format que le fichier du dépôt."""
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+def _sha1(content):
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def _by_age(writes, history):
+    """Écritures ``[(version d'origine, changements)]`` de l'origine la plus ancienne à la
+    plus récente ; une origine absente de ``history`` compte comme la plus ancienne."""
+    age = {version: index for index, version in enumerate(history)}
+    return sorted(writes, key=lambda write: -age.get(write[0], len(history)))
+
+
+class RevisionMismatch(Exception):
+    """Le stockage a été modifié depuis la révision attendue.
+
+    ``overwritten`` est renseigné quand l'écriture a déjà eu lieu et a écrasé des
+    versions concurrentes (Gist) : ce sont leurs écritures ``[(version d'origine,
+    changements)]``, avec celles que l'écriture rétablissait déjà, à rétablir par une
+    nouvelle fusion.
+    """
+
+    def __init__(self, message, overwritten=None):
+        super().__init__(message)
+        self.overwritten = overwritten
+
+
+class ConflictError(Exception):
+    """Les mêmes champs ont été modifiés des deux côtés : la fusion automatique est impossible.
+
+    ``conflicts`` vient de ``find_conflicts`` ; ``theirs``/``revision`` décrivent la version
+    enregistrée contre laquelle les conflits ont été détectés.
+    """
+
+    def __init__(self, conflicts, theirs, revision):
+        super().__init__(f"{len(conflicts)} conflit(s) de modification")
+        self.conflicts = conflicts
+        self.theirs = theirs
+        self.revision = revision
+
+
+class StorageBackend:
+    """Interface commune des backends de stockage.
+
+    ``load()`` retourne ``(data, changed)`` : ``changed`` vaut False quand le contenu
+    n'a pas bougé depuis le chargement précédent, auquel cas ``data`` est l'objet déjà
+    retourné. ``revision`` identifie ensuite la version chargée (ETag, compteur...).
+    ``save(data)`` écrit le document complet et lève une exception en cas d'échec.
+    Après une écriture réussie, le backend garde ``data`` comme document chargé, avec
+    la nouvelle révision : le ``load()`` suivant le retourne sans relire le stockage.
+
+    ``lock`` sérialise entre les threads du processus la séquence relecture → fusion →
+    écriture de ``commit_changes``, et un chargement avec la lecture de sa ``revision``.
+    """
+
+    name = None
+    revision = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, data):
+        raise NotImplementedError
+
+    def changes_since(self, revision, exclude=()):
+        """Changements écrits par les autres depuis ``revision`` jusqu'à la version chargée
+        (hors versions ``exclude``), ou None si le backend ne sait pas les retrouver (les
+        documents sont alors comparés)."""
+        return None
+
+    def interactive(self):
+        """Contexte des accès faits pendant qu'une session attend (sauvegarde depuis
+        l'interface) : les backends distants y bornent leur durée."""
+        return nullcontext()
+
+    def rate_limit(self):
+        """Quota d'API restant ``(requêtes restantes, réinitialisation en secondes epoch)``,
+        ou None si le stockage n'en impose pas."""
+        return None
+
+    def last_good(self):
+        """Dernier document connu ``(data, revision)``, servi quand le stockage est injoignable
+        avant tout chargement réussi ; None si le backend n'en garde pas."""
+        return None
+
+    def save_changes(self, changes, data, expected_revision=None, restored=None):
+        """Écrit les ``changes`` calculés par ``diff_documents``.
+
+        ``data`` est le document complet qui en résulte : les backends incapables
+        d'écritures partielles (comme le Gist, dont l'API remplace le fichier entier)
+        se contentent de l'enregistrer en entier. Si ``expected_revision`` est fourni,
+        les backends qui savent le vérifier lèvent ``RevisionMismatch`` quand le
+        stockage a changé depuis cette révision. ``restored`` liste les changements
+        d'autres versions rétablis par cette écriture (voir ``GistBackend``), déjà
+        compris dans ``data``.
+        """
+        self.save(data)
+
+
+class GistBackend(StorageBackend):
+    """Document stocké dans un fichier d'un Gist GitHub (requêtes conditionnelles en lecture).
+
+    Chaque PATCH écrit aussi ``<nom>_changes.json`` avec l'empreinte du document écrit :
+    les changements propres de la version et ceux qu'elle rétablit après avoir écrasé
+    d'autres versions, chacun avec la version qui l'a écrit à l'origine. La fusion
+    distingue ainsi une écriture postérieure à sa base d'une valeur recopiée ou rétablie.
+    Une version sans cet enregistrement (écriture complète, autre outil) compte pour ses
+    différences avec la version précédente de l'historique.
+
+    Les écritures de versions sont manipulées en listes ``[(version d'origine, changements)]``.
+    """
+
+    name = "gist"
+
+    def __init__(self, gist_id, filename, token, snapshot_dir, client=None, api_url=GIST_API_URL):
+        super().__init__()
+        self.loader = GistLoader(gist_id, filename, token, snapshot_dir, client, api_url)
+        self.changes_filename = os.path.splitext(filename)[0] + "_changes.json"
+        # Fichiers des versions déjà relues, par version
+        self._versions = BoundedLRU(VERSION_CACHE_SIZE)
+
+    @property
+    def revision(self):
+        # Version du Gist (``history[0].version``), que la réponse d'un PATCH permet de vérifier
+        return self.loader.version
+
+    def load(self):
+        return self.loader.load()
+
+    def last_good(self):
+        return self.loader.last_good()
+
+    def interactive(self):
+        return self.loader.client.interactive()
+
+    def rate_limit(self):
+        return self.loader.client.rate_limit
+
+    def _patch(self, data, changes=None, restored=None):
+        """Écrit le document et ses changements ; retourne l'historique des versions."""
+        content = dump_document(data)
+        record = {"sha1": _sha1(content), "changes": changes, "restored": restored or []}
+        payload = {
+            "files": {
+                self.loader.filename: {
+                    "content": content
+                },
+                self.changes_filename: {
+                    "content": json.dumps(record, ensure_ascii=False)
+                }
+            }
+        }
+        r = self.loader.client.patch(self.loader.url, data=json.dumps(payload))
+        r.raise_for_status()
+        history = history_versions(r.json())
+        self.loader.install(data, content, r.headers.get("ETag"), history)
+        return history
+
+    def save(self, data):
+        self._patch(data)
+
+    def _files(self, version):
+        # Une version du Gist ne change plus : chacune n'est téléchargée qu'une fois
+        return self._versions.get(version, lambda: self.loader.fetch_files(version)[0])
+
+    def _writes(self, version, parent):
+        """Écritures de ``version`` (``parent`` la précède dans l'historique)."""
+        files = self._files(version)
+        content = files[self.loader.filename]
+        try:
+            record = json.loads(files.get(self.changes_filename) or "null")
+        except ValueError:
+            record = None
+        # Le fichier des changements d'une version qui ne l'a pas réécrit est celui d'une autre
+        if isinstance(record, dict) and record.get("changes") is not None and record.get("sha1") == _sha1(content):
+            return [tuple(entry) for entry in record.get("restored", [])] + [(version, record["changes"])]
+        parent_content = self._files(parent)[self.loader.filename]
+        return [(version, diff_documents(parse_document(parent_content), parse_document(content)))]
+
+    def _writes_between(self, history, since, start):
+        """Écritures des versions ``history[start:]`` postérieures à ``since``, de l'origine
+        la plus ancienne à la plus récente.
+
+        Retourne ``(écritures, complet)`` : au plus MAX_HISTORY_WALK versions sont
+        relues, et ``complet`` est faux si ``since`` n'a pas été atteinte.
+        """
+        found = since in history[start:]
+        end = history.index(since, start) if found else len(history) - 1
+        complete = found and end - start <= MAX_HISTORY_WALK
+        end = min(end, start + MAX_HISTORY_WALK)
+        writes = []
+        with self.lock:
+            for index in range(end - 1, start - 1, -1):
+                writes += self._writes(history[index], history[index + 1])
+        return _by_age(writes, history), complete
+
+    def changes_since(self, revision, exclude=()):
+        if revision == self.revision:
+            return {}
+        history = self.loader.history
+        if revision not in history:
+            # Historique inconnu (premier chargement par un 304) : relu une fois
+            history = self.loader.fetch_files()[1]
+        if self.revision not in history or revision not in history:
+            return None
+        writes, complete = self._writes_between(history, revision, history.index(self.revision))
+        if not complete:
+            return None
+        # Seules comptent les écritures d'origine postérieure à ``revision``
+        newer = set(history[:history.index(revision)]) - set(exclude)
+        return _merge_writes([write for write in writes if write[0] in newer])
+
+    def save_changes(self, changes, data, expected_revision=None, restored=None):
+        """Le PATCH n'est pas conditionnel : la version qu'il a remplacée (``history[1]``)
+        est comparée après coup à ``expected_revision``. Si d'autres instances ont écrit
+        entre la relecture et le PATCH, leurs versions ont été écrasées : ``RevisionMismatch``
+        transmet leurs écritures pour que ``commit_changes`` les rétablisse.
+        """
+        history = self._patch(data, changes, restored)
+        if expected_revision is not None and len(history) > 1 and history[1] != expected_revision:
+            overwritten, _ = self._writes_between(history, expected_revision, 1)
+            # Les écritures déjà en cours de rétablissement restent à rétablir, dans l'ordre
+            raise RevisionMismatch(self.loader.url, overwritten=_by_age(list(restored or []) + overwritten, history))
+
+
+class LocalFileBackend(StorageBackend):
+    """Document stocké dans un fichier JSON local (par défaut ``filieres_data.json``).
+
+    Les sauvegardes partielles sont ajoutées à un journal (``<fichier>.journal``, une
+    ligne JSON de changements par sauvegarde) rejoué au chargement ; le fichier
+    principal n'est réécrit que lorsque le journal atteint ``compact_threshold`` lignes.
+    Entre processus, lectures et écritures sont protégées par un verrou ``flock`` sur
+    ``<fichier>.lock`` (là où ``fcntl`` existe).
+    """
+
+    name = "local"
+
+    def __init__(self, path, compact_threshold=50):
+        super().__init__()
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.compact_threshold = compact_threshold
+        self.data = None
+        self._signature = None
+
+    @contextmanager
+    def _file_lock(self, shared=False):
+        """Verrou entre processus, exclusif pour écrire, partagé pour lire."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            # La fermeture du fichier libère le verrou
+            yield
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read_journal(self):
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def load(self):
+        with self.lock, self._file_lock(shared=True):
+            signature = (self._stat(self.path), self._stat(self.journal_path))
+            if self.data is not None and signature == self._signature:
+                return self.data, False
+            with open(self.path, encoding='utf-8') as f:
+                data = json.loads(f.read())
+            for changes in self._read_journal():
+                apply_changes(data, changes)
+            self.data = migrate_document(data)
+            self._signature = signature
+            return self.data, True
+
+    @property
+    def revision(self):
+        return self._signature
+
+    def save(self, data):
+        with self.lock, self._file_lock():
+            self._write(data)
+
+    def _write(self, data):
+        """Réécrit le fichier principal et supprime le journal (verrous déjà pris)."""
+        # Fichier temporaire propre à chaque écriture, dans le même dossier pour que
+        # le rename reste atomique
+        directory, name = os.path.split(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, prefix=name + ".",
+                                         suffix=".tmp", delete=False) as f:
+            f.write(dump_document(data))
+        try:
+            os.replace(f.name, self.path)
+        except OSError:
+            os.remove(f.name)
+            raise
+        # Le fichier principal contient désormais tout : le journal est obsolète
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._install(data)
+
+    def _install(self, data):
+        """Garde le document écrit comme document chargé (pas de relecture au prochain ``load``)."""
+        self.data = data
+        self._signature = (self._stat(self.path), self._stat(self.journal_path))
+
+    def save_changes(self, changes, data, expected_revision=None, restored=None):
+        # La révision est vérifiée sous les mêmes verrous que l'écriture
+        with self.lock, self._file_lock():
+            if expected_revision is not None:
+                if (self._stat(self.path), self._stat(self.journal_path)) != expected_revision:
+                    raise RevisionMismatch(self.path)
+            entries = len(self._read_journal())
+            if entries + 1 >= self.compact_threshold:
+                self._write(data)
+                return
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(changes, ensure_ascii=False) + "\n")
+            self._install(data)
+
+
+class SQLiteBackend(StorageBackend):
+    """Document stocké dans une base SQLite, à raison d'une ligne par filière.
+
+    Les autres clés de premier niveau (``etats_avancement``...) sont rangées dans la
+    table ``document``. Un compteur de révision, incrémenté à chaque écriture, permet
+    de savoir sans relire les lignes si le contenu a changé. Une base vide est
+    initialisée à partir de ``seed_path`` s'il est fourni.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS filieres (
+        key TEXT PRIMARY KEY,
+        position INTEGER NOT NULL,
+        content TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS document (
+        name TEXT PRIMARY KEY,
+        content TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS revision (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        value INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO revision (id, value) VALUES (1, 0);
+    """
+
+    def __init__(self, path, seed_path=None):
+        super().__init__()
+        self.path = path
+        self.data = None
+        self.revision = None
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(self.SCHEMA)
+            empty = conn.execute("SELECT value FROM revision").fetchone()[0] == 0
+        if empty and seed_path and os.path.exists(seed_path):
+            with open(seed_path, encoding='utf-8') as f:
+                self.save(parse_document(f.read()))
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self):
+        with closing(self._connect()) as conn:
+            revision = conn.execute("SELECT value FROM revision").fetchone()[0]
+            if self.data is not None and revision == self.revision:
+                return self.data, False
+            data = {
+                name: json.loads(content)
+                for name, content in conn.execute("SELECT name, content FROM document")
+            }
+            data['filieres'] = {
+                key: migrate_filiere_fields(json.loads(content))
+                for key, content in conn.execute("SELECT key, content FROM filieres ORDER BY position")
+            }
+        self.data, self.revision = data, revision
+        return data, True
+
+    def save(self, data):
+        filieres = data.get('filieres', {})
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM filieres")
+            conn.executemany(
+                "INSERT INTO filieres (key, position, content) VALUES (?, ?, ?)",
+                [(key, i, json.dumps(f, ensure_ascii=False)) for i, (key, f) in enumerate(filieres.items())]
+            )
+            conn.execute("DELETE FROM document")
+            conn.executemany(
+                "INSERT INTO document (name, content) VALUES (?, ?)",
+                [(name, json.dumps(value, ensure_ascii=False)) for name, value in data.items() if name != 'filieres']
+            )
+            conn.execute("UPDATE revision SET value = value + 1")
+            revision = conn.execute("SELECT value FROM revision").fetchone()[0]
+        self.data, self.revision = data, revision
+
+    def save_changes(self, changes, data, expected_revision=None, restored=None):
+        """Ne réécrit que les lignes des filières modifiées.
+
+        La révision est vérifiée et incrémentée dans la même transaction que l'écriture.
+        """
+        with closing(self._connect()) as conn, conn:
+            if expected_revision is None:
+                conn.execute("UPDATE revision SET value = value + 1")
+            elif conn.execute("UPDATE revision SET value = value + 1 WHERE value = ?",
+                              (expected_revision,)).rowcount == 0:
+                raise RevisionMismatch(self.path)
+            for key, filiere_changes in changes.get('filieres', {}).items():
+                if filiere_changes is None:
+                    conn.execute("DELETE FROM filieres WHERE key = ?", (key,))
+                    continue
+                row = conn.execute("SELECT content FROM filieres WHERE key = ?", (key,)).fetchone()
+                filiere = apply_filiere_changes(json.loads(row[0]) if row else {}, filiere_changes)
+                content = json.dumps(filiere, ensure_ascii=False)
+                if row:
+                    conn.execute("UPDATE filieres SET content = ? WHERE key = ?", (content, key))
+                else:
+                    conn.execute(
+                        "INSERT INTO filieres (key, position, content) "
+                        "SELECT ?, COALESCE(MAX(position) + 1, 0), ? FROM filieres",
+                        (key, content)
+                    )
+            for name, value in changes.get('document', {}).items():
+                if value == REMOVED:
+                    conn.execute("DELETE FROM document WHERE name = ?", (name,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO document (name, content) VALUES (?, ?)",
+                        (name, json.dumps(value, ensure_ascii=False))
+                    )
+            revision = conn.execute("SELECT value FROM revision").fetchone()[0]
+        self.data, self.revision = data, revision
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (GistBackend, LocalFileBackend, SQLiteBackend)
+}
+
+
+def create_backend(name, **options):
+    """Instancie le backend ``name`` ("gist", "local" ou "sqlite") avec ses options."""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend de stockage inconnu: {name!r} (attendu: {', '.join(BACKENDS)})")
+    return backend_class(**options)
+
+
+def _merge_changes(changes, later):
+    """Réunit deux ensembles de changements de ``diff_documents`` ; ``later`` l'emporte."""
+    merged = {section: dict(values) for section, values in changes.items()}
+    filieres = merged.setdefault('filieres', {})
+    for key, filiere_changes in later.get('filieres', {}).items():
+        if filiere_changes is None or filieres.get(key) is None:
+            filieres[key] = filiere_changes
+        else:
+            merged_filiere = filieres[key] = dict(filieres[key])
+            for path, value in filiere_changes.items():
+                merged_filiere[path] = (combine_field_changes(merged_filiere[path], value)
+                                        if path in merged_filiere else value)
+    merged.setdefault('document', {}).update(later.get('document', {}))
+    return {section: values for section, values in merged.items() if values}
+
+
+def _merge_writes(writes):
+    """Réunit les changements d'écritures ``[(origine, changements)]``, la dernière l'emportant."""
+    merged = {}
+    for _, changes in writes:
+        merged = _merge_changes(merged, changes)
+    return merged
+
+
+def commit_changes(backend, changes, base, base_revision, attempts=5):
+    """Enregistre ``changes`` (calculés contre ``base``) avec contrôle de concurrence optimiste.
+
+    Si le stockage a changé depuis ``base_revision``, les changements sont fusionnés
+    à trois voies dans la version enregistrée : les modifications portant sur d'autres
+    filières ou d'autres champs sont conservées, et ``ConflictError`` n'est levée que
+    si un même champ a été modifié des deux côtés. Quand le backend sait retrouver les
+    changements écrits depuis (``changes_since``), un champ qui diffère seulement parce
+    qu'une écriture concurrente a recopié ou rétabli une valeur antérieure n'est pas un
+    conflit. Retourne le document enregistré.
+
+    Dans le processus, ``backend.lock`` rend relecture, fusion et écriture atomiques.
+    Entre processus, les backends local et SQLite vérifient la révision au moment de
+    l'écriture. Le Gist, sans écriture conditionnelle, détecte après coup les versions
+    que son PATCH a écrasées : leurs écritures sont alors réappliquées à la dernière
+    version (sauf sur les champs réécrits depuis). Nos changements l'emportent sur les
+    valeurs antérieures à ``base_revision`` ; les conflits avec des écritures plus
+    récentes sont tranchés en faveur de la version écrasée et passent à l'arbitrage.
+    Cette réparation reste au mieux : si elle perd elle-même ``2 * attempts`` courses
+    d'affilée, ``RevisionMismatch`` est levée et la version écrasée peut être perdue.
+    """
+    with backend.lock:
+        theirs = None
+        conflicts = []
+        # Écritures des versions écrasées par nos PATCH (Gist), dernier document écrit et
+        # versions écrites par nos PATCH
+        restore, written, own = [], None, []
+        attempt = 0
+        # Une réparation en cours dispose d'un budget double : l'abandonner perd la version écrasée
+        while attempt < attempts or (restore and attempt < 2 * attempts):
+            if theirs is None:
+                theirs, _ = backend.load()
+            revision = backend.revision
+            if revision != base_revision and written is None:
+                conflicts = find_conflicts(base, changes, theirs)
+                if conflicts:
+                    theirs_changes = backend.changes_since(base_revision)
+                    if theirs_changes is not None:
+                        conflicts = conflicts_written_by(conflicts, theirs_changes)
+                if conflicts:
+                    raise ConflictError(conflicts, theirs, revision)
+            kept = drop_changes(changes, conflicts)
+            if written is not None:
+                # Un champ réécrit par quelqu'un d'autre depuis notre PATCH garde sa nouvelle
+                # valeur ; une valeur seulement recopiée par une écriture concurrente, non
+                rewritten = backend.changes_since(own[-1], exclude=own)
+
+                def unchanged(pending):
+                    if rewritten is None:
+                        return drop_changes(pending, find_conflicts(written, pending, theirs))
+                    return drop_changes(pending, find_change_conflicts(written, pending, rewritten))
+
+                kept = unchanged(kept)
+                restore = [(origin, unchanged(restored)) for origin, restored in restore]
+                restore = [(origin, restored) for origin, restored in restore if restored]
+            data = apply_changes(copy.deepcopy(theirs), _merge_changes(_merge_writes(restore), kept))
+            try:
+                backend.save_changes(kept, data, expected_revision=revision, restored=restore)
+            except RevisionMismatch as e:
+                if e.overwritten is not None:
+                    # Notre PATCH a écrasé d'autres versions : leurs écritures sont à rétablir,
+                    # et celles postérieures à notre base entrent en conflit avec nos changements
+                    own.append(backend.revision)
+                    restore = e.overwritten
+                    theirs_changes = backend.changes_since(base_revision, exclude=own)
+                    if theirs_changes is None:
+                        theirs_changes = _merge_writes(e.overwritten)
+                    conflicts += find_change_conflicts(base, drop_changes(changes, conflicts), theirs_changes)
+                    written = data
+                # Écriture concurrente : on refusionne sur la dernière version
+                theirs = None
+                time.sleep(random.uniform(0, RETRY_JITTER * 2 ** min(attempt, 4)))
+                attempt += 1
+                continue
+            if conflicts:
+                raise ConflictError(conflicts, data, backend.revision)
+            return data
+    raise RevisionMismatch(f"Sauvegarde abandonnée après {attempt} tentatives concurrentes")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules de l'application (racine du dépôt) et API Gist locale des benchmarks
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
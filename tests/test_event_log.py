@@ -0,0 +1,93 @@
+"""Journaux d'événements : modifications de l'Édition rejouées sur la version courante."""
+import multiprocessing
+
+import pytest
+
+from edit_batch import EVENTS_FIELD, EditBatch, diff_events
+from event_log import JsonlEventLog, SQLiteEventLog
+from filieres_model import apply_events_change
+
+
+def event(day, titre):
+    return {'date': f"2025-06-{day:02d}", 'titre': titre, 'description': titre.lower()}
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def event_log(request, tmp_path):
+    if request.param == "jsonl":
+        log = JsonlEventLog(str(tmp_path / "events.jsonl"))
+    else:
+        log = SQLiteEventLog(str(tmp_path / "events.db"))
+    log.seed({'achats': {EVENTS_FIELD: [event(3, "COSUI"), event(2, "Atelier"), event(1, "Lancement")]}})
+    return log
+
+
+def test_diff_events_counts_an_edited_event_as_removed_and_added():
+    before = [event(3, "COSUI"), event(2, "Atelier")]
+    after = [event(3, "COSUI"), event(2, "Atelier modifié"), event(4, "Démonstration")]
+    assert diff_events(before, after) == ([event(2, "Atelier")], [event(2, "Atelier modifié"), event(4, "Démonstration")])
+
+
+def test_update_keeps_events_appended_since_the_form_opened(event_log):
+    shown = event_log.latest('achats')
+    # Ajout depuis une carte pendant que le formulaire est ouvert
+    event_log.append('achats', event(5, "Point d'étape"))
+    edited = [event(3, "COSUI modifié")] + shown[1:2]
+    event_log.update('achats', *diff_events(shown, edited))
+    assert event_log.latest('achats') == [event(5, "Point d'étape"), event(3, "COSUI modifié"), event(2, "Atelier")]
+
+
+def test_update_ignores_events_already_removed(event_log):
+    shown = event_log.latest('achats')
+    event_log.update('achats', [shown[0]], [])
+    event_log.update('achats', [shown[0]], [])
+    assert event_log.latest('achats') == shown[1:]
+
+
+def test_update_is_seen_by_another_instance(event_log):
+    other = type(event_log)(event_log.path)
+    assert other.latest('achats', 1) == [event(3, "COSUI")]
+    event_log.update('achats', [event(3, "COSUI")], [event(6, "Retour d'expérience")])
+    assert other.latest('achats', 1) == [event(6, "Retour d'expérience")]
+    assert other.count('achats') == 3
+
+
+def test_settled_events_are_not_replayed():
+    snapshot = type("Snapshot", (), {'data': {'filieres': {'achats': {}}}})()
+    batch = EditBatch(snapshot, separate_events=True)
+    form = batch.open_form('achats', {EVENTS_FIELD: [event(1, "Lancement")]})
+    form.update(EVENTS_FIELD, [event(2, "Atelier"), event(1, "Lancement")])
+    assert batch.event_changes() == {'achats': ([], [event(2, "Atelier")])}
+    form.settle(EVENTS_FIELD)
+    assert batch.event_changes() == {}
+    assert form.value(EVENTS_FIELD) == [event(2, "Atelier"), event(1, "Lancement")]
+
+
+def append_events(path, writer, n):
+    log = JsonlEventLog(path)
+    for i in range(n):
+        log.append('achats', event(1 + i % 28, f"{writer}-{i}"))
+    # L'instance qui a écrit voit aussi tout ce que les autres processus ont ajouté
+    return log.count('achats')
+
+
+def test_jsonl_appends_from_several_processes_are_all_indexed(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    JsonlEventLog(path).seed({})
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(4) as pool:
+        counts = pool.starmap(append_events, [(path, writer, 200) for writer in range(4)])
+    # Le dernier processus à écrire voit toutes les lignes, sans relecture forcée
+    assert max(counts) == 4 * 200
+    assert JsonlEventLog(path).count('achats') == 4 * 200
+
+
+def test_events_in_the_document_are_saved_as_additions_and_removals():
+    snapshot = type("Snapshot", (), {'data': {'filieres': {'achats': {}}}})()
+    batch = EditBatch(snapshot)
+    form = batch.open_form('achats', {EVENTS_FIELD: [event(2, "Atelier"), event(1, "Lancement")]})
+    form.update(EVENTS_FIELD, [event(3, "COSUI"), event(1, "Lancement")])
+    change = batch.changes()['filieres']['achats'][EVENTS_FIELD]
+    # Rejoué sur une liste où un autre événement a été ajouté entre-temps
+    saved = [event(4, "Démonstration"), event(2, "Atelier"), event(1, "Lancement")]
+    assert apply_events_change(saved, change) == [event(4, "Démonstration"), event(3, "COSUI"), event(1, "Lancement")]
@@ -0,0 +1,95 @@
+"""Nettoyage CSV latin-1 : la version par colonne rend exactement le résultat cellule par cellule."""
+import random
+import re
+import unicodedata
+
+import pandas as pd
+
+from export import CELL_SEPARATOR, EMOJI_MAPPING, clean_frame_for_csv, clean_text_for_csv
+
+# Mapping manuel de la fonction d'origine, appliquée cellule par cellule
+BASELINE_ACCENT_MAPPING = {
+    'à': 'a', 'á': 'a', 'â': 'a', 'ã': 'a', 'ä': 'a', 'å': 'a',
+    'è': 'e', 'é': 'e', 'ê': 'e', 'ë': 'e',
+    'ì': 'i', 'í': 'i', 'î': 'i', 'ï': 'i',
+    'ò': 'o', 'ó': 'o', 'ô': 'o', 'õ': 'o', 'ö': 'o',
+    'ù': 'u', 'ú': 'u', 'û': 'u', 'ü': 'u',
+    'ý': 'y', 'ÿ': 'y',
+    'ç': 'c', 'ñ': 'n',
+    'À': 'A', 'Á': 'A', 'Â': 'A', 'Ã': 'A', 'Ä': 'A', 'Å': 'A',
+    'È': 'E', 'É': 'E', 'Ê': 'E', 'Ë': 'E',
+    'Ì': 'I', 'Í': 'I', 'Î': 'I', 'Ï': 'I',
+    'Ò': 'O', 'Ó': 'O', 'Ô': 'O', 'Õ': 'O', 'Ö': 'O',
+    'Ù': 'U', 'Ú': 'U', 'Û': 'U', 'Ü': 'U',
+    'Ý': 'Y', 'Ÿ': 'Y',
+    'Ç': 'C', 'Ñ': 'N'
+}
+
+# Fragments tirés au hasard : émojis (avec sélecteur de variante), accents composés et
+# décomposés, signe angström (NFC -> Å), espaces variés, caractères spéciaux et NUL
+FRAGMENTS = list(EMOJI_MAPPING) + list(BASELINE_ACCENT_MAPPING) + [
+    'é', 'Å', 'Å', 'ﬁ', 'œ', 'ß', '中', 'Ω', '²', '́',
+    ' ', '  ', '\t', '\n', '\xa0', ' ', '-', '.', ',', ';', ':', '(', ')',
+    "'", '"', '/', '%', '€', '&', '#', '_', '\x00', 'a', 'Z', '7', 'Filière', 'Référent',
+]
+
+
+def baseline_clean(text):
+    """Fonction d'origine de l'export CSV, appliquée à chaque cellule."""
+    if not isinstance(text, str):
+        return str(text)
+    cleaned = text
+    for emoji, replacement in EMOJI_MAPPING.items():
+        cleaned = cleaned.replace(emoji, replacement)
+    cleaned = unicodedata.normalize('NFD', cleaned)
+    cleaned = unicodedata.normalize('NFC', cleaned)
+    for accented, plain in BASELINE_ACCENT_MAPPING.items():
+        cleaned = cleaned.replace(accented, plain)
+    cleaned = re.sub(r'[^\w\s\-.,;:()]', '', cleaned)
+    return re.sub(r'\s+', ' ', cleaned).strip()
+
+
+def baseline_frame(df):
+    # Mêmes colonnes texte que ``clean_frame_for_csv`` (object, ou str depuis pandas 3)
+    df_export = df.copy()
+    for col in df_export.columns:
+        if pd.api.types.is_object_dtype(df_export[col]) or pd.api.types.is_string_dtype(df_export[col]):
+            df_export[col] = df_export[col].astype(str).apply(baseline_clean)
+    return df_export
+
+
+def random_cell(rng, separator):
+    fragments = FRAGMENTS if separator else [f for f in FRAGMENTS if f != CELL_SEPARATOR]
+    if rng.random() < 0.1:
+        return rng.choice([None, 0, 3.5, -12, True, ['a', 'é']])
+    return "".join(rng.choice(fragments) for _ in range(rng.randint(0, 12)))
+
+
+def random_frame(rng, rows, separator):
+    return pd.DataFrame({
+        'Texte': [random_cell(rng, separator) for _ in range(rows)],
+        'Autre': [random_cell(rng, separator) for _ in range(rows)],
+        'Nombre': [rng.randint(0, 100) for _ in range(rows)],
+    })
+
+
+def test_clean_text_matches_the_baseline():
+    rng = random.Random(0)
+    for _ in range(2000):
+        text = random_cell(rng, separator=True)
+        assert clean_text_for_csv(text) == baseline_clean(text)
+
+
+def test_clean_frame_matches_the_baseline_on_fuzzed_columns():
+    rng = random.Random(1)
+    for _ in range(200):
+        df = random_frame(rng, rng.randint(1, 30), separator=False)
+        pd.testing.assert_frame_equal(clean_frame_for_csv(df), baseline_frame(df), check_dtype=False)
+
+
+def test_clean_frame_falls_back_to_cells_when_the_separator_is_in_the_data():
+    rng = random.Random(2)
+    for _ in range(200):
+        df = random_frame(rng, rng.randint(1, 30), separator=True)
+        df['Texte'] = [f"avant{CELL_SEPARATOR}après 🟢"] + list(df['Texte'])[1:]
+        pd.testing.assert_frame_equal(clean_frame_for_csv(df), baseline_frame(df), check_dtype=False)
@@ -0,0 +1,126 @@
+"""Calcul, application et fusion à trois voies des changements du document."""
+import copy
+
+from filieres_model import REMOVED, apply_changes, diff_documents, drop_changes, find_conflicts
+
+
+def make_document():
+    return {
+        'etats_avancement': {'a_initier': {'label': 'À initier'}},
+        'filieres': {
+            'achats': {'nom': 'Achats', 'referent_metier': 'Léa',
+                       'acces': {'laposte_gpt': 3, 'copilot_licences': 1}},
+            'juridique': {'nom': 'Juridique', 'referent_metier': '', 'usages_phares': ['Contrats']},
+        },
+    }
+
+
+def test_diff_identical_documents_is_empty():
+    assert diff_documents(make_document(), make_document()) == {}
+
+
+def test_diff_records_fields_subfields_and_removals():
+    base = make_document()
+    current = make_document()
+    current['filieres']['achats']['referent_metier'] = 'Hélène'
+    current['filieres']['achats']['acces']['laposte_gpt'] = 7
+    del current['filieres']['juridique']['usages_phares']
+    assert diff_documents(base, current) == {'filieres': {
+        'achats': {'referent_metier': 'Hélène', 'acces.laposte_gpt': 7},
+        'juridique': {'usages_phares': REMOVED},
+    }}
+
+
+def test_diff_records_added_and_deleted_filieres_and_document_keys():
+    base = make_document()
+    current = make_document()
+    del current['filieres']['juridique']
+    current['filieres']['rh'] = {'nom': 'RH'}
+    del current['etats_avancement']
+    current['version'] = 2
+    changes = diff_documents(base, current)
+    assert changes['filieres'] == {'juridique': None, 'rh': {'nom': 'RH'}}
+    assert changes['document'] == {'version': 2, 'etats_avancement': REMOVED}
+
+
+def test_apply_changes_reproduces_current():
+    base = make_document()
+    current = make_document()
+    current['filieres']['achats']['acces'] = {'laposte_gpt': 5}
+    current['filieres']['rh'] = {'nom': 'RH', 'acces': {'copilot_licences': 2}}
+    del current['filieres']['juridique']
+    current['version'] = 2
+    assert apply_changes(copy.deepcopy(base), diff_documents(base, current)) == current
+
+
+def test_no_conflict_when_other_filiere_or_field_changed():
+    base = make_document()
+    mine = make_document()
+    mine['filieres']['achats']['referent_metier'] = 'Hélène'
+    theirs = make_document()
+    theirs['filieres']['achats']['acces']['laposte_gpt'] = 9
+    theirs['filieres']['juridique']['referent_metier'] = 'Paul'
+    changes = diff_documents(base, mine)
+    assert find_conflicts(base, changes, theirs) == []
+    merged = apply_changes(copy.deepcopy(theirs), changes)
+    assert merged['filieres']['achats']['referent_metier'] == 'Hélène'
+    assert merged['filieres']['achats']['acces']['laposte_gpt'] == 9
+    assert merged['filieres']['juridique']['referent_metier'] == 'Paul'
+
+
+def test_same_value_on_both_sides_is_not_a_conflict():
+    base = make_document()
+    mine = make_document()
+    mine['filieres']['achats']['referent_metier'] = 'Hélène'
+    assert find_conflicts(base, diff_documents(base, mine), copy.deepcopy(mine)) == []
+
+
+def test_conflict_on_same_field():
+    base = make_document()
+    mine = make_document()
+    mine['filieres']['achats']['acces']['laposte_gpt'] = 4
+    theirs = make_document()
+    theirs['filieres']['achats']['acces']['laposte_gpt'] = 8
+    assert find_conflicts(base, diff_documents(base, mine), theirs) == [
+        {"filiere": 'achats', "champ": 'acces.laposte_gpt', "base": 3, "mine": 4, "theirs": 8}
+    ]
+
+
+def test_conflict_when_modified_filiere_was_deleted():
+    base = make_document()
+    mine = make_document()
+    mine['filieres']['juridique']['referent_metier'] = 'Paul'
+    theirs = make_document()
+    del theirs['filieres']['juridique']
+    conflicts = find_conflicts(base, diff_documents(base, mine), theirs)
+    assert [(c['filiere'], c['champ'], c['theirs']) for c in conflicts] == [('juridique', None, None)]
+
+
+def test_conflict_on_document_key():
+    base = make_document()
+    mine = make_document()
+    mine['etats_avancement'] = {}
+    theirs = make_document()
+    theirs['etats_avancement']['a_initier']['label'] = 'À engager'
+    conflicts = find_conflicts(base, diff_documents(base, mine), theirs)
+    assert [(c['filiere'], c['champ']) for c in conflicts] == [(None, 'etats_avancement')]
+
+
+def test_drop_changes_keeps_only_non_conflicting_changes():
+    changes = {
+        'filieres': {'achats': {'referent_metier': 'Hélène', 'acces.laposte_gpt': 4}, 'juridique': None},
+        'document': {'version': 2},
+    }
+    conflicts = [
+        {"filiere": 'achats', "champ": 'acces.laposte_gpt'},
+        {"filiere": 'juridique', "champ": None},
+        {"filiere": None, "champ": 'version'},
+    ]
+    assert drop_changes(changes, conflicts) == {'filieres': {'achats': {'referent_metier': 'Hélène'}}}
+    # ``changes`` n'est pas modifié
+    assert changes['filieres']['achats']['acces.laposte_gpt'] == 4
+
+
+def test_drop_changes_removes_emptied_filiere():
+    changes = {'filieres': {'achats': {'referent_metier': 'Hélène'}}}
+    assert drop_changes(changes, [{"filiere": 'achats', "champ": 'referent_metier'}]) == {}
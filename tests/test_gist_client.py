@@ -0,0 +1,88 @@
+"""Accès au Gist : délai global, reprises, appels d'une session et instantané local."""
+import os
+import threading
+import time
+
+import pytest
+import requests
+
+from gist_client import CircuitBreaker, GistClient, GistLoader
+from gist_stub import DEFAULT_FILENAME, DEFAULT_GIST_ID, GistStub
+
+
+def make_client(**kwargs):
+    # Disjoncteur hors jeu : seules les reprises et le délai global sont mesurés
+    client = GistClient("test", breaker=CircuitBreaker(threshold=100), **kwargs)
+    client.attempts = []
+    send = client.session.request
+
+    def request(*args, **kw):
+        client.attempts.append(kw["timeout"])
+        return send(*args, **kw)
+
+    client.session.request = request
+    return client
+
+
+@pytest.fixture
+def slow_url():
+    stub = GistStub('{"filieres": {}}', latency=1.0).start()
+    yield stub.url.format(gist_id=DEFAULT_GIST_ID)
+    stub.stop()
+
+
+def test_read_timeouts_are_retried_within_the_deadline(slow_url):
+    client = make_client(timeout=(1, 0.3), retries=10, backoff=0.05, deadline=1.0)
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get(slow_url)
+    assert time.monotonic() - start < 1.5
+    assert 1 < len(client.attempts) < 11
+    # La dernière tentative n'a que le temps restant
+    assert client.attempts[-1][1] < 0.3
+
+
+def test_interactive_calls_stop_at_the_first_read_timeout(slow_url):
+    client = make_client(timeout=(1, 0.3), retries=3, backoff=0.05)
+    with client.interactive():
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            client.get(slow_url)
+    assert len(client.attempts) == 1
+    # Hors du bloc, les appels retrouvent leurs reprises
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        client.get(slow_url)
+    assert len(client.attempts) == 1 + 4
+
+
+def test_server_errors_are_not_retried_past_the_deadline():
+    stub = GistStub('{"filieres": {}}', error_rate=1.0).start()
+    try:
+        client = make_client(retries=10, backoff=0.2, deadline=1.0)
+        start = time.monotonic()
+        response = client.get(stub.url.format(gist_id=DEFAULT_GIST_ID))
+        assert response.status_code == 503
+        assert time.monotonic() - start < 1.0
+    finally:
+        stub.stop()
+
+
+def test_loaders_sharing_a_snapshot_directory_write_it_atomically(tmp_path):
+    loaders = [GistLoader(DEFAULT_GIST_ID, DEFAULT_FILENAME, "test", str(tmp_path)) for _ in range(4)]
+    errors = []
+
+    def write(loader):
+        for i in range(50):
+            try:
+                loader._write_snapshot(f'{{"filieres": {{}}, "n": {i}}}', '"etag"', "v1")
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(loader,)) for loader in loaders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    # Aucun fichier temporaire ne reste, l'instantané est complet
+    assert sorted(os.listdir(tmp_path)) == [DEFAULT_FILENAME, DEFAULT_FILENAME + ".etag"]
+    assert loaders[0]._read_snapshot()['n'] == 49
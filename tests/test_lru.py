@@ -0,0 +1,19 @@
+"""Cache LRU borné partagé par les caches de cartes, de graphiques et d'exports."""
+from lru import BoundedLRU
+
+
+def test_least_recently_used_value_is_evicted():
+    cache = BoundedLRU(2)
+    builds = []
+
+    def build(value):
+        return lambda: builds.append(value) or value
+
+    cache.get('a', build("A"))
+    cache.get('b', build("B"))
+    # Relire 'a' le rend le plus récent : c'est 'b' qui est évincé
+    assert cache.get('a', build("A2")) == "A"
+    cache.get('c', build("C"))
+    assert len(cache) == 2
+    assert cache.get('b', build("B2")) == "B2"
+    assert builds == ["A", "B", "C", "B2"]
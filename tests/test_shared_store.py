@@ -0,0 +1,128 @@
+"""Magasin partagé : rythme d'interrogation du backend et publication des sauvegardes."""
+import threading
+import time
+
+import pytest
+
+from shared_store import RATE_LIMIT_RESERVE, SharedDataStore
+
+
+class FakeBackend:
+    """Backend en mémoire qui compte ses chargements.
+
+    ``quota`` est retourné par ``rate_limit`` ; ``during_load`` est appelé pendant un
+    chargement, avant qu'il ne retourne.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.data = {'filieres': {}}
+        self.revision = 1
+        self.loads = 0
+        self.quota = None
+        self.during_load = None
+
+    def load(self):
+        self.loads += 1
+        data = self.data
+        if self.during_load is not None:
+            self.during_load()
+        return data, False
+
+    def rate_limit(self):
+        return self.quota
+
+    def last_good(self):
+        return None
+
+
+def test_install_resets_the_interval_without_fetching():
+    backend = FakeBackend()
+    store = SharedDataStore(backend, interval=0.3, max_interval=60)
+    store.refresh()
+    # Données inchangées depuis longtemps : le thread attend l'intervalle maximal
+    store.last_change -= 3600
+    store.start()
+    loads = backend.loads
+    time.sleep(0.05)
+    assert store.poll_interval == 60
+    with backend.lock:
+        backend.data, backend.revision = {'filieres': {'achats': {}}}, 2
+        store.install(backend.data)
+    time.sleep(0.1)
+    # Rythme rapide rétabli, sans relecture immédiate du stockage
+    assert store.poll_interval == 0.3
+    assert backend.loads == loads
+    time.sleep(0.4)
+    assert backend.loads == loads + 1
+
+
+def idle_store(idle, interval=10, max_interval=60, quota=None):
+    backend = FakeBackend()
+    backend.quota = quota
+    store = SharedDataStore(backend, interval=interval, max_interval=max_interval)
+    store.last_change = time.monotonic() - idle
+    return store
+
+
+def test_fixed_interval_without_max_interval():
+    assert idle_store(3600, max_interval=None).next_interval() == 10
+
+
+@pytest.mark.parametrize("idle, expected", [(0, 10), (20, 10), (100, 25), (3600, 60)])
+def test_interval_grows_with_idle_time_up_to_the_maximum(idle, expected):
+    assert idle_store(idle).next_interval() == pytest.approx(expected, abs=0.1)
+
+
+def test_remaining_quota_is_spread_until_the_reset():
+    # 10 requêtes au-delà de la réserve pour 1000 s : une toutes les 100 s
+    store = idle_store(0, quota=(RATE_LIMIT_RESERVE + 10, time.time() + 1000))
+    assert store.next_interval() == pytest.approx(100, abs=0.5)
+
+
+def test_exhausted_reserve_waits_until_the_reset():
+    store = idle_store(0, quota=(RATE_LIMIT_RESERVE, time.time() + 1000))
+    assert store.next_interval() == pytest.approx(1000, abs=0.5)
+    store.backend.quota = (0, time.time() + 1000)
+    assert store.next_interval() == pytest.approx(1000, abs=0.5)
+
+
+def test_ample_quota_keeps_the_idle_interval():
+    store = idle_store(100, quota=(5000, time.time() + 3600))
+    assert store.next_interval() == pytest.approx(25, abs=0.1)
+
+
+def test_quota_past_its_reset_does_not_block_polling():
+    store = idle_store(0, quota=(0, time.time() - 30))
+    assert store.next_interval() == 10
+
+
+def test_refresh_racing_an_install_does_not_republish_older_data():
+    backend = FakeBackend()
+    store = SharedDataStore(backend)
+    store.refresh()
+    saved = {'filieres': {'achats': {'referent_metier': "Léa"}}}
+
+    def save_during_load():
+        # Sauvegarde publiée pendant un chargement qui a lu la version précédente
+        backend.during_load = None
+        backend.data, backend.revision = saved, 2
+        store.install(saved)
+
+    backend.data = {'filieres': {'achats': {}}}
+    backend.during_load = save_during_load
+    snapshot = store.refresh()
+    assert snapshot.data is saved
+    assert (snapshot.version, snapshot.revision) == (2, 2)
+    # Le chargement suivant retrouve le document enregistré : rien de plus n'est publié
+    assert store.refresh() is snapshot
+
+
+def test_refresh_publishes_only_changed_content():
+    backend = FakeBackend()
+    store = SharedDataStore(backend)
+    first = store.refresh()
+    assert store.refresh() is first
+    backend.data, backend.revision = {'filieres': {'achats': {}}}, 2
+    second = store.refresh()
+    assert (second.version, second.revision) == (2, 2)
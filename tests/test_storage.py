@@ -0,0 +1,216 @@
+"""Sauvegardes concurrentes : aucune écriture confirmée ne doit être perdue."""
+import copy
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+
+import pytest
+
+from filieres_model import EVENTS_FIELD, events_change
+from gist_stub import DEFAULT_FILENAME, DEFAULT_GIST_ID, GistStub
+from storage import ConflictError, GistBackend, LocalFileBackend, RevisionMismatch, commit_changes
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_PATH = os.path.join(REPO_DIR, "filieres_data.json")
+WRITERS = 4
+ROUNDS = 10
+
+
+def filiere_keys():
+    with open(DATA_PATH, encoding='utf-8') as f:
+        return list(json.load(f)['filieres'])[:WRITERS]
+
+
+def edit_rounds(backend, key, writer):
+    """Enregistre ROUNDS valeurs successives du référent de ``key``, chacune contre la
+    version que l'écrivain a vue en dernier (souvent dépassée par les autres)."""
+    with backend.lock:
+        base, _ = backend.load()
+        base, revision = copy.deepcopy(base), backend.revision
+    for n in range(ROUNDS):
+        changes = {'filieres': {key: {'referent_metier': f"{writer}-{n}"}}}
+        with backend.lock:
+            data = commit_changes(backend, changes, base, revision)
+            base, revision = copy.deepcopy(data), backend.revision
+
+
+def run_threads(targets):
+    errors = []
+
+    def run(target, *args):
+        try:
+            target(*args)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def assert_last_values(document, keys):
+    for writer, key in enumerate(keys):
+        assert document['filieres'][key]['referent_metier'] == f"{writer}-{ROUNDS - 1}"
+
+
+@pytest.fixture
+def local_path(tmp_path):
+    path = str(tmp_path / "filieres_data.json")
+    shutil.copy(DATA_PATH, path)
+    return path
+
+
+@pytest.fixture
+def stub():
+    with open(DATA_PATH, encoding='utf-8') as f:
+        stub = GistStub(f.read()).start()
+    yield stub
+    stub.stop()
+
+
+def gist_backend(stub, snapshot_dir):
+    return GistBackend(DEFAULT_GIST_ID, DEFAULT_FILENAME, "test", str(snapshot_dir), api_url=stub.url)
+
+
+def test_local_concurrent_threads(local_path):
+    keys = filiere_keys()
+    # Seuil bas : le journal est compacté plusieurs fois pendant le test
+    backend = LocalFileBackend(local_path, compact_threshold=5)
+    run_threads([(edit_rounds, backend, key, writer) for writer, key in enumerate(keys)])
+    assert_last_values(LocalFileBackend(local_path).load()[0], keys)
+
+
+def edit_in_process(path, key, writer):
+    edit_rounds(LocalFileBackend(path, compact_threshold=5), key, writer)
+
+
+def test_local_concurrent_processes(local_path):
+    keys = filiere_keys()
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=edit_in_process, args=(local_path, key, writer))
+                 for writer, key in enumerate(keys)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert_last_values(LocalFileBackend(local_path).load()[0], keys)
+
+
+def test_gist_concurrent_threads_share_one_backend(stub, tmp_path):
+    keys = filiere_keys()
+    backend = gist_backend(stub, tmp_path)
+    run_threads([(edit_rounds, backend, key, writer) for writer, key in enumerate(keys)])
+    assert_last_values(json.loads(stub.content), keys)
+
+
+def edit_acknowledged(backend, key, writer, acked):
+    """Comme ``edit_rounds``, en notant dans ``acked`` la dernière valeur confirmée ; une
+    sauvegarde abandonnée (``RevisionMismatch``) n'est pas confirmée et n'arrête pas l'écrivain."""
+    base, _ = backend.load()
+    base, revision = copy.deepcopy(base), backend.revision
+    for n in range(ROUNDS):
+        value = f"{writer}-{n}"
+        try:
+            data = commit_changes(backend, {'filieres': {key: {'referent_metier': value}}}, base, revision)
+        except RevisionMismatch:
+            data, _ = backend.load()
+        else:
+            acked[writer] = value
+        base, revision = copy.deepcopy(data), backend.revision
+
+
+def test_gist_independent_instances_keep_acknowledged_values(tmp_path):
+    with open(DATA_PATH, encoding='utf-8') as f:
+        stub = GistStub(f.read(), latency=0.005, jitter=0.005, seed=0).start()
+    try:
+        keys = filiere_keys()
+        acked = {}
+        # Une instance par écrivain : leurs PATCH s'écrasent et doivent être réparés.
+        # Chacun n'écrit que son champ : un ConflictError (contre soi-même) fait échouer le test
+        run_threads([(edit_acknowledged, gist_backend(stub, tmp_path / str(writer)), key, writer, acked)
+                     for writer, key in enumerate(keys)])
+        final = json.loads(stub.content)['filieres']
+        assert acked
+        for writer, key in enumerate(keys):
+            if writer in acked:
+                # Une sauvegarde abandonnée après son PATCH peut laisser une valeur plus récente
+                value = final[key]['referent_metier']
+                assert value.startswith(f"{writer}-")
+                assert int(value.split("-")[1]) >= int(acked[writer].split("-")[1])
+    finally:
+        stub.stop()
+
+
+def write_before_patch(backend, other, other_changes):
+    """Fait écrire ``other`` entre la relecture de ``backend`` et son PATCH."""
+    client = backend.loader.client
+    patch = client.patch
+
+    def patch_after_other(*args, **kwargs):
+        client.patch = patch
+        theirs, _ = other.load()
+        commit_changes(other, other_changes, copy.deepcopy(theirs), other.revision)
+        return patch(*args, **kwargs)
+
+    client.patch = patch_after_other
+
+
+def test_gist_overwritten_version_is_restored(stub, tmp_path):
+    first, second = filiere_keys()[:2]
+    mine, other = gist_backend(stub, tmp_path / "a"), gist_backend(stub, tmp_path / "b")
+    base, _ = mine.load()
+    base = copy.deepcopy(base)
+    write_before_patch(mine, other, {'filieres': {second: {'referent_metier': "autre"}}})
+
+    data = commit_changes(mine, {'filieres': {first: {'referent_metier': "moi"}}}, base, mine.revision)
+
+    final = json.loads(stub.content)
+    assert final['filieres'][first]['referent_metier'] == "moi"
+    assert final['filieres'][second]['referent_metier'] == "autre"
+    assert data == final
+    assert mine.revision == mine.loader.version
+
+
+def test_gist_overwritten_conflict_is_restored_then_reported(stub, tmp_path):
+    first, second = filiere_keys()[:2]
+    mine, other = gist_backend(stub, tmp_path / "a"), gist_backend(stub, tmp_path / "b")
+    base, _ = mine.load()
+    base = copy.deepcopy(base)
+    write_before_patch(mine, other, {'filieres': {first: {'referent_metier': "autre"}}})
+
+    changes = {'filieres': {first: {'referent_metier': "moi"}, second: {'referent_metier': "moi"}}}
+    with pytest.raises(ConflictError) as error:
+        commit_changes(mine, changes, base, mine.revision)
+
+    final = json.loads(stub.content)
+    # La valeur écrasée est rétablie, le changement sans conflit est conservé
+    assert final['filieres'][first]['referent_metier'] == "autre"
+    assert final['filieres'][second]['referent_metier'] == "moi"
+    assert [(c['filiere'], c['champ']) for c in error.value.conflicts] == [(first, 'referent_metier')]
+    assert error.value.theirs == final
+
+
+def test_gist_events_added_by_two_viewers_are_merged(stub, tmp_path):
+    key = filiere_keys()[0]
+    mine, other = gist_backend(stub, tmp_path / "a"), gist_backend(stub, tmp_path / "b")
+    base, _ = mine.load()
+    base, revision = copy.deepcopy(base), mine.revision
+    events = base['filieres'][key].get(EVENTS_FIELD, [])
+    added = [{'date': f"2099-01-0{day}", 'titre': titre, 'description': titre}
+             for day, titre in ((2, "autre"), (1, "moi"), (3, "après"))]
+    write_before_patch(mine, other, {'filieres': {key: {EVENTS_FIELD: events_change([], [added[0]])}}})
+
+    # Ajout écrasé par un PATCH concurrent, puis ajout contre une version dépassée
+    commit_changes(mine, {'filieres': {key: {EVENTS_FIELD: events_change([], [added[1]])}}}, base, revision)
+    other.load()
+    commit_changes(other, {'filieres': {key: {EVENTS_FIELD: events_change([], [added[2]])}}}, base, revision)
+
+    final = json.loads(stub.content)['filieres'][key][EVENTS_FIELD]
+    assert final[:3] == [added[2], added[0], added[1]]
+    assert final[3:] == events
@@ -0,0 +1,92 @@
+"""Feuille de style des cartes, générée à partir des couleurs de ``etats_avancement``."""
+import re
+
+# Couleurs utilisées quand un état n'est pas décrit dans ``etats_avancement``
+COULEUR_DEFAUT = '#f8f9fa'
+COULEUR_BORDURE_DEFAUT = '#dee2e6'
+
+# Règles communes à tous les états ; les couleurs par état sont ajoutées par build_stylesheet
+BASE_CSS = f"""
+.carte-bandeau {{
+    background-color: {COULEUR_BORDURE_DEFAUT};
+    margin: -1rem -1rem 1rem -1rem;
+    padding: 0.5rem;
+    border-radius: 5px 5px 0 0;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+}}
+.carte-titre {{ position: relative; }}
+.carte-titre .nb-collab {{ font-weight: normal; font-style: italic; font-size: 0.8em; }}
+.carte-titre .responsables {{
+    position: absolute; top: 0; right: 0;
+    font-size: 0.6em; color: #666; font-style: italic;
+}}
+.carte-badge {{
+    display: inline-block;
+    background-color: {COULEUR_BORDURE_DEFAUT};
+    color: white;
+    padding: 6px 12px;
+    border-radius: 15px;
+    font-weight: bold;
+    margin: 5px 0;
+    font-size: 0.9em;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.2);
+}}
+.carte-autonomie {{ margin: 5px 0 0 0; font-size: 1.0em; }}
+.carte-autonomie .niveau {{ font-weight: bold; }}
+.carte-metrique {{
+    background-color: {COULEUR_DEFAUT}20;
+    padding: 6px;
+    border-radius: 4px;
+    border-left: 2px solid {COULEUR_BORDURE_DEFAUT};
+    margin-bottom: 5px;
+    font-size: 0.9em;
+}}
+.carte-section {{ font-size: 0.9em; }}
+.carte-attention {{
+    background-color: #fff3cd;
+    border-left: 3px solid #ffc107;
+    padding: 4px 8px;
+    border-radius: 4px;
+    margin: 3px 0;
+    font-size: 0.85em;
+}}
+.carte-usage {{
+    background-color: {COULEUR_DEFAUT}10;
+    padding: 4px 8px;
+    border-radius: 4px;
+    margin: 3px 0;
+    font-size: 0.85em;
+}}
+.carte-evenement {{ background-color: #f8f9fa; padding: 10px; border-radius: 5px; }}
+.carte-evenement .description {{ color: #666; }}
+.etat-entete {{
+    background-color: {COULEUR_BORDURE_DEFAUT};
+    color: white;
+    padding: 15px;
+    border-radius: 10px;
+    margin: 20px 0 10px 0;
+}}
+.etat-entete h3 {{ margin: 0; color: white; }}
+.etat-entete p {{ margin: 5px 0 0 0; font-size: 0.9em; color: rgba(255,255,255,0.9); }}
+"""
+
+
+def etat_css_class(etat):
+    """Classe CSS portant les couleurs de l'état ``etat`` (ex: "etat-prompts_deployes")."""
+    return "etat-" + re.sub(r'[^A-Za-z0-9_-]', '-', str(etat))
+
+
+def build_stylesheet(etats_config):
+    """Feuille de style complète : règles communes + couleurs de chaque état configuré."""
+    rules = [BASE_CSS]
+    for etat, etat_info in etats_config.items():
+        couleur = etat_info.get('couleur', COULEUR_DEFAUT)
+        couleur_bordure = etat_info.get('couleur_bordure', COULEUR_BORDURE_DEFAUT)
+        css_class = etat_css_class(etat)
+        rules.append(
+            f".{css_class}.carte-bandeau, .{css_class}.carte-badge, .{css_class}.etat-entete "
+            f"{{ background-color: {couleur_bordure}; }}\n"
+            f".{css_class}.carte-metrique {{ background-color: {couleur}20; border-left-color: {couleur_bordure}; }}\n"
+            f".{css_class}.carte-usage {{ background-color: {couleur}10; }}"
+        )
+    return "<style>\n" + "\n".join(rules) + "\n</style>"